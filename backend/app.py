@@ -21,10 +21,20 @@ from routes.admin import admin_bp
 from routes.stats import stats_bp
 from routes.deletion import deletion_bp
 from routes.export import export_bp
+from routes.events import events_bp
 
 # Import services to initialize
 from services.database import init_db_pool
 from services.keep_alive import start_keep_alive
+from services.maintenance import start_maintenance
+from services.metrics_service import start_metrics_refresh
+from services.reaction_counter import start_reaction_counter
+from services.usage_service import start_usage_flusher
+from services.comment_moderation_worker import ASYNC_COMMENT_MODERATION, start_comment_moderation_worker
+from services.export_worker import start_export_worker
+from services.account_deletion_worker import start_deletion_worker
+from services.email_worker import start_email_sender
+from services.email_service import start_email_log_flusher
 
 
 def create_app(config_name=None):
@@ -41,6 +51,25 @@ def create_app(config_name=None):
         init_db_pool()
         # Start background task to keep database alive (prevents Neon auto-suspend)
         start_keep_alive()
+        # Prune expired OTP codes and moderation verdicts in batches
+        start_maintenance()
+        # Fold dirty dates from the metrics refresh queue into daily_metrics
+        start_metrics_refresh()
+        # Fold logged reaction deltas into posts.reaction_count
+        start_reaction_counter()
+        # Flush buffered API usage to api_usage periodically and on exit
+        start_usage_flusher()
+        # Moderate optimistically posted comments in the background
+        if ASYNC_COMMENT_MODERATION:
+            start_comment_moderation_worker()
+        # Build queued journal exports off the request path
+        start_export_worker()
+        # Run approved account deletions in small chunks off the request path
+        start_deletion_worker()
+        # Deliver queued email from the outbox, with retries
+        start_email_sender()
+        # Write buffered email_logs rows in batches
+        start_email_log_flusher()
 
     # Configure CORS - parse comma-separated frontend URLs from env
     frontend_urls = app.config['FRONTEND_URL'].split(',')
@@ -64,6 +93,7 @@ def create_app(config_name=None):
     app.register_blueprint(stats_bp, url_prefix='/api/stats')
     app.register_blueprint(deletion_bp, url_prefix='/api/deletion')
     app.register_blueprint(export_bp, url_prefix='/api/export')
+    app.register_blueprint(events_bp, url_prefix='/api/events')
 
     # Health check endpoint - also keeps Neon database warm
     @app.route('/health')
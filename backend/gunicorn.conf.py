@@ -8,8 +8,35 @@ bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
 
 # Worker processes
 # Keep it low to avoid memory issues - 4 workers is plenty for most workloads
-workers = 4
-worker_class = 'sync'
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+
+# Requests mostly wait on Postgres, Anthropic, OpenAI and SendGrid, so each
+# worker serves several at once:
+# - gthread (default): GUNICORN_THREADS request threads per worker
+# - gevent: GUNICORN_WORKER_CONNECTIONS greenlets per worker (gevent and
+#   psycogreen are in requirements.txt)
+# - sync: one request per worker
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+# gunicorn turns sync into gthread whenever threads > 1
+threads = int(os.environ.get('GUNICORN_THREADS', 8)) if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+
+request_slots = {'gthread': threads, 'gevent': min(worker_connections, 20)}.get(worker_class, 1)
+
+# Threads per worker that run a request's independent calls side by side
+# (services/concurrency.py), unless set explicitly: two per request slot
+os.environ.setdefault('IO_WORKERS', str(2 * request_slots))
+io_workers = int(os.environ['IO_WORKERS'])
+
+# Database connections per worker, unless set explicitly: keep one warm
+# connection per concurrent request (psycopg2 closes connections above the
+# minimum when they are returned), and allow one more for every IO pool
+# thread and background worker thread, which can all hold one at once.
+# Greenlets beyond the pool queue for a connection (DB_POOL_TIMEOUT).
+# Postgres sees up to workers x DB_POOL_MAX_CONN connections.
+BACKGROUND_DB_THREADS = 10
+os.environ.setdefault('DB_POOL_MIN_CONN', str(request_slots))
+os.environ.setdefault('DB_POOL_MAX_CONN', str(request_slots + io_workers + BACKGROUND_DB_THREADS))
 
 # Timeout (increased for AI API calls)
 # Default is 30s, but Anthropic API can take longer for analysis
@@ -38,6 +65,23 @@ user = None
 group = None
 tmp_upload_dir = None
 
+
+def post_fork(server, worker):
+    """Let psycopg2 yield to other greenlets while it waits on Postgres"""
+    if worker_class == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+
+def worker_exit(server, worker):
+    """Flush buffered API usage before a worker goes away"""
+    try:
+        from services.usage_service import flush_usage
+        flush_usage()
+    except Exception as e:
+        print(f"Failed to flush API usage on worker exit: {e}")
+
+
 # SSL (if needed)
 keyfile = None
 certfile = None
@@ -1,16 +1,23 @@
 """Admin routes for application management and moderation"""
 
 from flask import Blueprint, request, jsonify
+import os
+import uuid
 from middleware.auth_middleware import require_admin
 from services.database import db
 from services.email_service import (
     send_application_approved_email,
+    send_application_approved_emails,
     send_application_rejected_email,
+    send_application_rejected_emails,
     send_more_info_needed_email
 )
+from services.account_deletion_worker import queue_account_deletion, wake_deletion_worker
 
 admin_bp = Blueprint('admin', __name__)
 
+MAX_BULK_REVIEW = 500  # applications per bulk approve/reject call
+
 
 @admin_bp.route('/applications', methods=['GET'])
 @require_admin
@@ -176,6 +183,100 @@ def request_more_info(application_id):
     return jsonify({'success': True}), 200
 
 
+def parse_application_ids(data):
+    """Validate the application_ids list of a bulk review; returns (ids, error)"""
+    application_ids = data.get('application_ids')
+    if not isinstance(application_ids, list) or not application_ids:
+        return None, 'application_ids must be a non-empty list'
+    if len(application_ids) > MAX_BULK_REVIEW:
+        return None, f'At most {MAX_BULK_REVIEW} applications per request'
+
+    try:
+        # Deduplicated, order preserved
+        return list(dict.fromkeys(str(uuid.UUID(str(a))) for a in application_ids)), None
+    except ValueError:
+        return None, 'Invalid application id'
+
+
+def bulk_review_response(application_ids, reviewed):
+    reviewed_ids = {str(r['id']) for r in reviewed}
+    return jsonify({
+        'success': True,
+        'reviewed': [a for a in application_ids if a in reviewed_ids],
+        # Unknown, or already in the requested status
+        'skipped': [a for a in application_ids if a not in reviewed_ids]
+    }), 200
+
+
+@admin_bp.route('/applications/bulk-approve', methods=['POST'])
+@require_admin
+def bulk_approve_applications():
+    """Approve many applications with one UPDATE and one batched email send"""
+    data = request.get_json() or {}
+    application_ids, error = parse_application_ids(data)
+    if error:
+        return jsonify({'error': error}), 400
+    admin_notes = (data.get('admin_notes') or '').strip() or None
+    admin_id = request.user['id']
+
+    # Applications already approved are left alone so a retried call
+    # doesn't email anyone twice
+    approved = db.execute("""
+        UPDATE applications a
+        SET status = 'approved',
+            admin_notes = %s,
+            reviewed_by = %s,
+            reviewed_at = NOW()
+        FROM users u
+        WHERE a.user_id = u.id
+          AND a.id = ANY(%s::uuid[])
+          AND a.status <> 'approved'
+        RETURNING a.id, u.email
+    """, [admin_notes, admin_id, application_ids], fetch_all=True, commit=True)
+
+    if approved:
+        send_application_approved_emails([a['email'] for a in approved])
+
+    return bulk_review_response(application_ids, approved)
+
+
+@admin_bp.route('/applications/bulk-reject', methods=['POST'])
+@require_admin
+def bulk_reject_applications():
+    """Reject many applications for one reason with one UPDATE and one batched email send"""
+    data = request.get_json() or {}
+    application_ids, error = parse_application_ids(data)
+    if error:
+        return jsonify({'error': error}), 400
+    rejection_reason = (data.get('rejection_reason') or '').strip()
+    admin_notes = (data.get('admin_notes') or '').strip() or None
+    admin_id = request.user['id']
+
+    if not rejection_reason:
+        return jsonify({'error': 'Rejection reason is required'}), 400
+
+    # Allow them to reapply, as with single rejections
+    rejected = db.execute("""
+        UPDATE applications a
+        SET status = 'rejected',
+            rejection_reason = %s,
+            admin_notes = %s,
+            reviewed_by = %s,
+            reviewed_at = NOW(),
+            can_reapply = TRUE
+        FROM users u
+        WHERE a.user_id = u.id
+          AND a.id = ANY(%s::uuid[])
+          AND a.status <> 'rejected'
+        RETURNING a.id, u.email
+    """, [rejection_reason, admin_notes, admin_id, application_ids], fetch_all=True, commit=True)
+
+    if rejected:
+        send_application_rejected_emails([a['email'] for a in rejected], rejection_reason)
+
+    return bulk_review_response(application_ids, rejected)
+
+
 @admin_bp.route('/stats', methods=['GET'])
 @require_admin
 def get_stats():
@@ -371,6 +472,20 @@ def get_analytics():
     }), 200
 
 
+@admin_bp.route('/llm-metrics', methods=['GET'])
+@require_admin
+def get_llm_metrics():
+    """Get LLM client limiter, retry and circuit breaker metrics (this worker only)"""
+    from services.llm_client import get_llm_metrics as collect_llm_metrics
+    from services.moderation_service import get_moderation_stats
+
+    return jsonify({
+        'pid': os.getpid(),
+        'models': collect_llm_metrics(),
+        'moderation_decisions': get_moderation_stats()
+    }), 200
+
+
 @admin_bp.route('/flags', methods=['GET'])
 @require_admin
 def get_flagged_posts():
@@ -484,10 +599,8 @@ def get_deletion_requests():
     }), 200
 
 
-@admin_bp.route('/deletion-requests/<request_id>/delete-all', methods=['POST'])
-@require_admin
-def delete_account_with_data(request_id):
-    """Approve deletion request - delete everything"""
+def approve_deletion_request(request_id, mode, status):
+    """Mark a deletion request approved and queue its account deletion job"""
     admin_id = request.user['id']
     data = request.get_json() or {}
     admin_notes = data.get('admin_notes', '').strip() or None
@@ -502,78 +615,74 @@ def delete_account_with_data(request_id):
     if not req:
         return jsonify({'error': 'Deletion request not found'}), 404
 
-    user_id = req['user_id']
-
     try:
-        # Delete user (cascade will handle related data)
-        db.execute("DELETE FROM users WHERE id = %s", [user_id], commit=True)
-
-        # Update deletion request
-        db.execute("""
-            UPDATE deletion_requests
-            SET status = 'approved_delete_all',
-                admin_notes = %s,
-                reviewed_by = %s,
-                reviewed_at = NOW()
-            WHERE id = %s
-        """, [admin_notes, admin_id, request_id], commit=True)
-
-        return jsonify({'success': True, 'message': 'Account and all data deleted'}), 200
+        # Approval and job are recorded together; the worker does the deleting
+        with db.transaction() as tx:
+            job_id = queue_account_deletion(tx, request_id, req['user_id'], mode, admin_id)
+            if not job_id:
+                return jsonify({'error': 'This account is already being deleted'}), 409
+
+            tx.execute("""
+                UPDATE deletion_requests
+                SET status = %s,
+                    admin_notes = %s,
+                    reviewed_by = %s,
+                    reviewed_at = NOW()
+                WHERE id = %s
+            """, [status, admin_notes, admin_id, request_id])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+    wake_deletion_worker()
+
+    return jsonify({
+        'success': True,
+        'job_id': str(job_id),
+        'message': 'Account deletion queued'
+    }), 202
+
+
+@admin_bp.route('/deletion-requests/<request_id>/delete-all', methods=['POST'])
+@require_admin
+def delete_account_with_data(request_id):
+    """Approve deletion request - delete everything"""
+    return approve_deletion_request(request_id, 'delete_all', 'approved_delete_all')
+
 
 @admin_bp.route('/deletion-requests/<request_id>/retain-data', methods=['POST'])
 @require_admin
 def delete_account_retain_data(request_id):
     """Approve deletion - delete account but retain anonymized posts"""
-    admin_id = request.user['id']
-    data = request.get_json() or {}
-    admin_notes = data.get('admin_notes', '').strip() or None
+    return approve_deletion_request(request_id, 'retain_data', 'approved_retain_data')
 
-    # Get the deletion request
-    req = db.execute(
-        "SELECT user_id FROM deletion_requests WHERE id = %s",
-        [request_id],
-        fetch_one=True
-    )
 
-    if not req:
-        return jsonify({'error': 'Deletion request not found'}), 404
+@admin_bp.route('/deletion-jobs/<job_id>', methods=['GET'])
+@require_admin
+def get_deletion_job(job_id):
+    """Progress of a queued account deletion"""
+    job = db.execute("""
+        SELECT id, request_id, user_id, mode, status, step, rows_processed,
+               error, attempts, created_at, completed_at
+        FROM account_deletion_jobs
+        WHERE id = %s
+    """, [job_id], fetch_one=True)
 
-    user_id = req['user_id']
+    if not job:
+        return jsonify({'error': 'Deletion job not found'}), 404
 
-    try:
-        # Anonymize user data but keep posts
-        # Delete sessions and personal data
-        db.execute("DELETE FROM sessions WHERE user_id = %s", [user_id], commit=False)
-        db.execute("DELETE FROM applications WHERE user_id = %s", [user_id], commit=False)
-
-        # Update posts to disconnect from user (keep three_word_id for attribution)
-        db.execute("""
-            UPDATE posts SET user_id = NULL WHERE user_id = %s
-        """, [user_id], commit=False)
-
-        db.execute("""
-            UPDATE comments SET user_id = NULL WHERE user_id = %s
-        """, [user_id], commit=False)
-
-        # Delete the user account
-        db.execute("DELETE FROM users WHERE id = %s", [user_id], commit=True)
-
-        # Update deletion request
-        db.execute("""
-            UPDATE deletion_requests
-            SET status = 'approved_retain_data',
-                admin_notes = %s,
-                reviewed_by = %s,
-                reviewed_at = NOW()
-            WHERE id = %s
-        """, [admin_notes, admin_id, request_id], commit=True)
-
-        return jsonify({'success': True, 'message': 'Account deleted, posts retained anonymously'}), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return jsonify({
+        'id': str(job['id']),
+        'request_id': str(job['request_id']) if job['request_id'] else None,
+        'user_id': str(job['user_id']),
+        'mode': job['mode'],
+        'status': job['status'],
+        'step': job['step'],
+        'rows_processed': job['rows_processed'],
+        'error': job['error'],
+        'attempts': job['attempts'],
+        'created_at': job['created_at'].isoformat() if job['created_at'] else None,
+        'completed_at': job['completed_at'].isoformat() if job.get('completed_at') else None
+    }), 200
 
 
 @admin_bp.route('/deletion-requests/<request_id>/reject', methods=['POST'])
@@ -2,7 +2,7 @@
 
 from flask import Blueprint, request, jsonify, make_response
 from services.auth_service import (
-    create_otp, verify_otp, get_or_create_user,
+    create_otp, login_with_otp,
     create_jwt_token, get_user_application_status
 )
 from services.email_service import send_otp_email
@@ -24,6 +24,8 @@ def request_otp():
 
     # Generate and store OTP
     otp_code = create_otp(email, purpose)
+    if not otp_code:
+        return jsonify({'error': 'Too many codes requested. Please wait a few minutes and try again.'}), 429
 
     # Send email
     send_otp_email(email, otp_code, purpose)
@@ -45,16 +47,11 @@ def verify_otp_route():
     if not email or not code:
         return jsonify({'error': 'Email and code are required'}), 400
 
-    # Verify OTP
-    if not verify_otp(email, code, purpose):
+    # Consume the OTP, get or create the user and fetch application status in one round trip
+    user, app_status = login_with_otp(email, code, purpose)
+    if not user:
         return jsonify({'error': 'Invalid or expired code'}), 401
 
-    # Get or create user
-    user = get_or_create_user(email)
-
-    # Get application status
-    app_status = get_user_application_status(user['id'])
-
     # Create JWT token
     token = create_jwt_token(user['id'], user['email'], user['is_admin'])
 
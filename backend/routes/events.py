@@ -0,0 +1,28 @@
+"""Realtime event stream routes"""
+
+from flask import Blueprint, Response, request, jsonify
+from middleware.auth_middleware import require_verified
+from services.realtime_service import REALTIME_EVENTS, subscribe, event_stream
+
+events_bp = Blueprint('events', __name__)
+
+
+@events_bp.route('/stream', methods=['GET'])
+@require_verified
+def stream_events():
+    """
+    Server-sent events for the feed, or for one post with ?post_id=
+    Events: post, comment, comment_removed, reaction (with a +1/-1 delta) and
+    resync (events were missed; refetch). Clients apply them as deltas.
+    """
+    if not REALTIME_EVENTS:
+        return jsonify({'error': 'Realtime events are disabled'}), 404
+
+    subscription = subscribe(request.args.get('post_id'))
+    if subscription is None:
+        return jsonify({'error': 'Too many live connections, falling back to polling', 'retryable': True}), 503
+
+    return Response(event_stream(subscription), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -1,10 +1,15 @@
 """Export routes for journal data"""
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from middleware.auth_middleware import require_verified
 from services.database import db
-import json
+from services.export_service import (
+    EXPORT_FORMATS, stream_export, archive_filename, archive_mimetype, archive_path,
+    read_export_archive, create_download_token, verify_download_token
+)
+from services.export_worker import CLAIM_TIMEOUT, MAX_ATTEMPTS, wake_export_worker
 from datetime import datetime
+import os
 
 export_bp = Blueprint('export', __name__)
 
@@ -12,81 +17,148 @@ export_bp = Blueprint('export', __name__)
 @export_bp.route('/journal', methods=['GET'])
 @require_verified
 def export_journal():
-    """Export all user's journal entries with AI analysis and comments"""
+    """
+    Export all user's journal entries with AI analysis and comments
+    Streamed as ?format=json (default), ndjson or zip (markdown files)
+    """
     user_id = request.user['id']
+    export_format = request.args.get('format', 'json')
 
-    # Get all user sessions
-    sessions = db.execute("""
-        SELECT
-            s.id, s.original_content, s.analyzed_content, s.clear_ask,
-            s.title, s.intent, s.topics, s.created_at, s.updated_at,
-            s.is_analyzed, s.shared_as_post
-        FROM sessions s
-        WHERE s.user_id = %s
-        ORDER BY s.created_at DESC
-    """, [user_id], fetch_all=True)
-
-    export_data = []
-
-    for session in sessions:
-        session_data = {
-            'id': str(session['id']),
-            'title': session.get('title', ''),
-            'original_content': session['original_content'],
-            'analyzed_content': session.get('analyzed_content'),
-            'clear_ask': session.get('clear_ask'),
-            'intent': session.get('intent'),
-            'topics': session.get('topics', []),
-            'created_at': session['created_at'].isoformat() if session.get('created_at') else None,
-            'updated_at': session['updated_at'].isoformat() if session.get('updated_at') else None,
-            'is_analyzed': session.get('is_analyzed', False),
-            'shared_as_post': session.get('shared_as_post', False),
-            'comments': []
-        }
-
-        # Get AI analysis comment if session was shared as a post
-        if session['shared_as_post']:
-            post = db.execute("""
-                SELECT id FROM posts WHERE session_id = %s
-            """, [session['id']], fetch_one=True)
-
-            if post:
-                # Get all comments on this post
-                comments = db.execute("""
-                    SELECT
-                        c.id, c.content, c.created_at,
-                        c.is_ai_analysis,
-                        u.three_word_id
-                    FROM comments c
-                    LEFT JOIN users u ON c.user_id = u.id
-                    WHERE c.post_id = %s
-                    ORDER BY c.created_at ASC
-                """, [post['id']], fetch_all=True)
-
-                session_data['comments'] = [
-                    {
-                        'id': str(c['id']),
-                        'content': c['content'],
-                        'is_ai_analysis': c.get('is_ai_analysis', False),
-                        'author': 'AI Analysis' if c.get('is_ai_analysis') else (c.get('three_word_id') or 'Anonymous'),
-                        'created_at': c['created_at'].isoformat() if c.get('created_at') else None
-                    }
-                    for c in comments
-                ]
-
-        export_data.append(session_data)
-
-    # Create export metadata
-    user = db.execute("SELECT email, three_word_id FROM users WHERE id = %s", [user_id], fetch_one=True)
-
-    result = {
-        'export_date': datetime.utcnow().isoformat(),
-        'user': {
-            'email': user['email'] if user else None,
-            'three_word_id': user.get('three_word_id') if user else None
-        },
-        'total_entries': len(export_data),
-        'entries': export_data
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    body = stream_export(user_id, export_format)
+
+    headers = {}
+    if export_format != 'json':
+        filename = f"journal-export-{datetime.utcnow().strftime('%Y%m%d')}.{export_format}"
+        headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+    return Response(body, mimetype=EXPORT_FORMATS[export_format], headers=headers), 200
+
+
+def _job_response(job, user_id):
+    data = {
+        'job_id': str(job['id']),
+        'format': job['format'],
+        'status': job['status'],
+        'created_at': job['created_at'].isoformat() if job['created_at'] else None,
+        'completed_at': job['completed_at'].isoformat() if job.get('completed_at') else None,
+        'expires_at': job['expires_at'].isoformat() if job.get('expires_at') else None,
+        'size_bytes': job.get('size_bytes')
+    }
+    if job['status'] == 'completed':
+        token, token_expires_at = create_download_token(job['id'], user_id)
+        data['filename'] = archive_filename(job['format'], job['created_at'])
+        data['download_url'] = f"/api/export/journal/jobs/{job['id']}/download?token={token}"
+        data['download_expires_at'] = token_expires_at.isoformat()
+    elif job['status'] == 'failed':
+        data['error'] = 'Export failed, please try again'
+    return data
+
+
+@export_bp.route('/journal/jobs', methods=['POST'])
+@require_verified
+def create_export_job():
+    """Queue a background export; poll GET /journal/jobs/<job_id> for the download link"""
+    user_id = request.user['id']
+    data = request.get_json(silent=True) or {}
+    export_format = data.get('format', 'zip')
+
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    # One queued or running export per user at a time; a job that died on its
+    # last attempt (about to be failed by the worker) doesn't count
+    job = db.execute("""
+        SELECT id, format, status, created_at, completed_at, expires_at, size_bytes
+        FROM export_jobs
+        WHERE user_id = %s
+          AND (status = 'pending'
+               OR (status = 'running'
+                   AND (attempts < %s OR claimed_at >= NOW() - make_interval(secs => %s))))
+        ORDER BY created_at DESC
+        LIMIT 1
+    """, [user_id, MAX_ATTEMPTS, CLAIM_TIMEOUT], fetch_one=True)
+
+    if not job:
+        job = db.execute("""
+            INSERT INTO export_jobs (user_id, format)
+            VALUES (%s, %s)
+            RETURNING id, format, status, created_at, completed_at, expires_at, size_bytes
+        """, [user_id, export_format], commit=True)
+        wake_export_worker()
+
+    return jsonify(_job_response(job, user_id)), 202
+
+
+@export_bp.route('/journal/jobs/<job_id>', methods=['GET'])
+@require_verified
+def get_export_job(job_id):
+    """Export job status, with a short-lived download link once completed"""
+    user_id = request.user['id']
+
+    job = db.execute("""
+        SELECT id, format, status, created_at, completed_at, expires_at, size_bytes
+        FROM export_jobs
+        WHERE id = %s AND user_id = %s
+    """, [job_id, user_id], fetch_one=True)
+
+    if not job:
+        return jsonify({'error': 'Export not found'}), 404
+
+    return jsonify(_job_response(job, user_id)), 200
+
+
+@export_bp.route('/journal/jobs/<job_id>/download', methods=['GET'])
+def download_export(job_id):
+    """
+    Download a completed export archive
+    Authorized by the single-use token from the job status (no session cookie
+    needed). Range requests can resume an interrupted download; the token is
+    used up once a response reaching the end of the archive is served.
+    """
+    token = request.args.get('token', '')
+    user_id = verify_download_token(token, job_id)
+    if not user_id:
+        return jsonify({'error': 'Download link is invalid or has expired'}), 403
+
+    job = db.execute("""
+        SELECT id, format, created_at, size_bytes
+        FROM export_jobs
+        WHERE id = %s AND user_id = %s AND status = 'completed' AND expires_at > NOW()
+    """, [job_id, user_id], fetch_one=True)
+
+    path = archive_path(job_id)
+    if not job or not os.path.isfile(path):
+        return jsonify({'error': 'Export not found or expired'}), 404
+
+    size = job['size_bytes']
+    etag = f"{job['id']}-{size}"
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'ETag': f'"{etag}"',
+        # The link carries the token; don't pass it on to other sites
+        'Referrer-Policy': 'no-referrer',
+        'Content-Disposition': f'attachment; filename="{archive_filename(job["format"], job["created_at"])}"'
     }
 
-    return jsonify(result), 200
+    start, stop, status = 0, size, 200
+    byte_range = request.range
+    if byte_range and (not request.if_range.etag or request.if_range.etag == etag):
+        bounds = byte_range.range_for_length(size)
+        if bounds is None:
+            headers['Content-Range'] = f"bytes */{size}"
+            return Response(status=416, headers=headers)
+        start, stop = bounds
+        status = 206
+        headers['Content-Range'] = f"bytes {start}-{stop - 1}/{size}"
+
+    # Serving the last byte spends the token; a concurrent request that got
+    # there first wins and this one is refused
+    if stop == size and not verify_download_token(token, job_id, consume=True):
+        return jsonify({'error': 'Download link is invalid or has expired'}), 403
+
+    headers['Content-Length'] = str(stop - start)
+    body = read_export_archive(path, start, stop)
+    return Response(body, status=status, mimetype=archive_mimetype(job['format']), headers=headers)
@@ -3,7 +3,9 @@
 from flask import Blueprint, request, jsonify
 from middleware.auth_middleware import require_auth
 from services.database import db
-from services.identity_service import generate_three_word_id, check_three_word_exists
+from services.identity_service import (
+    reserve_identity_options, claim_identity, allocate_three_word_id, release_three_word_id
+)
 
 identity_bp = Blueprint('identity', __name__)
 
@@ -34,14 +36,15 @@ def choose_identity():
     if not app or app['status'] != 'approved':
         return jsonify({'error': 'Application must be approved first'}), 403
 
-    # Check if three-word ID is available
-    if check_three_word_exists(three_word_id):
-        return jsonify({'error': 'This identity is already taken'}), 400
+    # Take the identity from the pool and set it together; the pool row stays
+    # free if the user update doesn't happen
+    with db.transaction() as tx:
+        if not claim_identity(tx, user_id, three_word_id):
+            return jsonify({'error': 'This identity is already taken'}), 400
 
-    # Set identity
-    db.execute("""
-        UPDATE users SET three_word_id = %s WHERE id = %s
-    """, [three_word_id, user_id], commit=True)
+        tx.execute("""
+            UPDATE users SET three_word_id = %s WHERE id = %s
+        """, [three_word_id, user_id])
 
     return jsonify({'success': True}), 200
 
@@ -49,9 +52,7 @@ def choose_identity():
 @identity_bp.route('/generate', methods=['GET'])
 @require_auth
 def generate_identity_options():
-    """Generate identity options for user to choose from"""
-    from services.identity_service import generate_identity_options
-
+    """Reserve identity options for user to choose from"""
     user_id = request.user['id']
 
     # Check if application is approved
@@ -65,7 +66,7 @@ def generate_identity_options():
     if not app or app['status'] != 'approved':
         return jsonify({'error': 'Application must be approved first'}), 403
 
-    options = generate_identity_options(count=5)
+    options = reserve_identity_options(user_id, count=5)
 
     return jsonify({
         'options': options
@@ -77,24 +78,26 @@ def generate_identity_options():
 def reset_identity():
     """Reset three-word identity"""
     user_id = request.user['id']
-
-    # Generate new identity
-    new_id = generate_three_word_id()
-
-    # Update user
-    db.execute("""
-        UPDATE users SET three_word_id = %s WHERE id = %s
-    """, [new_id, user_id], commit=True)
-
-    # Update all posts with new identity
-    db.execute("""
-        UPDATE posts SET three_word_id = %s WHERE user_id = %s
-    """, [new_id, user_id], commit=True)
-
-    # Update all comments with new identity
-    db.execute("""
-        UPDATE comments SET three_word_id = %s WHERE user_id = %s
-    """, [new_id, user_id], commit=True)
+    old_id = request.user['three_word_id']
+
+    # Move the user, their posts and their comments to a new identity together,
+    # and hand the old one back to the pool
+    with db.transaction() as tx:
+        new_id = allocate_three_word_id(tx)
+        if old_id:
+            release_three_word_id(tx, old_id)
+
+        tx.execute("""
+            UPDATE users SET three_word_id = %s WHERE id = %s
+        """, [new_id, user_id])
+
+        tx.execute("""
+            UPDATE posts SET three_word_id = %s WHERE user_id = %s
+        """, [new_id, user_id])
+
+        tx.execute("""
+            UPDATE comments SET three_word_id = %s WHERE user_id = %s
+        """, [new_id, user_id])
 
     return jsonify({
         'success': True,
@@ -3,9 +3,57 @@
 from flask import Blueprint, request, jsonify
 from middleware.auth_middleware import require_verified, optional_auth
 from services.database import db
+import base64
+import binascii
+import uuid
+from datetime import datetime
 
 post_bp = Blueprint('post', __name__)
 
+# Comments returned with a post; longer threads are paged
+COMMENTS_PAGE_SIZE = 50
+MAX_COMMENTS_PAGE_SIZE = 200
+
+
+def encode_comment_cursor(published_at, comment_id):
+    """Opaque cursor for a comment's (published_at, id) position"""
+    return base64.urlsafe_b64encode(f"{published_at}|{comment_id}".encode()).decode()
+
+
+def decode_comment_cursor(cursor):
+    """(published_at, id) from a cursor; raises ValueError if malformed"""
+    try:
+        published_at, comment_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(published_at), str(uuid.UUID(comment_id))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def comments_limit_arg(name='comments_limit'):
+    return min(max(int(request.args.get(name, COMMENTS_PAGE_SIZE)), 1), MAX_COMMENTS_PAGE_SIZE)
+
+
+def comment_page(rows, limit):
+    """
+    Format one page of comments aggregated by json_agg, fetched with limit + 1 rows
+    Returns (comments, has_more, cursor) where cursor points at the last comment returned.
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    comments = [
+        {
+            'id': c['id'],
+            'three_word_id': c['three_word_id'],
+            'content': c['content'],
+            'created_at': c['created_at'],
+            'is_ai_analysis': c['is_ai_analysis'] or False,
+            'pending': c['status'] == 'pending'
+        }
+        for c in rows
+    ]
+    cursor = encode_comment_cursor(rows[-1]['published_at'], rows[-1]['id']) if rows else None
+    return comments, has_more, cursor
+
 
 @post_bp.route('', methods=['GET'])
 @optional_auth
@@ -22,7 +70,8 @@ def get_feed():
     query = """
         SELECT
             p.id, p.three_word_id, p.anonymized_content, p.clear_ask, p.title,
-            p.intent, p.topics, p.reaction_count, p.comment_count, p.created_at
+            p.intent, p.topics, p.reaction_count + pending_reaction_delta(p.id) AS reaction_count,
+            p.comment_count, p.created_at
         FROM posts p
         WHERE p.is_published = TRUE AND p.flagged = FALSE
     """
@@ -114,54 +163,55 @@ def get_post(post_id):
 
         return jsonify({'success': True}), 200
 
-    # GET request - existing logic
+    # GET request: post, viewer's reaction, author breakdown and the first
+    # page of comments in a single round trip
+    viewer_id = request.user['id'] if request.user else None
+    comment_limit = comments_limit_arg()
+
     post = db.execute("""
         SELECT
-            id, three_word_id, anonymized_content, clear_ask, title,
-            intent, topics, reaction_count, comment_count, created_at
-        FROM posts
-        WHERE id = %s AND is_published = TRUE
-    """, [post_id], fetch_one=True)
-
-    if not post:
-        return jsonify({'error': 'Post not found'}), 404
-
-    # Get comments
-    comments = db.execute("""
-        SELECT id, three_word_id, content, created_at
-        FROM comments
-        WHERE post_id = %s
-        ORDER BY created_at ASC
-    """, [post_id], fetch_all=True)
-
-    # Check user reaction if authenticated
-    user_reaction = None
-    is_author = False
-    reaction_breakdown = None
-
-    if request.user:
-        reaction = db.execute("""
+            p.id, p.three_word_id, p.anonymized_content, p.clear_ask, p.title,
+            p.intent, p.topics, p.reaction_count + pending_reaction_delta(p.id) AS reaction_count,
+            p.comment_count, p.created_at,
+            COALESCE(p.user_id = %(viewer_id)s, FALSE) AS is_author,
+            r.reaction_type AS user_reacted,
+            CASE WHEN p.user_id = %(viewer_id)s THEN COALESCE(b.breakdown, '{}'::json) END AS reaction_breakdown,
+            c.comments
+        FROM posts p
+        LEFT JOIN LATERAL (
             SELECT reaction_type FROM reactions
-            WHERE post_id = %s AND user_id = %s
-        """, [post_id, request.user['id']], fetch_one=True)
-        user_reaction = reaction['reaction_type'] if reaction else None
-
-        # Check if user is the author
-        author_check = db.execute("""
-            SELECT p.user_id FROM posts p WHERE p.id = %s
-        """, [post_id], fetch_one=True)
-
-        if author_check and str(author_check['user_id']) == str(request.user['id']):
-            is_author = True
-            # Get reaction breakdown for author
-            breakdown = db.execute("""
-                SELECT reaction_type, COUNT(*) as count
+            WHERE post_id = p.id AND user_id = %(viewer_id)s
+        ) r ON TRUE
+        LEFT JOIN LATERAL (
+            -- Reaction breakdown is only computed for the author
+            SELECT json_object_agg(reaction_type, count) AS breakdown
+            FROM (
+                SELECT reaction_type, COUNT(*) AS count
                 FROM reactions
-                WHERE post_id = %s
+                WHERE post_id = p.id AND p.user_id = %(viewer_id)s
                 GROUP BY reaction_type
-            """, [post_id], fetch_all=True)
+            ) counts
+        ) b ON TRUE
+        LEFT JOIN LATERAL (
+            -- Published comments, plus the viewer's own comments still in moderation
+            SELECT COALESCE(json_agg(page ORDER BY page.published_at, page.id), '[]'::json) AS comments
+            FROM (
+                SELECT id, three_word_id, content, status, is_ai_analysis, created_at, published_at
+                FROM comments
+                WHERE post_id = p.id
+                  AND (status = 'published' OR (status = 'pending' AND user_id = %(viewer_id)s))
+                ORDER BY published_at, id
+                LIMIT %(limit)s
+            ) page
+        ) c ON TRUE
+        WHERE p.id = %(post_id)s AND p.is_published = TRUE
+    """, {'post_id': post_id, 'viewer_id': viewer_id, 'limit': comment_limit + 1}, fetch_one=True)
+
+    if not post:
+        return jsonify({'error': 'Post not found'}), 404
 
-            reaction_breakdown = {r['reaction_type']: r['count'] for r in breakdown} if breakdown else {}
+    # One extra row was fetched to tell whether more comments follow
+    comments, has_more, cursor = comment_page(post['comments'], comment_limit)
 
     return jsonify({
         'post': {
@@ -175,20 +225,13 @@ def get_post(post_id):
             'reaction_count': post['reaction_count'],
             'comment_count': post['comment_count'],
             'created_at': post['created_at'].isoformat(),
-            'user_reacted': user_reaction,
-            'is_author': is_author,
-            'reaction_breakdown': reaction_breakdown
+            'user_reacted': post['user_reacted'],
+            'is_author': post['is_author'],
+            'reaction_breakdown': post['reaction_breakdown']
         },
-        'comments': [
-            {
-                'id': str(c['id']),
-                'three_word_id': c['three_word_id'],
-                'content': c['content'],
-                'created_at': c['created_at'].isoformat(),
-                'is_ai_analysis': c.get('is_ai_analysis', False)
-            }
-            for c in comments
-        ]
+        'comments': comments,
+        'comments_has_more': has_more,
+        'comments_cursor': cursor
     }), 200
 
 
@@ -203,7 +246,8 @@ def get_posts_by_identity(three_word_id):
     posts = db.execute("""
         SELECT
             id, three_word_id, anonymized_content, clear_ask, title,
-            intent, topics, reaction_count, comment_count, created_at
+            intent, topics, reaction_count + pending_reaction_delta(id) AS reaction_count,
+            comment_count, created_at
         FROM posts
         WHERE three_word_id = %s AND is_published = TRUE AND flagged = FALSE
         ORDER BY created_at DESC
@@ -287,7 +331,11 @@ def remove_reaction(post_id, reaction_type):
 @require_verified
 def add_comment(post_id):
     """Add comment to post with moderation"""
-    from services.moderation_service import moderate_comment
+    from services.moderation_service import (
+        moderate_comment, premoderate_comment, record_comment_violation, COMMENT_FLAG_LIMIT
+    )
+    from services.comment_moderation_worker import ASYNC_COMMENT_MODERATION, wake_comment_moderation
+    from services.llm_client import LLMUnavailableError
 
     data = request.get_json()
     content = data.get('content', '').strip()
@@ -297,49 +345,57 @@ def add_comment(post_id):
     if not content:
         return jsonify({'error': 'Comment content is required'}), 400
 
-    # Check if user is blocked from commenting
-    blocked = db.execute("""
-        SELECT id FROM blocked_users WHERE user_id = %s
-    """, [user_id], fetch_one=True)
+    # Check that the user isn't blocked and the post exists in one round trip
+    checks = db.execute("""
+        SELECT
+            EXISTS (SELECT 1 FROM blocked_users WHERE user_id = %s) AS blocked,
+            EXISTS (SELECT 1 FROM posts WHERE id = %s AND is_published = TRUE) AS post_exists
+    """, [user_id, post_id], fetch_one=True)
 
-    if blocked:
+    if checks['blocked']:
         return jsonify({
             'error': 'You have been blocked from commenting due to repeated violations.',
             'blocked': True
         }), 403
 
-    # Check if post exists
-    post = db.execute("""
-        SELECT id FROM posts WHERE id = %s AND is_published = TRUE
-    """, [post_id], fetch_one=True)
-
-    if not post:
+    if not checks['post_exists']:
         return jsonify({'error': 'Post not found'}), 404
 
-    # Moderate comment with Haiku
-    moderation = moderate_comment(content)
+    if ASYNC_COMMENT_MODERATION:
+        # Optimistic mode: only the local tier runs on the request path
+        moderation = premoderate_comment(content)
+        if moderation is None:
+            comment = db.execute("""
+                INSERT INTO comments (post_id, user_id, three_word_id, content, status)
+                VALUES (%s, %s, %s, %s, 'pending')
+                RETURNING id, three_word_id, content, status, created_at
+            """, [post_id, user_id, three_word_id, content], commit=True)
+
+            wake_comment_moderation()
+
+            return jsonify({
+                'success': True,
+                'pending': True,
+                'comment': {
+                    'id': str(comment['id']),
+                    'three_word_id': comment['three_word_id'],
+                    'content': comment['content'],
+                    'status': comment['status'],
+                    'created_at': comment['created_at'].isoformat()
+                }
+            }), 202
+    else:
+        # Moderate comment with Haiku
+        try:
+            moderation = moderate_comment(content)
+        except LLMUnavailableError as e:
+            return jsonify({'error': str(e), 'retryable': True}), 503
 
     if not moderation['approved']:
-        # Log the flagged comment
-        db.execute("""
-            INSERT INTO comment_flags (user_id, comment_content, flag_reason, severity)
-            VALUES (%s, %s, %s, %s)
-        """, [user_id, content, moderation['reason'], moderation.get('severity', 'medium')], commit=True)
-
-        # Check how many times this user has been flagged
-        flag_count = db.execute("""
-            SELECT COUNT(*) as count FROM comment_flags
-            WHERE user_id = %s AND created_at > NOW() - INTERVAL '30 days'
-        """, [user_id], fetch_one=True)
-
-        # Block user after 3 flagged attempts
-        if flag_count['count'] >= 3:
-            db.execute("""
-                INSERT INTO blocked_users (user_id, reason)
-                VALUES (%s, %s)
-                ON CONFLICT (user_id) DO NOTHING
-            """, [user_id, 'Repeated comment violations'], commit=True)
+        # Log the flagged comment and block the user after repeated violations
+        flag_count, user_blocked = record_comment_violation(user_id, content, moderation)
 
+        if user_blocked:
             return jsonify({
                 'error': 'Your comment was flagged and you have been blocked from commenting due to repeated violations.',
                 'blocked': True,
@@ -351,14 +407,14 @@ def add_comment(post_id):
             'error': 'Comment not approved',
             'flagged': True,
             'moderation': moderation,
-            'flags_remaining': 3 - flag_count['count']
+            'flags_remaining': COMMENT_FLAG_LIMIT - flag_count
         }), 400
 
     # Create comment (approved by moderation)
     comment = db.execute("""
         INSERT INTO comments (post_id, user_id, three_word_id, content)
         VALUES (%s, %s, %s, %s)
-        RETURNING id, three_word_id, content, created_at
+        RETURNING id, three_word_id, content, status, created_at
     """, [post_id, user_id, three_word_id, content], commit=True)
 
     return jsonify({
@@ -367,11 +423,78 @@ def add_comment(post_id):
             'id': str(comment['id']),
             'three_word_id': comment['three_word_id'],
             'content': comment['content'],
+            'status': comment['status'],
             'created_at': comment['created_at'].isoformat()
         }
     }), 201
 
 
+@post_bp.route('/<post_id>/comments', methods=['GET'])
+@optional_auth
+def get_comments(post_id):
+    """
+    Page through a post's comments in the order they became visible, keyed on (published_at, id)
+    Pass ?after=<cursor> from the post or a previous page to load the next page;
+    once has_more is false, polling with the latest cursor returns newer comments,
+    including ones published after background moderation. A pending comment is
+    positioned at its insert time until it is published.
+    """
+    viewer_id = request.user['id'] if request.user else None
+    limit = comments_limit_arg('limit')
+
+    params = {'post_id': post_id, 'viewer_id': viewer_id, 'limit': limit + 1}
+    after_clause = ''
+    if request.args.get('after'):
+        try:
+            params['after_published_at'], params['after_id'] = decode_comment_cursor(request.args['after'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        after_clause = "AND (c.published_at, c.id) > (%(after_published_at)s::timestamp, %(after_id)s::uuid)"
+
+    result = db.execute(f"""
+        SELECT COALESCE(json_agg(page ORDER BY page.published_at, page.id), '[]'::json) AS comments
+        FROM (
+            SELECT c.id, c.three_word_id, c.content, c.status, c.is_ai_analysis, c.created_at, c.published_at
+            FROM comments c
+            JOIN posts p ON p.id = c.post_id AND p.is_published = TRUE
+            WHERE c.post_id = %(post_id)s
+              {after_clause}
+              AND (c.status = 'published' OR (c.status = 'pending' AND c.user_id = %(viewer_id)s))
+            ORDER BY c.published_at, c.id
+            LIMIT %(limit)s
+        ) page
+    """, params, fetch_one=True)
+
+    comments, has_more, cursor = comment_page(result['comments'], limit)
+
+    return jsonify({
+        'comments': comments,
+        'has_more': has_more,
+        # Keep the caller's position when nothing newer exists yet
+        'cursor': cursor or request.args.get('after')
+    }), 200
+
+
+@post_bp.route('/<post_id>/comment/<comment_id>', methods=['GET'])
+@require_verified
+def get_comment_status(post_id, comment_id):
+    """Get moderation status of the author's own comment"""
+    comment = db.execute("""
+        SELECT id, status, moderation_reason
+        FROM comments
+        WHERE id = %s AND post_id = %s AND user_id = %s
+    """, [comment_id, post_id, request.user['id']], fetch_one=True)
+
+    if not comment:
+        return jsonify({'error': 'Comment not found'}), 404
+
+    return jsonify({
+        'id': str(comment['id']),
+        'status': comment['status'],
+        'moderation_reason': comment['moderation_reason'] if comment['status'] == 'retracted' else None
+    }), 200
+
+
 @post_bp.route('/<post_id>/flag', methods=['POST'])
 @require_verified
 def flag_post(post_id):
@@ -417,7 +540,8 @@ def get_my_posts():
     posts = db.execute("""
         SELECT
             p.id, p.three_word_id, p.title, p.anonymized_content, p.clear_ask,
-            p.intent, p.topics, p.reaction_count, p.comment_count, p.created_at,
+            p.intent, p.topics, p.reaction_count + pending_reaction_delta(p.id) AS reaction_count,
+            p.comment_count, p.created_at,
             p.session_id, p.is_published
         FROM posts p
         WHERE p.user_id = %s
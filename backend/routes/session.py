@@ -3,12 +3,17 @@
 from flask import Blueprint, request, jsonify
 from middleware.auth_middleware import require_verified
 from services.database import db
+from services.concurrency import run_concurrently, run_in_background
 from services.claude_service import complete_analysis
-from services.encryption_service import encrypt_content, decrypt_content
+from services.llm_client import LLMUnavailableError
+from services.encryption_service import encrypt_content, encrypt_excerpt, make_excerpt, decrypt_content, decrypt_many
 from services.email_service import send_analysis_todos_email
 
 session_bp = Blueprint('session', __name__)
 
+# Most recent entries ?q= searches; older ones need a narrower topic filter
+SEARCH_MAX_CANDIDATES = 500
+
 
 @session_bp.route('/start', methods=['POST'])
 @require_verified
@@ -51,19 +56,58 @@ def autosave_session(session_id):
     if not session:
         return jsonify({'error': 'Session not found'}), 404
 
-    # Encrypt content before saving
+    # Encrypt content and its list-view excerpt before saving
     encrypted_content = encrypt_content(content)
+    encrypted_excerpt = encrypt_excerpt(content)
 
     # Update content
     db.execute("""
         UPDATE sessions
-        SET raw_content = %s
+        SET raw_content = %s,
+            excerpt = %s
         WHERE id = %s
-    """, [encrypted_content, session_id], commit=True)
+    """, [encrypted_content, encrypted_excerpt, session_id], commit=True)
 
     return jsonify({'success': True}), 200
 
 
+def fetch_linked_sessions(session_ids, user_id):
+    """Decrypted completed sessions the user linked to a new entry"""
+    if not session_ids:
+        return []
+
+    linked_sessions_raw = db.execute("""
+        SELECT id, title, raw_content, ai_analysis, topics, completed_at
+        FROM sessions
+        WHERE id = ANY(%s::uuid[]) AND user_id = %s AND completed_at IS NOT NULL
+        ORDER BY completed_at DESC
+    """, [session_ids, user_id], fetch_all=True)
+
+    # Decrypt linked sessions
+    linked_contents = decrypt_many(s['raw_content'] for s in linked_sessions_raw)
+    return [
+        {
+            'title': s.get('title', 'untitled'),
+            'content': linked_content,
+            'topics': s.get('topics', []) or [],
+            'completed_at': s['completed_at'].isoformat() if s['completed_at'] else None
+        }
+        for s, linked_content in zip(linked_sessions_raw, linked_contents)
+    ]
+
+
+def fetch_historical_topics(user_id):
+    """All topics from this user's previous sessions"""
+    user_topics_result = db.execute("""
+        SELECT DISTINCT unnest(topics) as topic
+        FROM sessions
+        WHERE user_id = %s AND topics IS NOT NULL AND array_length(topics, 1) > 0
+        ORDER BY topic
+    """, [user_id], fetch_all=True)
+
+    return [t['topic'] for t in user_topics_result] if user_topics_result else []
+
+
 @session_bp.route('/<session_id>/analyze', methods=['POST'])
 @require_verified
 def analyze_session(session_id):
@@ -77,55 +121,33 @@ def analyze_session(session_id):
     if not content:
         return jsonify({'error': 'Content is required'}), 400
 
-    # Verify session belongs to user
-    session = db.execute("""
-        SELECT intent FROM sessions
-        WHERE id = %s AND user_id = %s
-    """, [session_id, user_id], fetch_one=True)
+    # Limit to 2 previous sessions
+    limited_ids = linked_session_ids[:2] if linked_session_ids else []
+
+    # The ownership check, the linked sessions and the user's past topics
+    # don't depend on each other, so fetch them side by side
+    session, linked_sessions, user_historical_topics = run_concurrently(
+        lambda: db.execute("""
+            SELECT intent FROM sessions
+            WHERE id = %s AND user_id = %s
+        """, [session_id, user_id], fetch_one=True),
+        lambda: fetch_linked_sessions(limited_ids, user_id),
+        lambda: fetch_historical_topics(user_id)
+    )
 
     if not session:
         return jsonify({'error': 'Session not found'}), 404
 
-    # Fetch linked sessions if any (max 2)
-    linked_sessions = []
-    limited_ids = []
-    if linked_session_ids and len(linked_session_ids) > 0:
-        # Limit to 2 previous sessions
-        limited_ids = linked_session_ids[:2]
-
-        linked_sessions_raw = db.execute("""
-            SELECT id, title, raw_content, ai_analysis, topics, completed_at
-            FROM sessions
-            WHERE id = ANY(%s::uuid[]) AND user_id = %s AND completed_at IS NOT NULL
-            ORDER BY completed_at DESC
-        """, [limited_ids, user_id], fetch_all=True)
-
-        # Decrypt linked sessions
-        for s in linked_sessions_raw:
-            linked_sessions.append({
-                'title': s.get('title', 'untitled'),
-                'content': decrypt_content(s['raw_content']) if s['raw_content'] else '',
-                'topics': s.get('topics', []) or [],
-                'completed_at': s['completed_at'].isoformat() if s['completed_at'] else None
-            })
-
-    # Fetch all historical topics from this user's previous sessions
-    user_topics_result = db.execute("""
-        SELECT DISTINCT unnest(topics) as topic
-        FROM sessions
-        WHERE user_id = %s AND topics IS NOT NULL AND array_length(topics, 1) > 0
-        ORDER BY topic
-    """, [user_id], fetch_all=True)
-
-    user_historical_topics = [t['topic'] for t in user_topics_result] if user_topics_result else []
-
     # Get Claude analysis with linked sessions and historical topics
-    analysis = complete_analysis(
-        content,
-        session['intent'],
-        linked_sessions=linked_sessions,
-        user_historical_topics=user_historical_topics
-    )
+    try:
+        analysis = complete_analysis(
+            content,
+            session['intent'],
+            linked_sessions=linked_sessions,
+            user_historical_topics=user_historical_topics
+        )
+    except LLMUnavailableError as e:
+        return jsonify({'error': str(e), 'retryable': True}), 503
 
     # Store safety check result, topics, and auto-generated title
     safety = analysis.get('safety_check', {})
@@ -138,8 +160,9 @@ def analyze_session(session_id):
     is_safe_for_sharing = suggested_post.get('safe_to_publish', False)
     safety_notes = suggested_post.get('safety_notes', '')
 
-    # Encrypt content before saving
+    # Encrypt content and its list-view excerpt before saving
     encrypted_content = encrypt_content(content)
+    encrypted_excerpt = encrypt_excerpt(content)
     word_count = len(content.split()) if content else 0
 
     # Get the private reflection text
@@ -150,6 +173,7 @@ def analyze_session(session_id):
         UPDATE sessions
         SET title = %s,
             raw_content = %s,
+            excerpt = %s,
             ai_analysis = %s,
             duration_seconds = %s,
             word_count = %s,
@@ -160,7 +184,7 @@ def analyze_session(session_id):
             linked_sessions = %s::uuid[],
             completed_at = NOW()
         WHERE id = %s
-    """, [journal_title, encrypted_content, private_reflection, duration_seconds, word_count, is_safe_for_sharing, safety_notes if safety_notes else safety.get('reason', ''), recommend_help, topics, limited_ids if linked_session_ids else [], session_id], commit=True)
+    """, [journal_title, encrypted_content, encrypted_excerpt, private_reflection, duration_seconds, word_count, is_safe_for_sharing, safety_notes if safety_notes else safety.get('reason', ''), recommend_help, topics, limited_ids if linked_session_ids else [], session_id], commit=True)
 
     return jsonify({
         'analysis': analysis
@@ -195,20 +219,22 @@ def save_private(session_id):
     if not session:
         return jsonify({'error': 'Session not found'}), 404
 
-    # Encrypt content before saving
+    # Encrypt content and its list-view excerpt before saving
     encrypted_content = encrypt_content(content)
+    encrypted_excerpt = encrypt_excerpt(content)
 
     # Update session
     db.execute("""
         UPDATE sessions
         SET title = %s,
             raw_content = %s,
+            excerpt = %s,
             ai_analysis = %s,
             duration_seconds = %s,
             word_count = %s,
             completed_at = NOW()
         WHERE id = %s
-    """, [title, encrypted_content, ai_analysis, duration_seconds, word_count, session_id], commit=True)
+    """, [title, encrypted_content, encrypted_excerpt, ai_analysis, duration_seconds, word_count, session_id], commit=True)
 
     return jsonify({'success': True}), 200
 
@@ -217,7 +243,7 @@ def save_private(session_id):
 @require_verified
 def share_session(session_id):
     """Share session as public post"""
-    from services.search_service import store_post_with_embedding
+    from services.search_service import get_embedding, store_post_with_embedding
 
     data = request.get_json()
     user_id = request.user['id']
@@ -250,22 +276,28 @@ def share_session(session_id):
             'reason': session.get('safety_reason', 'Content did not pass safety check')
         }), 403
 
+    # Embed the post while the session is saved; started only once the share
+    # is allowed, so a refused share never sends the text to the embedding API
+    embedding_future = run_in_background(get_embedding, anonymized_content)
+
     # Save session privately first
     duration_seconds = data.get('duration_seconds', 0)
     word_count = len(original_content.split())
 
-    # Encrypt content before saving
+    # Encrypt content and its list-view excerpt before saving
     encrypted_content = encrypt_content(original_content)
+    encrypted_excerpt = encrypt_excerpt(original_content)
 
     db.execute("""
         UPDATE sessions
         SET raw_content = %s,
+            excerpt = %s,
             ai_analysis = %s,
             duration_seconds = %s,
             word_count = %s,
             completed_at = NOW()
         WHERE id = %s
-    """, [encrypted_content, ai_analysis, duration_seconds, word_count, session_id], commit=True)
+    """, [encrypted_content, encrypted_excerpt, ai_analysis, duration_seconds, word_count, session_id], commit=True)
 
     # Create public post with embedding and title
     post_data = {
@@ -280,7 +312,7 @@ def share_session(session_id):
         'topics': topics
     }
 
-    post_id = store_post_with_embedding(post_data)
+    post_id = store_post_with_embedding(post_data, embedding=embedding_future.result())
 
     # AI analysis stays private in the journal, not added as a comment to the public post
 
@@ -293,69 +325,126 @@ def share_session(session_id):
 @session_bp.route('/mine', methods=['GET'])
 @require_verified
 def get_my_sessions():
-    """Get my private sessions with optional topic filtering"""
+    """
+    Get my private sessions with optional topic filtering and search
+
+    ?view=list returns summaries only (title, topics, date, excerpt) without
+    decrypting full entries; open a single session via GET /<session_id>.
+    ?q= matches the title and analysis in SQL and the stored excerpt (entries
+    are encrypted, so full bodies aren't searched) over the latest
+    SEARCH_MAX_CANDIDATES entries; search_limited says when older ones were
+    left out. Only the returned page's bodies are decrypted.
+    """
     user_id = request.user['id']
     page = int(request.args.get('page', 1))
     limit = int(request.args.get('limit', 20))
     offset = (page - 1) * limit
     topic_filter = request.args.get('topic', '').strip()
+    search = request.args.get('q', '').strip().lower()
+    list_view = request.args.get('view') == 'list'
+
+    if list_view:
+        # Only sessions without a stored excerpt yet fall back to the full body
+        columns = """s.id, s.intent, s.title, s.completed_at, s.topics, s.word_count, s.excerpt,
+                   CASE WHEN s.excerpt IS NULL THEN s.raw_content END AS raw_content,
+                   COALESCE(s.ai_analysis, '') <> '' AS has_analysis"""
+    else:
+        columns = "s.id, s.intent, s.title, s.raw_content, s.ai_analysis, s.completed_at, s.topics"
 
-    # Build query with optional topic filter
-    # Topics are now stored directly in sessions table
     # Show all completed sessions (even if published as posts)
+    # Topics are now stored directly in sessions table
+    conditions = "s.user_id = %(user_id)s AND s.completed_at IS NOT NULL"
+    params = {'user_id': user_id, 'limit': limit, 'offset': offset}
     if topic_filter:
-        sessions = db.execute("""
-            SELECT s.id, s.intent, s.title, s.raw_content, s.ai_analysis, s.completed_at, s.topics,
-                   p.id as post_id, p.three_word_id as post_three_word_id
+        conditions += " AND (s.topics IS NULL OR %(topic)s = ANY(s.topics))"
+        params['topic'] = topic_filter
+
+    search_limited = False
+    if search:
+        # Title and analysis are plaintext; only the other rows' excerpts are decrypted
+        candidates = db.execute(f"""
+            SELECT s.id, s.excerpt,
+                   CASE WHEN s.excerpt IS NULL THEN s.raw_content END AS raw_content,
+                   (POSITION(%(search)s IN LOWER(COALESCE(s.title, ''))) > 0
+                    OR POSITION(%(search)s IN LOWER(COALESCE(s.ai_analysis, ''))) > 0) AS matched
             FROM sessions s
-            LEFT JOIN posts p ON p.session_id = s.id
-            WHERE s.user_id = %s AND s.completed_at IS NOT NULL AND (s.topics IS NULL OR %s = ANY(s.topics))
+            WHERE {conditions}
             ORDER BY s.completed_at DESC NULLS LAST
-            LIMIT %s OFFSET %s
-        """, [user_id, topic_filter, limit, offset], fetch_all=True)
+            LIMIT %(max_candidates)s
+        """, {**params, 'search': search, 'max_candidates': SEARCH_MAX_CANDIDATES + 1}, fetch_all=True)
 
-        total_result = db.execute("""
-            SELECT COUNT(*) as count
-            FROM sessions s
-            WHERE s.user_id = %s AND s.completed_at IS NOT NULL AND (s.topics IS NULL OR %s = ANY(s.topics))
-        """, [user_id, topic_filter], fetch_one=True)
-    else:
-        sessions = db.execute("""
-            SELECT s.id, s.intent, s.title, s.raw_content, s.ai_analysis, s.completed_at, s.topics,
-                   p.id as post_id, p.three_word_id as post_three_word_id
-            FROM sessions s
-            LEFT JOIN posts p ON p.session_id = s.id
-            WHERE s.user_id = %s AND s.completed_at IS NOT NULL
-            ORDER BY s.completed_at DESC NULLS LAST
-            LIMIT %s OFFSET %s
-        """, [user_id, limit, offset], fetch_all=True)
+        search_limited = len(candidates) > SEARCH_MAX_CANDIDATES
+        candidates = candidates[:SEARCH_MAX_CANDIDATES]
+
+        unmatched = [c for c in candidates if not c['matched']]
+        texts = decrypt_many(c['excerpt'] if c['excerpt'] is not None else c['raw_content'] for c in unmatched)
+        excerpt_hits = {c['id'] for c, text in zip(unmatched, texts) if search in text.lower()}
+        matching_ids = [str(c['id']) for c in candidates if c['matched'] or c['id'] in excerpt_hits]
 
-        total_result = db.execute("""
+        # The page is already cut; fetch it by id in the same order
+        conditions += " AND s.id = ANY(%(ids)s::uuid[])"
+        params.update(ids=matching_ids[offset:offset + limit], offset=0)
+        total_result = {'count': len(matching_ids)}
+    else:
+        total_result = db.execute(f"""
             SELECT COUNT(*) as count
             FROM sessions s
-            WHERE s.user_id = %s AND s.completed_at IS NOT NULL
-        """, [user_id], fetch_one=True)
+            WHERE {conditions}
+        """, params, fetch_one=True)
+
+    sessions = db.execute(f"""
+        SELECT {columns},
+               p.id as post_id, p.three_word_id as post_three_word_id
+        FROM sessions s
+        LEFT JOIN posts p ON p.session_id = s.id
+        WHERE {conditions}
+        ORDER BY s.completed_at DESC NULLS LAST
+        LIMIT %(limit)s OFFSET %(offset)s
+    """, params, fetch_all=True)
 
     total = total_result['count']
 
-    return jsonify({
-        'sessions': [
+    if list_view:
+        excerpts = decrypt_many(s['excerpt'] if s['excerpt'] is not None else s['raw_content'] for s in sessions)
+        session_list = [
             {
                 'id': str(s['id']),
                 'intent': s['intent'],
                 'title': s.get('title', 'untitled'),
-                'raw_content': decrypt_content(s['raw_content']) if s['raw_content'] else '',
+                'excerpt': excerpt if s['excerpt'] is not None else make_excerpt(excerpt),
+                'word_count': s.get('word_count', 0),
+                'has_analysis': s['has_analysis'],
+                'completed_at': s['completed_at'].isoformat() if s['completed_at'] else None,
+                'topics': s.get('topics', []) or [],
+                'post_id': str(s['post_id']) if s.get('post_id') else None,
+                'post_three_word_id': s.get('post_three_word_id')
+            }
+            for s, excerpt in zip(sessions, excerpts)
+        ]
+    else:
+        # Decrypt the whole page in one batch
+        contents = decrypt_many(s['raw_content'] for s in sessions)
+        session_list = [
+            {
+                'id': str(s['id']),
+                'intent': s['intent'],
+                'title': s.get('title', 'untitled'),
+                'raw_content': content,
                 'ai_analysis': s['ai_analysis'],
                 'completed_at': s['completed_at'].isoformat() if s['completed_at'] else None,
                 'topics': s.get('topics', []) or [],
                 'post_id': str(s['post_id']) if s.get('post_id') else None,
                 'post_three_word_id': s.get('post_three_word_id')
             }
-            for s in sessions
-        ],
+            for s, content in zip(sessions, contents)
+        ]
+
+    return jsonify({
+        'sessions': session_list,
         'total': total,
         'page': page,
-        'pages': (total + limit - 1) // limit
+        'pages': (total + limit - 1) // limit,
+        'search_limited': search_limited
     }), 200
 
 
@@ -462,16 +551,18 @@ def edit_session(session_id):
     if session.get('ai_analysis'):
         return jsonify({'error': 'Cannot edit analyzed sessions'}), 403
 
-    # Encrypt content before saving
+    # Encrypt content and its list-view excerpt before saving
     encrypted_content = encrypt_content(content)
+    encrypted_excerpt = encrypt_excerpt(content)
 
     # Update content
     db.execute("""
         UPDATE sessions
         SET raw_content = %s,
+            excerpt = %s,
             word_count = %s
         WHERE id = %s
-    """, [encrypted_content, len(content.split()), session_id], commit=True)
+    """, [encrypted_content, encrypted_excerpt, len(content.split()), session_id], commit=True)
 
     return jsonify({'success': True}), 200
 
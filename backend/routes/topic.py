@@ -97,7 +97,8 @@ def get_topic_posts(topic):
     posts = db.execute("""
         SELECT
             id, three_word_id, anonymized_content, clear_ask,
-            intent, topics, reaction_count, comment_count, created_at
+            intent, topics, reaction_count + pending_reaction_delta(id) AS reaction_count,
+            comment_count, created_at
         FROM posts
         WHERE %s = ANY(topics) AND is_published = TRUE AND flagged = FALSE
         ORDER BY created_at DESC
@@ -0,0 +1,90 @@
+-- Realtime feed events over LISTEN/NOTIFY.
+-- Row triggers on posts, comments and reactions publish small JSON deltas on
+-- the feed_events channel once the writing transaction commits. Each app
+-- worker holds one LISTEN connection (services/realtime_service.py) and fans
+-- the events out to its SSE clients. Payloads carry ids and deltas only, never
+-- content, and stay well under the 8000-byte NOTIFY limit. Every payload
+-- includes a row id so Postgres does not merge distinct events raised in the
+-- same transaction.
+
+-- New published posts
+CREATE OR REPLACE FUNCTION notify_post_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.is_published AND NOT NEW.flagged
+       AND (TG_OP = 'INSERT' OR NOT OLD.is_published) THEN
+        PERFORM pg_notify('feed_events', json_build_object(
+            'type', 'post',
+            'post_id', NEW.id
+        )::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS post_notify_trigger ON posts;
+CREATE TRIGGER post_notify_trigger
+AFTER INSERT OR UPDATE OF is_published ON posts
+FOR EACH ROW EXECUTE FUNCTION notify_post_event();
+
+-- Comments becoming visible (inserted published, or published after moderation) or removed
+CREATE OR REPLACE FUNCTION notify_comment_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        IF OLD.status = 'published' THEN
+            PERFORM pg_notify('feed_events', json_build_object(
+                'type', 'comment_removed',
+                'post_id', OLD.post_id,
+                'comment_id', OLD.id
+            )::text);
+        END IF;
+    ELSIF NEW.status = 'published' AND (TG_OP = 'INSERT' OR OLD.status <> 'published') THEN
+        PERFORM pg_notify('feed_events', json_build_object(
+            'type', 'comment',
+            'post_id', NEW.post_id,
+            'comment_id', NEW.id
+        )::text);
+    ELSIF TG_OP = 'UPDATE' AND OLD.status = 'published' AND NEW.status <> 'published' THEN
+        PERFORM pg_notify('feed_events', json_build_object(
+            'type', 'comment_removed',
+            'post_id', NEW.post_id,
+            'comment_id', NEW.id
+        )::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS comment_notify_trigger ON comments;
+CREATE TRIGGER comment_notify_trigger
+AFTER INSERT OR DELETE OR UPDATE OF status ON comments
+FOR EACH ROW EXECUTE FUNCTION notify_comment_event();
+
+-- Reactions added or removed
+CREATE OR REPLACE FUNCTION notify_reaction_event()
+RETURNS TRIGGER AS $$
+DECLARE
+    r reactions%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        r := OLD;
+    ELSE
+        r := NEW;
+    END IF;
+
+    PERFORM pg_notify('feed_events', json_build_object(
+        'type', 'reaction',
+        'post_id', r.post_id,
+        'reaction_id', r.id,
+        'reaction_type', r.reaction_type,
+        'delta', CASE WHEN TG_OP = 'DELETE' THEN -1 ELSE 1 END
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS reaction_notify_trigger ON reactions;
+CREATE TRIGGER reaction_notify_trigger
+AFTER INSERT OR DELETE ON reactions
+FOR EACH ROW EXECUTE FUNCTION notify_reaction_event();
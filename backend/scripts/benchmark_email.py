@@ -0,0 +1,118 @@
+"""Benchmark queueing approval emails for a large batch of applicants
+
+Compares the per-email path (render, encrypt, one outbox INSERT and commit
+each, one email_logs INSERT each) with send_application_approved_emails
+(template rendered and encrypted once, one multi-row insert) and the buffered
+email_logs writer. The render/encrypt section needs no database; the queue
+and log sections run when DATABASE_URL is set, using throwaway
+bench-approve-*@example.invalid addresses that are removed afterwards.
+Nothing is delivered: the outbox rows are deleted before the sender sees them
+(do not run it against a database an app worker is draining).
+
+Usage:
+    python scripts/benchmark_email.py [--applicants 5000]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import from services
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from cryptography.fernet import Fernet
+
+if not os.environ.get('ENCRYPTION_KEY'):
+    os.environ['ENCRYPTION_KEY'] = Fernet.generate_key().decode()
+
+from services import email_service
+from services.database import db
+from services.email_templates import APPLICATION_APPROVED
+from services.encryption_service import encrypt_content
+
+EMAIL_PATTERN = 'bench-approve-%@example.invalid'
+
+
+def timed(label, count, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<48} {elapsed:7.3f}s  {count / elapsed:10,.0f} emails/s")
+    return result
+
+
+def queue_one_by_one(emails):
+    """The per-email path: one INSERT and commit per applicant"""
+    for to_email in emails:
+        db.execute("""
+            INSERT INTO email_outbox
+                (to_email, subject, html_content, email_type, from_email, from_name, reply_to, priority)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, [
+            to_email, APPLICATION_APPROVED.subject, encrypt_content(APPLICATION_APPROVED.render()),
+            'application_approved', email_service.FRED_EMAIL, email_service.FRED_NAME, None,
+            email_service.PRIORITY_NORMAL
+        ], commit=True)
+
+
+def log_one_by_one(emails):
+    for to_email in emails:
+        db.execute("""
+            INSERT INTO email_logs (email, email_type, sendgrid_message_id, status)
+            VALUES (%s, %s, %s, %s)
+        """, [to_email, 'application_approved', None, 'sent'], commit=True)
+
+
+def log_buffered(emails):
+    for to_email in emails:
+        email_service.log_email(to_email, 'application_approved', None, 'sent')
+    email_service.flush_email_logs()
+
+
+def cleanup():
+    db.execute("DELETE FROM email_outbox WHERE to_email LIKE %s", [EMAIL_PATTERN], commit=True)
+    db.execute("DELETE FROM email_logs WHERE email LIKE %s", [EMAIL_PATTERN], commit=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--applicants', type=int, default=5000)
+    args = parser.parse_args()
+
+    n = args.applicants
+    emails = [EMAIL_PATTERN.replace('%', str(i)) for i in range(n)]
+    print(f"{n} approval emails\n")
+
+    print("render and encrypt")
+    timed("per email", n, lambda: [encrypt_content(APPLICATION_APPROVED.render()) for _ in emails])
+    timed("once per batch (cached template)", n, lambda: encrypt_content(APPLICATION_APPROVED.render()))
+
+    if not os.environ.get('DATABASE_URL'):
+        print("\nDATABASE_URL not set; skipping the outbox and email_logs sections")
+        return
+
+    # Measure the real insert even if EMAIL_ENABLED=false locally; no sender runs in this process
+    email_service.EMAIL_ENABLED = True
+    try:
+        cleanup()
+        print("\nqueue in email_outbox")
+        timed("one INSERT + commit per email", n, lambda: queue_one_by_one(emails))
+        cleanup()
+        timed("send_application_approved_emails", n, lambda: email_service.send_application_approved_emails(emails))
+        cleanup()
+
+        print("\nwrite email_logs")
+        timed("one INSERT + commit per email", n, lambda: log_one_by_one(emails))
+        cleanup()
+        timed("buffered, flushed with execute_values", n, lambda: log_buffered(emails))
+    finally:
+        cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark journal encryption throughput
+
+Compares building a Fernet per call (the old behaviour) with the shared
+cipher from services/encryption_service, and measures decrypting entries
+written under an older key after rotation. No database needed.
+
+Usage:
+    python scripts/benchmark_encryption.py [--entries 10000] [--words 300]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import from services
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cryptography.fernet import Fernet
+from services import encryption_service
+
+WORDS = "building shipping launch users burnout cofounder pricing runway feedback late night tired hopeful stuck".split()
+
+
+def make_entries(count, words):
+    rng = random.Random(42)
+    return [' '.join(rng.choice(WORDS) for _ in range(words)) for _ in range(count)]
+
+
+def timed(label, count, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<44} {elapsed:7.3f}s  {count / elapsed:10,.0f} entries/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=10000)
+    parser.add_argument('--words', type=int, default=300, help='words per journal entry')
+    args = parser.parse_args()
+
+    old_key = Fernet.generate_key().decode()
+    new_key = Fernet.generate_key().decode()
+    entries = make_entries(args.entries, args.words)
+    n = len(entries)
+    print(f"{n} entries of {args.words} words\n")
+
+    def per_call_encrypt():
+        return [Fernet(os.environ['ENCRYPTION_KEY'].encode()).encrypt(e.encode()).decode() for e in entries]
+
+    def per_call_decrypt(tokens):
+        return [Fernet(os.environ['ENCRYPTION_KEY'].encode()).decrypt(t.encode()).decode() for t in tokens]
+
+    print("single key")
+    os.environ['ENCRYPTION_KEY'] = old_key
+    encryption_service.reset_cipher()
+    tokens = timed("encrypt, new Fernet per call", n, per_call_encrypt)
+    timed("decrypt, new Fernet per call", n, lambda: per_call_decrypt(tokens))
+    tokens = timed("encrypt, shared cipher", n, lambda: [encryption_service.encrypt_content(e) for e in entries])
+    timed("decrypt, shared cipher", n, lambda: [encryption_service.decrypt_content(t) for t in tokens])
+    timed(f"decrypt_many ({encryption_service.DECRYPT_WORKERS} threads)", n, lambda: encryption_service.decrypt_many(tokens))
+    page = tokens[:20]
+    timed("decrypt_many, 20-entry journal page x500", 20 * 500, lambda: [encryption_service.decrypt_many(page) for _ in range(500)])
+
+    print("\nafter rotation (ENCRYPTION_KEY=new,old)")
+    os.environ['ENCRYPTION_KEY'] = f"{new_key},{old_key}"
+    encryption_service.reset_cipher()
+    timed("decrypt old-key entries, shared MultiFernet", n, lambda: [encryption_service.decrypt_content(t) for t in tokens])
+    rotated = timed("rotate old-key entries to new key", n, lambda: [encryption_service.rotate_content(t) for t in tokens])
+    timed("decrypt rotated entries, shared MultiFernet", n, lambda: [encryption_service.decrypt_content(t) for t in rotated])
+    stale = timed("needs_rotation check on rotated entries", n, lambda: sum(encryption_service.needs_rotation(t) for t in rotated))
+    print(f"\n  entries still on old key after rotation: {stale}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Benchmark OTP login latency at a simulated database round-trip time
+
+Compares the old login data path (verify_otp, get_or_create_user and
+get_user_application_status: a chain of sequential queries, kept here as the
+baseline) with the single statement in login_with_otp. Every execute and commit sleeps for --rtt-ms
+before going to the database, so a local Postgres behaves like a remote one.
+Uses throwaway bench-login-*@example.invalid accounts and removes them
+afterwards; point it at a development database.
+
+Usage:
+    python scripts/benchmark_login.py [--logins 50] [--rtt-ms 30]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path to import from services
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import psycopg2
+import psycopg2.extensions
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services import database
+from services.auth_service import create_otp, get_user_application_status, login_with_otp
+
+EMAIL_PATTERN = 'bench-login-%@example.invalid'
+
+rtt = 0.0
+round_trips = 0
+_slow_cursors = {}
+
+
+def _round_trip():
+    global round_trips
+    round_trips += 1
+    time.sleep(rtt)
+
+
+def _slow_cursor(factory):
+    """Subclass a cursor class so every execute pays one round trip"""
+    if factory not in _slow_cursors:
+        def execute(self, query, vars=None):
+            _round_trip()
+            return factory.execute(self, query, vars)
+        _slow_cursors[factory] = type(f"Slow{factory.__name__}", (factory,), {'execute': execute})
+    return _slow_cursors[factory]
+
+
+class SlowConnection(psycopg2.extensions.connection):
+    """Connection that adds the simulated round-trip time to executes and commits"""
+
+    def cursor(self, *args, **kwargs):
+        kwargs['cursor_factory'] = _slow_cursor(kwargs.get('cursor_factory') or psycopg2.extensions.cursor)
+        return super().cursor(*args, **kwargs)
+
+    def commit(self):
+        _round_trip()
+        return super().commit()
+
+
+def verify_otp(email, code, purpose='login'):
+    """Old path: verify OTP code"""
+    result = database.db.execute("""
+        SELECT id, expires_at, used
+        FROM otp_codes
+        WHERE email = %s AND code = %s AND purpose = %s
+        ORDER BY created_at DESC
+        LIMIT 1
+    """, [email, code, purpose], fetch_one=True)
+
+    if not result:
+        return False
+
+    if result['used']:
+        return False
+
+    if datetime.now() > result['expires_at']:
+        return False
+
+    # Mark as used
+    database.db.execute("""
+        UPDATE otp_codes SET used = TRUE WHERE id = %s
+    """, [result['id']], commit=True)
+
+    return True
+
+
+def get_or_create_user(email):
+    """Old path: get existing user or create new one"""
+    user = database.db.execute("""
+        SELECT id, email, three_word_id, is_admin, theme_preference
+        FROM users WHERE email = %s
+    """, [email], fetch_one=True)
+
+    if user:
+        # Update last active
+        database.db.execute("""
+            UPDATE users SET last_active = NOW() WHERE id = %s
+        """, [user['id']], commit=True)
+        return dict(user)
+
+    # Create new user
+    new_user = database.db.execute("""
+        INSERT INTO users (email)
+        VALUES (%s)
+        RETURNING id, email, three_word_id, is_admin, theme_preference
+    """, [email], commit=True)
+
+    return dict(new_user)
+
+
+def old_login(email, code):
+    if not verify_otp(email, code):
+        raise RuntimeError('OTP rejected')
+    user = get_or_create_user(email)
+    get_user_application_status(user['id'])
+
+
+def new_login(email, code):
+    user, _ = login_with_otp(email, code)
+    if not user:
+        raise RuntimeError('OTP rejected')
+
+
+def measure(label, logins, login):
+    global round_trips
+    timings = []
+    trips = 0
+    for i in range(logins):
+        # The first half of the logins create accounts, the second half return to them
+        email = EMAIL_PATTERN.replace('%', str(i % max(logins // 2, 1)))
+        code = create_otp(email)
+        round_trips = 0
+        started = time.perf_counter()
+        login(email, code)
+        timings.append((time.perf_counter() - started) * 1000)
+        trips += round_trips
+
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"  {label:<36} median {statistics.median(timings):7.1f}ms  p95 {p95:7.1f}ms  "
+          f"{trips / logins:4.1f} round trips/login")
+
+
+def cleanup():
+    database.db.execute("DELETE FROM otp_codes WHERE email LIKE %s", [EMAIL_PATTERN], commit=True)
+    database.db.execute("DELETE FROM users WHERE email LIKE %s", [EMAIL_PATTERN], commit=True)
+
+
+def main():
+    global rtt
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=50)
+    parser.add_argument('--rtt-ms', type=float, default=30, help='simulated database round-trip time')
+    args = parser.parse_args()
+
+    database_url = os.environ.get('DATABASE_URL')
+    if not database_url:
+        sys.exit("DATABASE_URL is required")
+
+    database.pool = database.BlockingConnectionPool(minconn=1, maxconn=2, dsn=database_url, connection_factory=SlowConnection)
+
+    print(f"{args.logins} logins per path, {args.rtt_ms:.0f}ms simulated round trip\n")
+    try:
+        cleanup()
+        rtt = args.rtt_ms / 1000
+        measure("sequential queries (old)", args.logins, old_login)
+        cleanup()
+        measure("login_with_otp (single statement)", args.logins, new_login)
+    finally:
+        rtt = 0
+        cleanup()
+
+
+if __name__ == '__main__':
+    main()
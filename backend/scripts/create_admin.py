@@ -7,7 +7,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.database import db
-from services.identity_service import generate_three_word_id
+from services.identity_service import allocate_three_word_id
 
 
 def create_admin(email):
@@ -33,7 +33,7 @@ def create_admin(email):
             print(f"  Three-word ID: {existing['three_word_id']}")
     else:
         # Create new admin user
-        three_word_id = generate_three_word_id()
+        three_word_id = allocate_three_word_id()
         db.execute("""
             INSERT INTO users (email, is_admin, three_word_id)
             VALUES (%s, TRUE, %s)
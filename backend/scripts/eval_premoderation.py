@@ -0,0 +1,112 @@
+"""Offline evaluation of the local pre-moderation tier
+
+Runs services/premoderation.classify_comment over a labeled fixture set and
+reports precision of auto-approve/auto-block, how much traffic is decided
+locally, and per-comment latency. No database or API keys needed.
+
+Usage:
+    python scripts/eval_premoderation.py [fixtures.jsonl] [--min-precision 0.95] [--verbose]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import from services
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.premoderation import classify_comment, PREMODERATION_VERSION
+
+DEFAULT_FIXTURES = Path(__file__).parent / 'fixtures' / 'premoderation_labeled.jsonl'
+LATENCY_REPEATS = 200
+
+
+def load_fixtures(path):
+    """Load {"content": ..., "label": "approve"|"block"} rows"""
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def measure_latency(content):
+    """Median seconds per classify_comment call over repeated runs"""
+    timings = []
+    for _ in range(LATENCY_REPEATS):
+        started = time.perf_counter()
+        classify_comment(content)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def precision(correct, total):
+    return correct / total if total else None
+
+
+def fmt(value):
+    return f"{value:.3f}" if value is not None else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixtures', nargs='?', default=DEFAULT_FIXTURES)
+    parser.add_argument('--min-precision', type=float, default=None,
+                        help='exit non-zero if auto-approve or auto-block precision falls below this')
+    parser.add_argument('--verbose', action='store_true', help='list every misclassification and escalation')
+    args = parser.parse_args()
+
+    rows = load_fixtures(args.fixtures)
+    outcomes = {'approve': [], 'block': [], 'escalate': []}
+    latencies = []
+
+    for row in rows:
+        decision, _ = classify_comment(row['content'])
+        outcomes[decision].append(row)
+        latencies.append(measure_latency(row['content']))
+
+    approved_ok = sum(1 for r in outcomes['approve'] if r['label'] == 'approve')
+    blocked_ok = sum(1 for r in outcomes['block'] if r['label'] == 'block')
+    total_approve = sum(1 for r in rows if r['label'] == 'approve')
+    total_block = sum(1 for r in rows if r['label'] == 'block')
+
+    approve_precision = precision(approved_ok, len(outcomes['approve']))
+    block_precision = precision(blocked_ok, len(outcomes['block']))
+    decided = len(outcomes['approve']) + len(outcomes['block'])
+
+    latencies_us = sorted(l * 1_000_000 for l in latencies)
+    p99_index = min(len(latencies_us) - 1, int(len(latencies_us) * 0.99))
+
+    print(f"pre-moderation v{PREMODERATION_VERSION} on {len(rows)} labeled comments ({args.fixtures})")
+    print()
+    print(f"auto-approve: {len(outcomes['approve']):4d}  precision {fmt(approve_precision)}  recall {fmt(precision(approved_ok, total_approve))}")
+    print(f"auto-block:   {len(outcomes['block']):4d}  precision {fmt(block_precision)}  recall {fmt(precision(blocked_ok, total_block))}")
+    print(f"escalated:    {len(outcomes['escalate']):4d}")
+    print(f"decided locally: {decided / len(rows):.1%} of comments skip the Haiku call")
+    print()
+    print(f"latency per comment: p50 {statistics.median(latencies_us):.1f}us  "
+          f"p99 {latencies_us[p99_index]:.1f}us  max {latencies_us[-1]:.1f}us")
+
+    wrong = [r for r in outcomes['approve'] if r['label'] != 'approve'] + \
+            [r for r in outcomes['block'] if r['label'] != 'block']
+    if wrong:
+        print()
+        print("misclassified:")
+        for r in wrong:
+            print(f"  [{r['label']}] {r['content']}")
+
+    if args.verbose and outcomes['escalate']:
+        print()
+        print("escalated to haiku:")
+        for r in outcomes['escalate']:
+            print(f"  [{r['label']}] {r['content']}")
+
+    if args.min_precision is not None:
+        failing = [p for p in (approve_precision, block_precision) if p is not None and p < args.min_precision]
+        if failing:
+            print(f"\n✗ precision below {args.min_precision}")
+            sys.exit(1)
+        print(f"\n✓ precision at or above {args.min_precision}")
+
+
+if __name__ == '__main__':
+    main()
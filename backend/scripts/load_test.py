@@ -0,0 +1,109 @@
+"""Measure how many concurrent requests a running API can serve
+
+Runs closed-loop clients against one endpoint at increasing concurrency
+levels and prints throughput and latency for each. Capacity is the highest
+level that kept p95 latency under --max-p95-ms with under 1% errors. Run it
+against the server in each worker mode to compare, e.g.:
+
+    GUNICORN_WORKER_CLASS=sync gunicorn -c gunicorn.conf.py app:app
+    python scripts/load_test.py --path /api/posts/feed --token $TOKEN
+
+    GUNICORN_WORKER_CLASS=gthread gunicorn -c gunicorn.conf.py app:app
+    python scripts/load_test.py --path /api/posts/feed --token $TOKEN
+
+Pick an endpoint that waits on the database (or pass --path /health for a
+bare round trip). Use a development deployment; every level hammers it for
+--duration seconds.
+
+Usage:
+    python scripts/load_test.py [--url http://localhost:10000] [--path /health]
+                                [--token JWT] [--concurrency 1,4,8,16,32,64]
+                                [--duration 15] [--max-p95-ms 1000]
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+MAX_ERROR_RATE = 0.01
+
+
+def client(url, headers, stop_at, timings, errors, lock):
+    """Send requests back to back until stop_at, recording each latency"""
+    while time.perf_counter() < stop_at:
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=60) as response:
+                response.read()
+            ok = True
+        except (urllib.error.URLError, OSError):
+            ok = False
+        elapsed = (time.perf_counter() - started) * 1000
+
+        with lock:
+            if ok:
+                timings.append(elapsed)
+            else:
+                errors.append(elapsed)
+
+
+def run_level(url, headers, concurrency, duration):
+    timings, errors = [], []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    threads = [
+        threading.Thread(target=client, args=(url, headers, stop_at, timings, errors, lock))
+        for _ in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    total = len(timings) + len(errors)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))] if timings else float('inf')
+    return {
+        'throughput': len(timings) / elapsed,
+        'median': statistics.median(timings) if timings else float('inf'),
+        'p95': p95,
+        'error_rate': len(errors) / total if total else 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default=os.environ.get('LOAD_TEST_URL', 'http://localhost:10000'))
+    parser.add_argument('--path', default='/health')
+    parser.add_argument('--token', default=os.environ.get('LOAD_TEST_TOKEN'), help='JWT sent as a bearer token')
+    parser.add_argument('--concurrency', default='1,4,8,16,32,64', help='comma-separated client counts')
+    parser.add_argument('--duration', type=float, default=15, help='seconds per concurrency level')
+    parser.add_argument('--max-p95-ms', type=float, default=1000)
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/') + args.path
+    headers = {'Authorization': f"Bearer {args.token}"} if args.token else {}
+    levels = [int(c) for c in args.concurrency.split(',')]
+
+    print(f"{url}, {args.duration:.0f}s per level\n")
+    print(f"  {'clients':>7}  {'req/s':>8}  {'median':>9}  {'p95':>9}  {'errors':>6}")
+
+    capacity = 0
+    for concurrency in levels:
+        result = run_level(url, headers, concurrency, args.duration)
+        print(f"  {concurrency:>7}  {result['throughput']:8.1f}  {result['median']:7.1f}ms  "
+              f"{result['p95']:7.1f}ms  {result['error_rate']:6.1%}")
+        if result['p95'] <= args.max_p95_ms and result['error_rate'] < MAX_ERROR_RATE:
+            capacity = concurrency
+
+    print(f"\ncapacity: {capacity} concurrent requests with p95 under {args.max_p95_ms:.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Add account_deletion_jobs for the background account deletion engine"""
+import os
+import sys
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+
+def run_migration():
+    conn = psycopg2.connect(DATABASE_URL)
+    cursor = conn.cursor()
+
+    try:
+        # One row per approved deletion. No foreign keys to users or
+        # deletion_requests: the job outlives both once the account is gone.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS account_deletion_jobs (
+                id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+                request_id UUID,
+                user_id UUID NOT NULL,
+                mode VARCHAR(20) NOT NULL, -- delete_all, retain_data
+                status VARCHAR(20) NOT NULL DEFAULT 'pending', -- pending, running, completed, failed
+                step VARCHAR(40) NOT NULL,
+                rows_processed BIGINT NOT NULL DEFAULT 0,
+                user_created_at DATE,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                requested_by UUID,
+                claimed_at TIMESTAMP,
+                created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                completed_at TIMESTAMP
+            );
+        """)
+
+        # Worker queue scan
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_account_deletion_jobs_queue
+            ON account_deletion_jobs(created_at)
+            WHERE status IN ('pending', 'running');
+        """)
+
+        # At most one active job per account
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_account_deletion_jobs_active_user
+            ON account_deletion_jobs(user_id)
+            WHERE status IN ('pending', 'running');
+        """)
+
+        # Other users' posts whose counters must be recomputed once the job's rows are gone
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS account_deletion_posts (
+                job_id UUID NOT NULL REFERENCES account_deletion_jobs(id) ON DELETE CASCADE,
+                post_id UUID NOT NULL,
+                PRIMARY KEY (job_id, post_id)
+            );
+        """)
+
+        # Let the deletion engine skip the per-row count triggers for its own
+        # chunks (SET LOCAL app.defer_post_counters = 'on') and recount in bulk.
+        # comment_count_trigger keeps its status updates (published comments only).
+        cursor.execute("""
+            DROP TRIGGER IF EXISTS comment_count_trigger ON comments;
+            CREATE TRIGGER comment_count_trigger
+            AFTER INSERT OR DELETE OR UPDATE OF status ON comments
+            FOR EACH ROW
+            WHEN (current_setting('app.defer_post_counters', true) IS DISTINCT FROM 'on')
+            EXECUTE FUNCTION update_comment_count();
+        """)
+
+        cursor.execute("""
+            DROP TRIGGER IF EXISTS flag_count_trigger ON flags;
+            CREATE TRIGGER flag_count_trigger
+            AFTER INSERT OR DELETE ON flags
+            FOR EACH ROW
+            WHEN (current_setting('app.defer_post_counters', true) IS DISTINCT FROM 'on')
+            EXECUTE FUNCTION update_flag_count();
+        """)
+
+        conn.commit()
+
+        # Chunks select an account's rows by user_id, and deleting sessions
+        # nulls posts.session_id; without these every chunk scans the table.
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+        conn.autocommit = True
+        for name, definition in [
+            ('comments_user_id_idx', 'comments(user_id)'),
+            ('flags_user_id_idx', 'flags(user_id)'),
+            ('sessions_user_id_idx', 'sessions(user_id)'),
+            ('posts_session_id_idx', 'posts(session_id)'),
+        ]:
+            cursor.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition};")
+
+        print("✓ Migration completed successfully")
+        print("  - Created account_deletion_jobs and account_deletion_posts")
+        print("  - Added queue and active-job indexes")
+        print("  - comment_count_trigger and flag_count_trigger can be deferred per transaction")
+        print("  - Added user_id indexes on comments, flags and sessions, and posts(session_id)")
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,39 @@
+"""Index comments on (post_id, created_at, id) for cursor-paginated threads"""
+import os
+import sys
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+
+def run_migration():
+    conn = psycopg2.connect(DATABASE_URL)
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+    conn.autocommit = True
+    cursor = conn.cursor()
+
+    try:
+        # Serves a page of a thread by walking the index in order from the cursor
+        cursor.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS comments_post_created_id_idx
+            ON comments(post_id, created_at, id);
+        """)
+
+        # Superseded: the composite index serves every post_id lookup
+        cursor.execute("""
+            DROP INDEX CONCURRENTLY IF EXISTS comments_post_id_idx;
+        """)
+
+        print("✓ Migration completed successfully")
+        print("  - Added comments_post_created_id_idx on comments(post_id, created_at, id)")
+        print("  - Dropped comments_post_id_idx")
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,68 @@
+"""Add comments.published_at and key cursor-paginated threads on (post_id, published_at, id)
+
+Comments moderated in the background become visible when they are published,
+not when they are inserted, so "newer comments" polling pages on published_at.
+New rows default to their insert time; the moderation worker moves it to the
+publish time. Existing comments are backfilled from created_at.
+"""
+import os
+import sys
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+
+def run_migration():
+    conn = psycopg2.connect(DATABASE_URL)
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+    conn.autocommit = True
+    cursor = conn.cursor()
+
+    try:
+        # Nullable first so existing rows keep their own time instead of the migration's
+        cursor.execute("""
+            ALTER TABLE comments
+            ADD COLUMN IF NOT EXISTS published_at TIMESTAMP;
+        """)
+        cursor.execute("""
+            ALTER TABLE comments
+            ALTER COLUMN published_at SET DEFAULT NOW();
+        """)
+
+        cursor.execute("""
+            UPDATE comments
+            SET published_at = created_at
+            WHERE published_at IS NULL;
+        """)
+        backfilled = cursor.rowcount
+
+        cursor.execute("""
+            ALTER TABLE comments
+            ALTER COLUMN published_at SET NOT NULL;
+        """)
+
+        # Serves a page of a thread by walking the index in order from the cursor
+        cursor.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS comments_post_published_id_idx
+            ON comments(post_id, published_at, id);
+        """)
+
+        # Superseded: threads are no longer ordered by created_at
+        cursor.execute("""
+            DROP INDEX CONCURRENTLY IF EXISTS comments_post_created_id_idx;
+        """)
+
+        print("✓ Migration completed successfully")
+        print(f"  - Added comments.published_at (backfilled {backfilled} comments)")
+        print("  - Added comments_post_published_id_idx on comments(post_id, published_at, id)")
+        print("  - Dropped comments_post_created_id_idx")
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,68 @@
+"""Add moderation status to comments for optimistic (async-moderated) posting"""
+import os
+import sys
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+
+def run_migration():
+    conn = psycopg2.connect(DATABASE_URL)
+    cursor = conn.cursor()
+
+    try:
+        # pending -> published | retracted; existing comments are already published
+        cursor.execute("""
+            ALTER TABLE comments
+            ADD COLUMN IF NOT EXISTS status VARCHAR(20) NOT NULL DEFAULT 'published',
+            ADD COLUMN IF NOT EXISTS moderation_reason TEXT,
+            ADD COLUMN IF NOT EXISTS moderation_claimed_at TIMESTAMP,
+            ADD COLUMN IF NOT EXISTS moderation_attempts INTEGER NOT NULL DEFAULT 0;
+        """)
+
+        # Pending comments are the moderation work queue
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_comments_pending
+            ON comments(created_at)
+            WHERE status = 'pending';
+        """)
+
+        # comment_count only counts published comments, and follows status changes
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION update_comment_count()
+            RETURNS TRIGGER AS $$
+            BEGIN
+                UPDATE posts
+                SET comment_count = (
+                    SELECT COUNT(*) FROM comments
+                    WHERE post_id = COALESCE(NEW.post_id, OLD.post_id) AND status = 'published'
+                ),
+                updated_at = NOW()
+                WHERE id = COALESCE(NEW.post_id, OLD.post_id);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+        cursor.execute("DROP TRIGGER IF EXISTS comment_count_trigger ON comments;")
+        cursor.execute("""
+            CREATE TRIGGER comment_count_trigger
+            AFTER INSERT OR DELETE OR UPDATE OF status ON comments
+            FOR EACH ROW EXECUTE FUNCTION update_comment_count();
+        """)
+
+        conn.commit()
+        print("✓ Migration completed successfully")
+        print("  - Added status and moderation tracking columns to comments")
+        print("  - Added partial index on pending comments")
+        print("  - comment_count now counts published comments only")
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,64 @@
+"""Add email_outbox table for queued, retried email delivery"""
+import os
+import sys
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+
+def run_migration():
+    conn = psycopg2.connect(DATABASE_URL)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS email_outbox (
+                id BIGSERIAL PRIMARY KEY,
+                to_email VARCHAR(255) NOT NULL,
+                subject TEXT NOT NULL,
+                html_content TEXT, -- encrypted; cleared once sent
+                email_type VARCHAR(50) NOT NULL,
+                from_email VARCHAR(255) NOT NULL,
+                from_name VARCHAR(255),
+                reply_to VARCHAR(255),
+                priority SMALLINT NOT NULL DEFAULT 1, -- 0 = urgent (login codes)
+                status VARCHAR(20) NOT NULL DEFAULT 'pending', -- pending, sending, sent, failed
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                claimed_at TIMESTAMP,
+                last_error TEXT,
+                message_id VARCHAR(255),
+                created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                sent_at TIMESTAMP
+            );
+        """)
+
+        # Sender queue scan, most urgent first
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_email_outbox_queue
+            ON email_outbox(priority, id)
+            WHERE status IN ('pending', 'sending');
+        """)
+
+        # Retention purge of finished messages
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_email_outbox_finished
+            ON email_outbox(created_at)
+            WHERE status IN ('sent', 'failed');
+        """)
+
+        conn.commit()
+        print("✓ Migration completed successfully")
+        print("  - Created email_outbox table")
+        print("  - Added queue and retention indexes")
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,64 @@
+"""Add export_jobs table for background journal exports"""
+import os
+import sys
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+
+def run_migration():
+    conn = psycopg2.connect(DATABASE_URL)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS export_jobs (
+                id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+                user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                format VARCHAR(10) NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'pending', -- pending, running, completed, failed, expired
+                size_bytes BIGINT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                claimed_at TIMESTAMP,
+                created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                completed_at TIMESTAMP,
+                expires_at TIMESTAMP
+            );
+        """)
+
+        # Single-use download link: only the token's hash is kept
+        cursor.execute("""
+            ALTER TABLE export_jobs
+            ADD COLUMN IF NOT EXISTS download_token_hash VARCHAR(64),
+            ADD COLUMN IF NOT EXISTS download_token_expires_at TIMESTAMP;
+        """)
+
+        # Worker queue scan
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_export_jobs_queue
+            ON export_jobs(created_at)
+            WHERE status IN ('pending', 'running');
+        """)
+
+        # Latest jobs per user
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_export_jobs_user
+            ON export_jobs(user_id, created_at DESC);
+        """)
+
+        conn.commit()
+        print("✓ Migration completed successfully")
+        print("  - Created export_jobs table (with download token columns)")
+        print("  - Added queue and per-user indexes")
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,89 @@
+"""Precompute every three-word identity in identity_pool
+
+Inserts all ADJECTIVES x NOUNS_1 x NOUNS_2 combinations with a random sort
+key and marks the ones already in use (by users, or on posts and comments
+of deleted accounts) as taken. Safe to re-run, e.g. after adding words.
+"""
+import os
+import sys
+from pathlib import Path
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Add parent directory to path to import the word lists
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.identity_service import ADJECTIVES, NOUNS_1, NOUNS_2
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+
+def run_migration():
+    conn = psycopg2.connect(DATABASE_URL)
+    cursor = conn.cursor()
+
+    try:
+        # reserved_by/reserved_until hold options offered to a user who hasn't chosen yet
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS identity_pool (
+                three_word_id VARCHAR(100) PRIMARY KEY,
+                sort_key DOUBLE PRECISION NOT NULL DEFAULT random(),
+                taken BOOLEAN NOT NULL DEFAULT FALSE,
+                reserved_by UUID,
+                reserved_until TIMESTAMP
+            );
+        """)
+
+        # Sampling walks the unused rows from a random sort_key; taken rows
+        # leave the index, so the walk doesn't slow down as the pool fills
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_identity_pool_available
+            ON identity_pool(sort_key)
+            WHERE NOT taken;
+        """)
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_identity_pool_reserved_by
+            ON identity_pool(reserved_by)
+            WHERE reserved_by IS NOT NULL;
+        """)
+
+        cursor.execute("""
+            INSERT INTO identity_pool (three_word_id)
+            SELECT a || '-' || n1 || '-' || n2
+            FROM unnest(%s::text[]) a
+            CROSS JOIN unnest(%s::text[]) n1
+            CROSS JOIN unnest(%s::text[]) n2
+            ON CONFLICT (three_word_id) DO NOTHING;
+        """, [ADJECTIVES, NOUNS_1, NOUNS_2])
+        added = cursor.rowcount
+
+        cursor.execute("""
+            UPDATE identity_pool p
+            SET taken = TRUE, reserved_by = NULL, reserved_until = NULL
+            FROM (
+                SELECT three_word_id FROM users WHERE three_word_id IS NOT NULL
+                UNION
+                SELECT three_word_id FROM posts
+                UNION
+                SELECT three_word_id FROM comments
+            ) used
+            WHERE p.three_word_id = used.three_word_id
+              AND NOT p.taken;
+        """)
+        marked = cursor.rowcount
+
+        conn.commit()
+        print("✓ Migration completed successfully")
+        print("  - Created identity_pool with available and reservation indexes")
+        print(f"  - Added {added} identities, marked {marked} as taken")
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == '__main__':
+    run_migration()
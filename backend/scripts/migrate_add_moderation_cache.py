@@ -0,0 +1,47 @@
+"""Add moderation_cache table shared by all workers for comment verdicts"""
+import os
+import sys
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+
+def run_migration():
+    conn = psycopg2.connect(DATABASE_URL)
+    cursor = conn.cursor()
+
+    try:
+        # Verdicts keyed by normalized-content hash and moderation prompt version
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS moderation_cache (
+                content_hash TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                approved BOOLEAN NOT NULL,
+                verdict JSONB NOT NULL,
+                created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                expires_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (content_hash, prompt_version)
+            );
+        """)
+
+        # Index for purging expired verdicts
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_moderation_cache_expires
+            ON moderation_cache(expires_at);
+        """)
+
+        conn.commit()
+        print("✓ Migration completed successfully")
+        print("  - Created moderation_cache table")
+        print("  - Added index on expires_at")
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == '__main__':
+    run_migration()
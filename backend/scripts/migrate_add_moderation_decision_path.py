@@ -0,0 +1,33 @@
+"""Record which moderation tier decided each flagged comment"""
+import os
+import sys
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+
+def run_migration():
+    conn = psycopg2.connect(DATABASE_URL)
+    cursor = conn.cursor()
+
+    try:
+        # local_block, cache or haiku
+        cursor.execute("""
+            ALTER TABLE comment_flags
+            ADD COLUMN IF NOT EXISTS decision_path TEXT;
+        """)
+
+        conn.commit()
+        print("✓ Migration completed successfully")
+        print("  - Added decision_path to comment_flags table")
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,47 @@
+"""Index otp_codes for the verify lookup and for pruning expired codes"""
+import os
+import sys
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+
+def run_migration():
+    conn = psycopg2.connect(DATABASE_URL)
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+    conn.autocommit = True
+    cursor = conn.cursor()
+
+    try:
+        # Verify finds the latest code by (email, purpose, code); the per-email
+        # rate limit uses the same index's email prefix
+        cursor.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_otp_verify
+            ON otp_codes(email, purpose, code, created_at DESC);
+        """)
+
+        # Maintenance deletes expired codes in batches
+        cursor.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_otp_expires
+            ON otp_codes(expires_at);
+        """)
+
+        # Superseded: idx_otp_verify leads with (email, purpose)
+        cursor.execute("""
+            DROP INDEX CONCURRENTLY IF EXISTS idx_otp_email_purpose;
+        """)
+
+        print("✓ Migration completed successfully")
+        print("  - Added idx_otp_verify on otp_codes(email, purpose, code, created_at DESC)")
+        print("  - Added idx_otp_expires on otp_codes(expires_at)")
+        print("  - Dropped idx_otp_email_purpose")
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,91 @@
+"""Add an encrypted excerpt to sessions for the journal list view
+
+Adds sessions.excerpt and backfills it for completed sessions in batches,
+so GET /api/sessions/mine?view=list never has to decrypt full entries.
+Safe to re-run; only sessions without an excerpt are touched.
+
+Usage:
+    python scripts/migrate_add_session_excerpt.py [--batch-size 500]
+"""
+import argparse
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add parent directory to path to import from services
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from psycopg2.extras import execute_values
+from services.database import db, get_db_cursor
+from services.encryption_service import decrypt_content, encrypt_excerpt
+
+
+def add_column():
+    db.execute("""
+        ALTER TABLE sessions
+        ADD COLUMN IF NOT EXISTS excerpt TEXT;
+    """, commit=True)
+    print("✓ Added excerpt to sessions table")
+
+
+def backfill_batch(batch_size):
+    """Fill excerpts for one batch of sessions; returns rows scanned"""
+    rows = db.execute("""
+        SELECT id, raw_content FROM sessions
+        WHERE excerpt IS NULL AND completed_at IS NOT NULL
+        ORDER BY id
+        LIMIT %s
+    """, [batch_size], fetch_all=True)
+
+    if not rows:
+        return 0
+
+    updates = []
+    for row in rows:
+        try:
+            excerpt = encrypt_excerpt(decrypt_content(row['raw_content']))
+        except ValueError as e:
+            # Leave an empty excerpt so the row is not picked up again
+            print(f"  ✗ Session {row['id']}: {e}")
+            excerpt = ''
+        updates.append((str(row['id']), row['raw_content'], excerpt))
+
+    with get_db_cursor(commit=True) as cursor:
+        execute_values(cursor, """
+            UPDATE sessions AS s
+            SET excerpt = data.excerpt
+            FROM (VALUES %s) AS data (id, raw_content, excerpt)
+            WHERE s.id = data.id::uuid AND s.raw_content = data.raw_content
+        """, updates)
+        if cursor.rowcount < len(updates):
+            # Rows edited mid-batch get their excerpt from the write path
+            print(f"  - {len(updates) - cursor.rowcount} sessions changed during backfill, skipped")
+
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    try:
+        add_column()
+        total = 0
+        while True:
+            scanned = backfill_batch(args.batch_size)
+            if not scanned:
+                break
+            total += scanned
+            print(f"  backfilled {total} sessions")
+        print(f"✓ Migration completed successfully ({total} excerpts backfilled)")
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
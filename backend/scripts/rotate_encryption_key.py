@@ -0,0 +1,96 @@
+"""Re-encrypt sessions.raw_content and sessions.excerpt with the newest ENCRYPTION_KEY
+
+Rotation without downtime:
+1. Prepend the new key: ENCRYPTION_KEY=<new>,<old> and redeploy.
+   New writes use the new key, old entries still decrypt.
+2. Run this job (safe to run in the background and to re-run):
+       python scripts/rotate_encryption_key.py --batch-size 500 --pause 0.5
+3. Once it reports nothing left to rotate, remove the old key.
+
+Rows are walked in id order in batches. Each row is only rewritten if its
+content is unchanged since it was read, so concurrent autosaves win.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add parent directory to path to import from services
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from psycopg2.extras import execute_values
+from services.database import db, get_db_cursor
+from services.encryption_service import needs_rotation, rotate_content
+
+
+def rotate_batch(after_id, batch_size):
+    """Rotate one batch of sessions; returns (last id seen, rows scanned, rows rotated)"""
+    rows = db.execute("""
+        SELECT id, raw_content, excerpt FROM sessions
+        WHERE (%s::uuid IS NULL OR id > %s::uuid)
+        ORDER BY id
+        LIMIT %s
+    """, [after_id, after_id, batch_size], fetch_all=True)
+
+    if not rows:
+        return None, 0, 0
+
+    updates = []
+    for row in rows:
+        try:
+            if needs_rotation(row['raw_content']) or needs_rotation(row['excerpt']):
+                updates.append((
+                    row['id'],
+                    row['raw_content'],
+                    rotate_content(row['raw_content']),
+                    rotate_content(row['excerpt'])
+                ))
+        except ValueError as e:
+            print(f"  ✗ Skipping session {row['id']}: {e}")
+
+    rotated = 0
+    if updates:
+        with get_db_cursor(commit=True) as cursor:
+            execute_values(cursor, """
+                UPDATE sessions AS s
+                SET raw_content = data.new_content,
+                    excerpt = data.new_excerpt
+                FROM (VALUES %s) AS data (id, old_content, new_content, new_excerpt)
+                WHERE s.id = data.id::uuid AND s.raw_content = data.old_content
+            """, [(str(i), old, new, excerpt) for i, old, new, excerpt in updates])
+            rotated = cursor.rowcount
+
+    return str(rows[-1]['id']), len(rows), rotated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--pause', type=float, default=0.5, help='seconds to sleep between batches')
+    parser.add_argument('--resume-after', default=None, help='session id to resume after')
+    args = parser.parse_args()
+
+    after_id = args.resume_after
+    scanned = rotated = 0
+    started = time.time()
+
+    while True:
+        last_id, batch_scanned, batch_rotated = rotate_batch(after_id, args.batch_size)
+        if last_id is None:
+            break
+
+        after_id = last_id
+        scanned += batch_scanned
+        rotated += batch_rotated
+        print(f"  scanned {scanned}, rotated {rotated} (resume with --resume-after {after_id})")
+        time.sleep(args.pause)
+
+    print(f"\n✓ Rotation complete: {rotated} of {scanned} sessions re-encrypted in {time.time() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,43 @@
--- Function to update daily metrics
-CREATE OR REPLACE FUNCTION update_daily_metrics()
+-- Daily metrics are maintained through a coalescing refresh queue.
+-- Writes to users/sessions/posts only record which dates are dirty (one
+-- statement-level trigger per statement, ON CONFLICT DO NOTHING so no row lock
+-- is taken on an already-queued date). The aggregates themselves are recomputed
+-- by a background worker (services/metrics_service.py) that drains the queue.
+
+-- Queue of dates whose metrics need recomputing
+CREATE TABLE IF NOT EXISTS daily_metrics_refresh_queue (
+    date DATE PRIMARY KEY,
+    queued_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Function to recompute metrics for a single date
+CREATE OR REPLACE FUNCTION refresh_daily_metrics(target DATE)
 RETURNS void AS $$
 DECLARE
-    today DATE := CURRENT_DATE;
     new_builder_count INTEGER;
     total_builder_count INTEGER;
     session_count INTEGER;
     post_count INTEGER;
 BEGIN
-    -- Count new builders today
+    -- Count new builders on the date
     SELECT COUNT(*) INTO new_builder_count
-    FROM users WHERE created_at::date = today;
+    FROM users WHERE created_at::date = target;
 
-    -- Count total builders up to today
+    -- Count total builders up to the date
     SELECT COUNT(*) INTO total_builder_count
-    FROM users WHERE created_at::date <= today;
+    FROM users WHERE created_at::date <= target;
 
-    -- Count sessions completed today
+    -- Count sessions completed on the date
     SELECT COUNT(*) INTO session_count
-    FROM sessions WHERE completed_at::date = today;
+    FROM sessions WHERE completed_at::date = target;
 
-    -- Count posts created today
+    -- Count posts created on the date
     SELECT COUNT(*) INTO post_count
-    FROM posts WHERE created_at::date = today AND is_published = TRUE;
+    FROM posts WHERE created_at::date = target AND is_published = TRUE;
 
-    -- Insert or update today's metrics
+    -- Insert or update the date's metrics
     INSERT INTO daily_metrics (date, new_builders, total_builders, active_sessions, posts_created)
-    VALUES (today, new_builder_count, total_builder_count, session_count, post_count)
+    VALUES (target, new_builder_count, total_builder_count, session_count, post_count)
     ON CONFLICT (date) DO UPDATE SET
         new_builders = EXCLUDED.new_builders,
         total_builders = EXCLUDED.total_builders,
@@ -35,54 +46,148 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
--- Trigger function for users table
-CREATE OR REPLACE FUNCTION trigger_update_daily_metrics_users()
+-- Kept for manual use: recompute today's metrics immediately
+CREATE OR REPLACE FUNCTION update_daily_metrics()
+RETURNS void AS $$
+BEGIN
+    PERFORM refresh_daily_metrics(CURRENT_DATE);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Drain the refresh queue, recomputing each dirty date once.
+-- SKIP LOCKED lets several app workers drain concurrently without blocking.
+CREATE OR REPLACE FUNCTION drain_daily_metrics_queue(batch_size INTEGER DEFAULT 31)
+RETURNS INTEGER AS $$
+DECLARE
+    dirty DATE;
+    refreshed INTEGER := 0;
+BEGIN
+    FOR dirty IN
+        DELETE FROM daily_metrics_refresh_queue
+        WHERE date IN (
+            SELECT date FROM daily_metrics_refresh_queue
+            ORDER BY date
+            LIMIT batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING date
+    LOOP
+        PERFORM refresh_daily_metrics(dirty);
+        refreshed := refreshed + 1;
+    END LOOP;
+    RETURN refreshed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level trigger functions: enqueue the distinct dates touched by the
+-- statement using the transition tables
+
+CREATE OR REPLACE FUNCTION enqueue_daily_metrics_users()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO daily_metrics_refresh_queue (date)
+    SELECT DISTINCT created_at::date FROM new_rows WHERE created_at IS NOT NULL
+    ON CONFLICT (date) DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION enqueue_daily_metrics_sessions_insert()
 RETURNS TRIGGER AS $$
 BEGIN
-    PERFORM update_daily_metrics();
-    RETURN NEW;
+    INSERT INTO daily_metrics_refresh_queue (date)
+    SELECT DISTINCT completed_at::date FROM new_rows WHERE completed_at IS NOT NULL
+    ON CONFLICT (date) DO NOTHING;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
--- Trigger function for sessions table
-CREATE OR REPLACE FUNCTION trigger_update_daily_metrics_sessions()
+-- Only enqueue when completed_at actually changed, so autosaves and other
+-- content updates never touch the queue
+CREATE OR REPLACE FUNCTION enqueue_daily_metrics_sessions_update()
 RETURNS TRIGGER AS $$
 BEGIN
-    IF NEW.completed_at IS NOT NULL THEN
-        PERFORM update_daily_metrics();
-    END IF;
-    RETURN NEW;
+    INSERT INTO daily_metrics_refresh_queue (date)
+    SELECT DISTINCT d FROM (
+        SELECT n.completed_at::date AS d
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE n.completed_at IS DISTINCT FROM o.completed_at
+        UNION
+        SELECT o.completed_at::date
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE n.completed_at IS DISTINCT FROM o.completed_at
+    ) changed
+    WHERE d IS NOT NULL
+    ON CONFLICT (date) DO NOTHING;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
--- Trigger function for posts table
-CREATE OR REPLACE FUNCTION trigger_update_daily_metrics_posts()
+CREATE OR REPLACE FUNCTION enqueue_daily_metrics_posts_insert()
 RETURNS TRIGGER AS $$
 BEGIN
-    IF NEW.is_published = TRUE THEN
-        PERFORM update_daily_metrics();
-    END IF;
-    RETURN NEW;
+    INSERT INTO daily_metrics_refresh_queue (date)
+    SELECT DISTINCT created_at::date FROM new_rows
+    WHERE is_published = TRUE AND created_at IS NOT NULL
+    ON CONFLICT (date) DO NOTHING;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
--- Drop existing triggers if they exist
+CREATE OR REPLACE FUNCTION enqueue_daily_metrics_posts_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO daily_metrics_refresh_queue (date)
+    SELECT DISTINCT n.created_at::date
+    FROM new_rows n JOIN old_rows o ON o.id = n.id
+    WHERE n.is_published IS DISTINCT FROM o.is_published AND n.created_at IS NOT NULL
+    ON CONFLICT (date) DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Drop the old per-row triggers and functions
 DROP TRIGGER IF EXISTS update_metrics_on_user_insert ON users;
 DROP TRIGGER IF EXISTS update_metrics_on_session_update ON sessions;
 DROP TRIGGER IF EXISTS update_metrics_on_post_insert ON posts;
+DROP FUNCTION IF EXISTS trigger_update_daily_metrics_users();
+DROP FUNCTION IF EXISTS trigger_update_daily_metrics_sessions();
+DROP FUNCTION IF EXISTS trigger_update_daily_metrics_posts();
 
--- Create triggers
-CREATE TRIGGER update_metrics_on_user_insert
+-- Drop existing queue triggers if they exist
+DROP TRIGGER IF EXISTS enqueue_metrics_on_user_insert ON users;
+DROP TRIGGER IF EXISTS enqueue_metrics_on_session_insert ON sessions;
+DROP TRIGGER IF EXISTS enqueue_metrics_on_session_update ON sessions;
+DROP TRIGGER IF EXISTS enqueue_metrics_on_post_insert ON posts;
+DROP TRIGGER IF EXISTS enqueue_metrics_on_post_update ON posts;
+
+-- Create triggers (transition tables require one event per trigger)
+CREATE TRIGGER enqueue_metrics_on_user_insert
     AFTER INSERT ON users
-    FOR EACH ROW
-    EXECUTE FUNCTION trigger_update_daily_metrics_users();
-
-CREATE TRIGGER update_metrics_on_session_update
-    AFTER INSERT OR UPDATE ON sessions
-    FOR EACH ROW
-    EXECUTE FUNCTION trigger_update_daily_metrics_sessions();
-
-CREATE TRIGGER update_metrics_on_post_insert
-    AFTER INSERT OR UPDATE ON posts
-    FOR EACH ROW
-    EXECUTE FUNCTION trigger_update_daily_metrics_posts();
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION enqueue_daily_metrics_users();
+
+CREATE TRIGGER enqueue_metrics_on_session_insert
+    AFTER INSERT ON sessions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION enqueue_daily_metrics_sessions_insert();
+
+CREATE TRIGGER enqueue_metrics_on_session_update
+    AFTER UPDATE ON sessions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION enqueue_daily_metrics_sessions_update();
+
+CREATE TRIGGER enqueue_metrics_on_post_insert
+    AFTER INSERT ON posts
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION enqueue_daily_metrics_posts_insert();
+
+CREATE TRIGGER enqueue_metrics_on_post_update
+    AFTER UPDATE ON posts
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION enqueue_daily_metrics_posts_update();
@@ -0,0 +1,108 @@
+-- Reaction counts are maintained through an append-only delta log.
+-- The old per-row trigger rewrote the posts row on every reaction, so everyone
+-- reacting to a popular post queued on one row lock and each reaction left a
+-- dead copy of a wide, heavily indexed row. Now a statement-level trigger only
+-- appends per-post deltas to reaction_count_deltas, which never conflicts. A
+-- background worker (services/reaction_counter.py) folds the log into
+-- posts.reaction_count every few seconds, one UPDATE per post per fold. Reads
+-- that must be exact add the unfolded deltas with pending_reaction_delta().
+
+-- Append-only log of reaction count changes not yet folded into posts
+CREATE TABLE IF NOT EXISTS reaction_count_deltas (
+    id BIGSERIAL PRIMARY KEY,
+    post_id UUID NOT NULL,
+    delta INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS reaction_count_deltas_post_id_idx ON reaction_count_deltas(post_id);
+
+-- Unfolded reaction count change for a post
+CREATE OR REPLACE FUNCTION pending_reaction_delta(target UUID)
+RETURNS INTEGER AS $$
+    SELECT COALESCE(SUM(delta), 0)::INTEGER FROM reaction_count_deltas WHERE post_id = target;
+$$ LANGUAGE sql STABLE;
+
+-- Fold a batch of deltas into posts.reaction_count; returns deltas folded
+CREATE OR REPLACE FUNCTION fold_reaction_count_deltas(batch_size INTEGER DEFAULT 10000)
+RETURNS INTEGER AS $$
+DECLARE
+    folded INTEGER;
+BEGIN
+    WITH taken AS (
+        DELETE FROM reaction_count_deltas
+        WHERE id IN (
+            SELECT id FROM reaction_count_deltas
+            ORDER BY id
+            LIMIT batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING post_id, delta
+    ),
+    totals AS (
+        SELECT post_id, SUM(delta) AS delta, COUNT(*) AS rows
+        FROM taken
+        GROUP BY post_id
+    ),
+    applied AS (
+        UPDATE posts p
+        SET reaction_count = GREATEST(p.reaction_count + totals.delta, 0)
+        FROM totals
+        WHERE p.id = totals.post_id AND totals.delta <> 0
+    )
+    SELECT COALESCE(SUM(rows), 0) INTO folded FROM totals;
+
+    RETURN folded;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level trigger functions: one delta row per post touched by the statement
+
+CREATE OR REPLACE FUNCTION log_reaction_inserts()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO reaction_count_deltas (post_id, delta)
+    SELECT post_id, COUNT(*) FROM new_rows WHERE post_id IS NOT NULL GROUP BY post_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION log_reaction_deletes()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO reaction_count_deltas (post_id, delta)
+    SELECT post_id, -COUNT(*) FROM old_rows WHERE post_id IS NOT NULL GROUP BY post_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Replace the per-row trigger that rewrote posts on every reaction
+DROP TRIGGER IF EXISTS reaction_count_trigger ON reactions;
+DROP FUNCTION IF EXISTS update_reaction_count();
+
+DROP TRIGGER IF EXISTS log_reaction_count_on_insert ON reactions;
+CREATE TRIGGER log_reaction_count_on_insert
+    AFTER INSERT ON reactions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION log_reaction_inserts();
+
+DROP TRIGGER IF EXISTS log_reaction_count_on_delete ON reactions;
+CREATE TRIGGER log_reaction_count_on_delete
+    AFTER DELETE ON reactions
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION log_reaction_deletes();
+
+-- Leave room on posts pages so the folded count updates can be HOT updates
+-- (reaction_count is not indexed); applies to pages written from now on
+ALTER TABLE posts SET (fillfactor = 90);
+
+-- Resync counts once, in case reactions changed between dropping and creating
+-- the triggers. Deltas still in the log are left for the fold, so this stays
+-- correct when the script is re-run.
+UPDATE posts p
+SET reaction_count = COALESCE(r.count, 0) - pending_reaction_delta(p.id)
+FROM posts p2
+LEFT JOIN (SELECT post_id, COUNT(*) AS count FROM reactions GROUP BY post_id) r ON r.post_id = p2.id
+WHERE p.id = p2.id
+  AND p.reaction_count IS DISTINCT FROM COALESCE(r.count, 0) - pending_reaction_delta(p.id);
@@ -0,0 +1,396 @@
+"""Background account deletion engine
+
+Approving a deletion request queues an account_deletion_jobs row; this worker
+claims it (SKIP LOCKED, so every app worker can run one) and works through
+the job's steps in small chunks. Each chunk is its own short transaction with
+a lock timeout, and advances the job's step and progress in that same
+transaction, so a crashed or timed-out job resumes where it stopped.
+
+Chunks defer the per-row comment/flag count triggers. Other users' posts
+touched along the way are recorded in account_deletion_posts and recounted
+in bulk once the rows are gone, then the daily metrics from the account's
+creation date onwards are queued for a refresh. Reaction counts need no
+recount: the reaction triggers already log deltas per statement.
+"""
+
+import os
+import threading
+import time
+import psycopg2
+import psycopg2.errors
+from .database import db
+
+DELETION_CHUNK_SIZE = int(os.environ.get('DELETION_CHUNK_SIZE', 500))
+DELETION_LOCK_TIMEOUT_MS = int(os.environ.get('DELETION_LOCK_TIMEOUT_MS', 2000))
+STATEMENT_TIMEOUT_MS = 30000
+MIN_CHUNK_SIZE = 50
+CHUNK_PAUSE = 0.05  # seconds between chunks, leaves room for user traffic
+LOCK_RETRY_PAUSE = 1  # seconds before retrying a chunk that hit a lock timeout
+MAX_LOCK_RETRIES = 10
+
+POLL_INTERVAL = 30  # seconds between sweeps when not woken up
+CLAIM_TIMEOUT = 1800  # seconds before a running job may be picked up again
+MAX_ATTEMPTS = 5
+
+wake_event = threading.Event()
+_worker_started = False
+
+# Record the posts whose counters the deleted rows fed
+_TRACK_POSTS = """
+    touched AS (
+        INSERT INTO account_deletion_posts (job_id, post_id)
+        SELECT DISTINCT %(job_id)s::uuid, post_id FROM gone WHERE post_id IS NOT NULL
+        ON CONFLICT DO NOTHING
+    )
+"""
+
+# One statement per step, each handling at most %(limit)s rows and returning n
+STEP_QUERIES = {
+    # The account's own comments, flags and reactions on any post
+    'comments': """
+        WITH gone AS (
+            DELETE FROM comments WHERE id IN (
+                SELECT id FROM comments WHERE user_id = %(user_id)s LIMIT %(limit)s
+            )
+            RETURNING post_id
+        ),""" + _TRACK_POSTS + """
+        SELECT COUNT(*) AS n FROM gone
+    """,
+    'flags': """
+        WITH gone AS (
+            DELETE FROM flags WHERE id IN (
+                SELECT id FROM flags WHERE user_id = %(user_id)s LIMIT %(limit)s
+            )
+            RETURNING post_id
+        ),""" + _TRACK_POSTS + """
+        SELECT COUNT(*) AS n FROM gone
+    """,
+    'reactions': """
+        WITH gone AS (
+            DELETE FROM reactions WHERE id IN (
+                SELECT id FROM reactions WHERE user_id = %(user_id)s LIMIT %(limit)s
+            )
+            RETURNING 1
+        )
+        SELECT COUNT(*) AS n FROM gone
+    """,
+    # Everything hanging off the account's posts, so deleting a post never
+    # cascades into an unbounded number of rows
+    'post_comments': """
+        WITH gone AS (
+            DELETE FROM comments WHERE id IN (
+                SELECT c.id FROM comments c
+                JOIN posts p ON p.id = c.post_id
+                WHERE p.user_id = %(user_id)s
+                LIMIT %(limit)s
+            )
+            RETURNING 1
+        )
+        SELECT COUNT(*) AS n FROM gone
+    """,
+    'post_reactions': """
+        WITH gone AS (
+            DELETE FROM reactions WHERE id IN (
+                SELECT r.id FROM reactions r
+                JOIN posts p ON p.id = r.post_id
+                WHERE p.user_id = %(user_id)s
+                LIMIT %(limit)s
+            )
+            RETURNING 1
+        )
+        SELECT COUNT(*) AS n FROM gone
+    """,
+    'post_flags': """
+        WITH gone AS (
+            DELETE FROM flags WHERE id IN (
+                SELECT f.id FROM flags f
+                JOIN posts p ON p.id = f.post_id
+                WHERE p.user_id = %(user_id)s
+                LIMIT %(limit)s
+            )
+            RETURNING 1
+        )
+        SELECT COUNT(*) AS n FROM gone
+    """,
+    'posts': """
+        WITH gone AS (
+            DELETE FROM posts WHERE id IN (
+                SELECT id FROM posts WHERE user_id = %(user_id)s LIMIT %(limit)s
+            )
+            RETURNING 1
+        )
+        SELECT COUNT(*) AS n FROM gone
+    """,
+    'sessions': """
+        WITH gone AS (
+            DELETE FROM sessions WHERE id IN (
+                SELECT id FROM sessions WHERE user_id = %(user_id)s LIMIT %(limit)s
+            )
+            RETURNING 1
+        )
+        SELECT COUNT(*) AS n FROM gone
+    """,
+    # Retained posts and comments keep three_word_id for attribution
+    'detach_posts': """
+        WITH detached AS (
+            UPDATE posts SET user_id = NULL WHERE id IN (
+                SELECT id FROM posts WHERE user_id = %(user_id)s LIMIT %(limit)s
+            )
+            RETURNING 1
+        )
+        SELECT COUNT(*) AS n FROM detached
+    """,
+    'detach_comments': """
+        WITH detached AS (
+            UPDATE comments SET user_id = NULL WHERE id IN (
+                SELECT id FROM comments WHERE user_id = %(user_id)s LIMIT %(limit)s
+            )
+            RETURNING 1
+        )
+        SELECT COUNT(*) AS n FROM detached
+    """,
+    # Whatever is left (applications, follows, blocks, the deletion request)
+    # is small and goes with the user row
+    'account': """
+        WITH gone AS (
+            DELETE FROM users WHERE id = %(user_id)s
+            RETURNING 1
+        )
+        SELECT COUNT(*) AS n FROM gone
+    """,
+    # Same counts the comment/flag triggers maintain, for a batch of posts at once
+    'recount': """
+        WITH batch AS (
+            DELETE FROM account_deletion_posts
+            WHERE job_id = %(job_id)s AND post_id IN (
+                SELECT post_id FROM account_deletion_posts
+                WHERE job_id = %(job_id)s
+                LIMIT %(limit)s
+            )
+            RETURNING post_id
+        ),
+        counts AS (
+            SELECT
+                b.post_id,
+                (SELECT COUNT(*) FROM comments c WHERE c.post_id = b.post_id AND c.status = 'published') AS comment_count,
+                (SELECT COUNT(*) FROM flags f WHERE f.post_id = b.post_id) AS flag_count
+            FROM batch b
+        ),
+        recounted AS (
+            UPDATE posts p
+            SET comment_count = counts.comment_count,
+                flag_count = counts.flag_count,
+                flagged = (counts.flag_count >= 3)
+            FROM counts
+            WHERE p.id = counts.post_id
+        )
+        SELECT COUNT(*) AS n FROM batch
+    """,
+    # total_builders changes for every day since the account was created
+    'metrics': """
+        WITH queued AS (
+            INSERT INTO daily_metrics_refresh_queue (date)
+            SELECT d::date
+            FROM generate_series(%(user_created_at)s::date, CURRENT_DATE, INTERVAL '1 day') d
+            WHERE %(user_created_at)s::date IS NOT NULL
+            ON CONFLICT (date) DO NOTHING
+            RETURNING 1
+        )
+        SELECT COUNT(*) AS n FROM queued
+    """,
+}
+
+# Single-statement steps finish after one pass whatever they return
+SINGLE_PASS_STEPS = {'account', 'metrics'}
+
+DELETION_STEPS = {
+    'delete_all': [
+        'comments', 'flags', 'reactions',
+        'post_comments', 'post_reactions', 'post_flags', 'posts',
+        'sessions', 'account', 'recount', 'metrics',
+    ],
+    'retain_data': [
+        'sessions', 'detach_posts', 'detach_comments',
+        'flags', 'reactions', 'account', 'recount', 'metrics',
+    ],
+}
+
+
+def wake_deletion_worker():
+    """Wake this process's worker right after a job is queued"""
+    wake_event.set()
+
+
+def queue_account_deletion(tx, request_id, user_id, mode, requested_by):
+    """
+    Queue a deletion job inside the caller's transaction
+    Returns the job id, or None if the account is gone or already has an active job.
+    """
+    job = tx.execute("""
+        INSERT INTO account_deletion_jobs
+            (request_id, user_id, mode, step, user_created_at, requested_by)
+        SELECT %s::uuid, u.id, %s, %s, u.created_at::date, %s::uuid
+        FROM users u
+        WHERE u.id = %s
+        ON CONFLICT (user_id) WHERE status IN ('pending', 'running') DO NOTHING
+        RETURNING id
+    """, [request_id, mode, DELETION_STEPS[mode][0], requested_by, user_id])
+    return job['id'] if job else None
+
+
+def claim_deletion_job():
+    """Claim the oldest queued job nobody else is working on"""
+    return db.execute("""
+        UPDATE account_deletion_jobs j
+        SET status = 'running',
+            claimed_at = NOW(),
+            attempts = j.attempts + 1
+        WHERE j.id = (
+            SELECT id FROM account_deletion_jobs
+            WHERE attempts < %s
+              AND (status = 'pending'
+                   OR (status = 'running' AND claimed_at < NOW() - make_interval(secs => %s)))
+            ORDER BY created_at
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING j.id, j.user_id, j.mode, j.step, j.user_created_at, j.attempts
+    """, [MAX_ATTEMPTS, CLAIM_TIMEOUT], commit=True)
+
+
+def fail_exhausted_deletion_jobs():
+    """
+    Fail running jobs whose last attempt stopped making progress (e.g. a crash or deploy)
+    Failed jobs leave the one-active-job-per-user index, so approving the
+    deletion request again queues a fresh job.
+    """
+    return db.execute("""
+        UPDATE account_deletion_jobs
+        SET status = 'failed',
+            error = 'Stopped at step ' || step || ' after ' || attempts || ' attempts',
+            claimed_at = NULL
+        WHERE status = 'running'
+          AND attempts >= %s
+          AND claimed_at < NOW() - make_interval(secs => %s)
+        RETURNING id
+    """, [MAX_ATTEMPTS, CLAIM_TIMEOUT], fetch_all=True, commit=True)
+
+
+def run_chunk(job, step, limit):
+    """
+    Run one chunk of a step and record progress in the same transaction
+    Returns (rows handled, whether the step is finished).
+    """
+    with db.transaction() as tx:
+        tx.execute(f"SET LOCAL lock_timeout = '{DELETION_LOCK_TIMEOUT_MS}ms'")
+        tx.execute(f"SET LOCAL statement_timeout = '{STATEMENT_TIMEOUT_MS}ms'")
+        tx.execute("SET LOCAL app.defer_post_counters = 'on'")
+
+        n = tx.execute(STEP_QUERIES[step], {
+            'job_id': job['id'],
+            'user_id': job['user_id'],
+            'user_created_at': job['user_created_at'],
+            'limit': limit,
+        }, fetch_one=True)['n']
+
+        finished = step in SINGLE_PASS_STEPS or n < limit
+        steps = DELETION_STEPS[job['mode']]
+        next_step = step
+        if finished:
+            index = steps.index(step)
+            next_step = steps[index + 1] if index + 1 < len(steps) else 'done'
+
+        tx.execute("""
+            UPDATE account_deletion_jobs
+            SET step = %s,
+                rows_processed = rows_processed + %s,
+                claimed_at = NOW()
+            WHERE id = %s
+        """, [next_step, n, job['id']])
+
+    return n, finished
+
+
+def run_step(job, step):
+    """Run chunks of one step until it is finished, backing off on lock timeouts"""
+    limit = DELETION_CHUNK_SIZE
+    lock_retries = 0
+
+    while True:
+        try:
+            n, finished = run_chunk(job, step, limit)
+        except (psycopg2.errors.LockNotAvailable, psycopg2.errors.QueryCanceled):
+            # Contended rows: smaller chunks hold fewer locks, retry shortly
+            lock_retries += 1
+            if lock_retries > MAX_LOCK_RETRIES:
+                raise
+            limit = max(limit // 2, MIN_CHUNK_SIZE)
+            time.sleep(LOCK_RETRY_PAUSE)
+            continue
+
+        lock_retries = 0
+        if finished:
+            return
+        time.sleep(CHUNK_PAUSE)
+
+
+def run_deletion_job(job):
+    """Work through a job's remaining steps and record the result"""
+    steps = DELETION_STEPS[job['mode']]
+    step = job['step']
+    try:
+        # Resume from the step recorded by the last committed chunk
+        start = steps.index(step) if step in steps else len(steps)
+        for step in steps[start:]:
+            run_step(job, step)
+    except Exception as e:
+        print(f"Account deletion job {job['id']} failed at {step} (attempt {job['attempts']}): {e}")
+        # Requeue until attempts run out; progress so far is kept
+        db.execute("""
+            UPDATE account_deletion_jobs
+            SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                error = %s,
+                claimed_at = NULL
+            WHERE id = %s
+        """, [MAX_ATTEMPTS, str(e)[:500], job['id']], commit=True)
+        return
+
+    db.execute("""
+        UPDATE account_deletion_jobs
+        SET status = 'completed',
+            step = 'done',
+            error = NULL,
+            completed_at = NOW()
+        WHERE id = %s
+    """, [job['id']], commit=True)
+
+
+def deletion_worker():
+    """Background worker that runs queued account deletions"""
+    while True:
+        try:
+            wake_event.wait(POLL_INTERVAL)
+            wake_event.clear()
+
+            for job in fail_exhausted_deletion_jobs() or []:
+                print(f"Account deletion job {job['id']} failed: attempts exhausted")
+
+            while True:
+                job = claim_deletion_job()
+                if not job:
+                    break
+                run_deletion_job(job)
+        except Exception as e:
+            print(f"Account deletion worker error: {e}")
+
+
+def start_deletion_worker():
+    """Start the account deletion thread"""
+    global _worker_started
+    if _worker_started:
+        return
+    _worker_started = True
+
+    thread = threading.Thread(target=deletion_worker, daemon=True)
+    thread.start()
+    print("Account deletion worker started")
@@ -11,6 +11,11 @@ JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-this')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRES_HOURS = int(os.environ.get('JWT_EXPIRES_HOURS', 720))  # 30 days
 
+OTP_EXPIRES_MINUTES = 10
+# Codes issued per email within the window, across purposes
+OTP_RATE_LIMIT = int(os.environ.get('OTP_RATE_LIMIT', 5))
+OTP_RATE_WINDOW_MINUTES = int(os.environ.get('OTP_RATE_WINDOW_MINUTES', 15))
+
 
 def generate_otp():
     """Generate 6-digit OTP code"""
@@ -18,50 +23,95 @@ def generate_otp():
 
 
 def create_otp(email, purpose='login'):
-    """Create and store OTP code"""
+    """Create and store OTP code; None if the email has hit OTP_RATE_LIMIT"""
     code = generate_otp()
-    expires_at = datetime.now() + timedelta(minutes=10)
-
-    db.execute("""
-        INSERT INTO otp_codes (email, code, purpose, expires_at)
-        VALUES (%s, %s, %s, %s)
-    """, [email, code, purpose, expires_at], commit=True)
-
-    return code
-
-
-def verify_otp(email, code, purpose='login'):
-    """Verify OTP code"""
+    expires_at = datetime.now() + timedelta(minutes=OTP_EXPIRES_MINUTES)
+
+    # The rate check counts this email's recent codes, so it needs no extra table.
+    # Concurrent requests for one email queue on an advisory lock held until
+    # commit, so each count sees the codes inserted before it.
+    with db.transaction() as tx:
+        tx.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [email], fetch_one=True)
+        created = tx.execute("""
+            INSERT INTO otp_codes (email, code, purpose, expires_at)
+            SELECT %(email)s, %(code)s, %(purpose)s, %(expires_at)s
+            WHERE (
+                SELECT COUNT(*) FROM otp_codes
+                WHERE email = %(email)s AND created_at > NOW() - make_interval(mins => %(window)s)
+            ) < %(limit)s
+            RETURNING id
+        """, {
+            'email': email, 'code': code, 'purpose': purpose, 'expires_at': expires_at,
+            'window': OTP_RATE_WINDOW_MINUTES, 'limit': OTP_RATE_LIMIT
+        })
+
+    return code if created else None
+
+
+def login_with_otp(email, code, purpose='login'):
+    """
+    Consume an OTP and load the account it logs into, in one statement
+    Marks the latest matching code used, creates the user or bumps last_active,
+    and joins the latest application. Returns (user, application status), or
+    (None, None) if the code is wrong, used or expired.
+    """
+    row = db.execute("""
+        WITH otp AS (
+            UPDATE otp_codes SET used = TRUE
+            WHERE id = (
+                SELECT id FROM otp_codes
+                WHERE email = %(email)s AND code = %(code)s AND purpose = %(purpose)s
+                ORDER BY created_at DESC
+                LIMIT 1
+            )
+            AND used IS NOT TRUE AND expires_at >= %(now)s
+            RETURNING id
+        ),
+        account AS (
+            INSERT INTO users (email)
+            SELECT %(email)s FROM otp
+            ON CONFLICT (email) DO UPDATE SET last_active = NOW()
+            RETURNING id, email, three_word_id, is_admin, theme_preference
+        )
+        SELECT
+            a.id, a.email, a.three_word_id, a.is_admin, a.theme_preference,
+            app.id AS application_id, app.status, app.rejection_reason,
+            app.more_info_request, app.can_reapply
+        FROM account a
+        LEFT JOIN LATERAL (
+            SELECT id, status, rejection_reason, more_info_request, can_reapply
+            FROM applications
+            WHERE user_id = a.id
+            ORDER BY submitted_at DESC
+            LIMIT 1
+        ) app ON TRUE
+    """, {'email': email, 'code': code, 'purpose': purpose, 'now': datetime.now()}, fetch_one=True, commit=True)
+
+    if not row:
+        return None, None
+
+    user = {key: row[key] for key in ('id', 'email', 'three_word_id', 'is_admin', 'theme_preference')}
+    return user, application_status(row if row['application_id'] else None)
+
+
+def cleanup_expired_otps(batch_size=5000):
+    """
+    Remove one batch of expired OTP codes; returns rows deleted
+    Codes stay until the rate-limit window has passed so issuance can still be counted.
+    """
     result = db.execute("""
-        SELECT id, expires_at, used
-        FROM otp_codes
-        WHERE email = %s AND code = %s AND purpose = %s
-        ORDER BY created_at DESC
-        LIMIT 1
-    """, [email, code, purpose], fetch_one=True)
-
-    if not result:
-        return False
-
-    if result['used']:
-        return False
-
-    if datetime.now() > result['expires_at']:
-        return False
-
-    # Mark as used
-    db.execute("""
-        UPDATE otp_codes SET used = TRUE WHERE id = %s
-    """, [result['id']], commit=True)
-
-    return True
-
-
-def cleanup_expired_otps():
-    """Remove expired OTP codes"""
-    db.execute("""
-        DELETE FROM otp_codes WHERE expires_at < NOW()
-    """, commit=True)
+        WITH gone AS (
+            DELETE FROM otp_codes WHERE id IN (
+                SELECT id FROM otp_codes
+                WHERE expires_at < %s AND created_at < NOW() - make_interval(mins => %s)
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING 1
+        )
+        SELECT COUNT(*) AS deleted FROM gone
+    """, [datetime.now(), OTP_RATE_WINDOW_MINUTES, batch_size], fetch_one=True, commit=True)
+    return result['deleted']
 
 
 def create_jwt_token(user_id, email, is_admin=False):
@@ -78,48 +128,19 @@ def create_jwt_token(user_id, email, is_admin=False):
 
 
 def verify_jwt_token(token):
-    """Verify and decode JWT token"""
+    """Verify and decode a login JWT token"""
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
     except JWTError:
         return None
+    # Purpose-bound tokens (the old export download links) never authenticate a user
+    if 'purpose' in payload:
+        return None
+    return payload
 
 
-def get_or_create_user(email):
-    """Get existing user or create new one"""
-    user = db.execute("""
-        SELECT id, email, three_word_id, is_admin, theme_preference
-        FROM users WHERE email = %s
-    """, [email], fetch_one=True)
-
-    if user:
-        # Update last active
-        db.execute("""
-            UPDATE users SET last_active = NOW() WHERE id = %s
-        """, [user['id']], commit=True)
-        return dict(user)
-
-    # Create new user
-    new_user = db.execute("""
-        INSERT INTO users (email)
-        VALUES (%s)
-        RETURNING id, email, three_word_id, is_admin, theme_preference
-    """, [email], commit=True)
-
-    return dict(new_user)
-
-
-def get_user_application_status(user_id):
-    """Get user's application status"""
-    app = db.execute("""
-        SELECT status, rejection_reason, more_info_request, can_reapply
-        FROM applications
-        WHERE user_id = %s
-        ORDER BY submitted_at DESC
-        LIMIT 1
-    """, [user_id], fetch_one=True)
-
+def application_status(app):
+    """Shape an applications row (or None) into the status fields returned with a user"""
     if app:
         return {
             'has_application': True,
@@ -134,3 +155,16 @@ def get_user_application_status(user_id):
         'application_status': None,
         'can_reapply': False
     }
+
+
+def get_user_application_status(user_id):
+    """Get user's application status"""
+    app = db.execute("""
+        SELECT status, rejection_reason, more_info_request, can_reapply
+        FROM applications
+        WHERE user_id = %s
+        ORDER BY submitted_at DESC
+        LIMIT 1
+    """, [user_id], fetch_one=True)
+
+    return application_status(app)
@@ -1,12 +1,8 @@
 """Claude AI service for content analysis, safety checking, and anonymization"""
 
-import anthropic
 import json
-import os
-from datetime import date
-from services.database import db
-
-client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+from services.llm_client import create_message
+from services.usage_service import record_usage
 
 # Use the latest Sonnet model
 SONNET_MODEL = "claude-sonnet-4-5-20250929"
@@ -360,7 +356,7 @@ def analyze_writing(content, intent):
         intent_instructions=intent_instructions
     )
 
-    response = client.messages.create(
+    response = create_message(
         model="claude-sonnet-4-20250514",
         max_tokens=1000,
         system=MASTER_SYSTEM_PROMPT,
@@ -381,7 +377,7 @@ def safety_check(content, intent):
         intent=intent
     )
 
-    response = client.messages.create(
+    response = create_message(
         model="claude-sonnet-4-20250514",
         max_tokens=800,
         system=MASTER_SYSTEM_PROMPT,
@@ -410,7 +406,7 @@ def anonymize_content(content, intent, topics):
         topics=json.dumps(topics)
     )
 
-    response = client.messages.create(
+    response = create_message(
         model="claude-sonnet-4-20250514",
         max_tokens=1200,
         system=MASTER_SYSTEM_PROMPT,
@@ -430,40 +426,9 @@ def anonymize_content(content, intent, topics):
     return json.loads(result_text)
 
 
-def track_api_usage(service, operation, usage):
-    """Track API token usage for analytics"""
-    try:
-        today = date.today()
-
-        input_tokens = usage.input_tokens
-        output_tokens = usage.output_tokens
-        cache_creation = getattr(usage, 'cache_creation_input_tokens', 0)
-        cache_read = getattr(usage, 'cache_read_input_tokens', 0)
-
-        # Calculate cost (example rates - adjust based on actual pricing)
-        # Sonnet 4.5 pricing: $3/$15 per million tokens (input/output)
-        cost = (input_tokens * 3.0 / 1_000_000) + (output_tokens * 15.0 / 1_000_000)
-        if cache_creation:
-            cost += (cache_creation * 3.75 / 1_000_000)  # Cache writes are slightly higher
-        if cache_read:
-            cost += (cache_read * 0.30 / 1_000_000)  # Cache reads are 90% cheaper
-
-        # Insert or update daily API usage
-        db.execute("""
-            INSERT INTO api_usage (date, service, operation, input_tokens, output_tokens,
-                                  cache_creation_tokens, cache_read_tokens, cost_usd)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (date, service, operation)
-            DO UPDATE SET
-                input_tokens = api_usage.input_tokens + EXCLUDED.input_tokens,
-                output_tokens = api_usage.output_tokens + EXCLUDED.output_tokens,
-                cache_creation_tokens = api_usage.cache_creation_tokens + EXCLUDED.cache_creation_tokens,
-                cache_read_tokens = api_usage.cache_read_tokens + EXCLUDED.cache_read_tokens,
-                cost_usd = api_usage.cost_usd + EXCLUDED.cost_usd
-        """, [today, service, operation, input_tokens, output_tokens, cache_creation, cache_read, cost], commit=True)
-    except Exception as e:
-        print(f"Failed to track API usage: {e}")
-        # Don't fail the main operation if analytics tracking fails
+def track_api_usage(service, operation, usage, model=SONNET_MODEL):
+    """Track API token usage for analytics (buffered, flushed in the background)"""
+    record_usage(service, operation, usage, model=model)
 
 
 def complete_analysis(content, intent, linked_sessions=None, user_historical_topics=None):
@@ -514,7 +479,7 @@ def complete_analysis(content, intent, linked_sessions=None, user_historical_top
     ) + topics_context
 
     # Use prompt caching on the system prompt to reduce cost and latency
-    response = client.messages.create(
+    response = create_message(
         model=SONNET_MODEL,
         max_tokens=3000,
         system=[
@@ -0,0 +1,152 @@
+"""Background moderation of optimistically posted comments
+
+When ASYNC_COMMENT_MODERATION is enabled, comments the local pre-moderation
+tier can't decide are inserted as 'pending' and returned immediately. This
+worker claims pending comments (SKIP LOCKED, so every app worker can run one),
+moderates them, then publishes or retracts them and notifies the author.
+A comment that still can't be moderated after MAX_ATTEMPTS is retracted with
+UNMODERATED_REASON (fail closed, not counted as a violation) and the author is
+asked to post it again.
+"""
+
+import os
+import threading
+from .database import db
+from .email_service import send_comment_retracted_email, send_comment_not_moderated_email
+from .llm_client import LLMUnavailableError
+from .moderation_service import moderate_comment, record_comment_violation
+
+ASYNC_COMMENT_MODERATION = os.environ.get('ASYNC_COMMENT_MODERATION', 'false').lower() == 'true'
+
+POLL_INTERVAL = 5  # seconds between sweeps when not woken up
+CLAIM_TIMEOUT = 120  # seconds before a claimed comment may be picked up again
+MAX_ATTEMPTS = 3
+BATCH_SIZE = 10
+UNMODERATED_REASON = 'could not be moderated'
+
+wake_event = threading.Event()
+
+
+def wake_comment_moderation():
+    """Wake this process's worker right after a pending comment is inserted"""
+    wake_event.set()
+
+
+def claim_pending_comments(limit=BATCH_SIZE):
+    """Claim a batch of pending comments nobody else is working on"""
+    return db.execute("""
+        UPDATE comments c
+        SET moderation_claimed_at = NOW(),
+            moderation_attempts = c.moderation_attempts + 1
+        WHERE c.id IN (
+            SELECT id FROM comments
+            WHERE status = 'pending'
+              AND moderation_attempts < %s
+              AND (moderation_claimed_at IS NULL
+                   OR moderation_claimed_at < NOW() - make_interval(secs => %s))
+            ORDER BY created_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING c.id, c.user_id, c.content, c.moderation_attempts,
+                  (SELECT email FROM users WHERE id = c.user_id) as email
+    """, [MAX_ATTEMPTS, CLAIM_TIMEOUT, limit], fetch_all=True, commit=True)
+
+
+def retract_unmoderated_comment(comment):
+    """Withdraw a comment whose last moderation attempt failed and tell the author"""
+    retracted = db.execute("""
+        UPDATE comments
+        SET status = 'retracted', moderation_reason = %s, moderation_claimed_at = NULL
+        WHERE id = %s AND status = 'pending'
+        RETURNING id
+    """, [UNMODERATED_REASON, comment['id']], commit=True)
+
+    if retracted and comment['email']:
+        send_comment_not_moderated_email(comment['email'])
+
+
+def retract_exhausted_comments():
+    """Retract pending comments whose last claim expired without a decision (e.g. a crashed worker)"""
+    comments = db.execute("""
+        SELECT c.id, (SELECT email FROM users WHERE id = c.user_id) as email
+        FROM comments c
+        WHERE c.status = 'pending'
+          AND c.moderation_attempts >= %s
+          AND c.moderation_claimed_at < NOW() - make_interval(secs => %s)
+        LIMIT %s
+    """, [MAX_ATTEMPTS, CLAIM_TIMEOUT, BATCH_SIZE], fetch_all=True)
+
+    for comment in comments or []:
+        retract_unmoderated_comment(comment)
+
+
+def process_pending_comment(comment):
+    """Moderate one pending comment, then publish or retract it"""
+    try:
+        moderation = moderate_comment(comment['content'])
+    except LLMUnavailableError as e:
+        if comment['moderation_attempts'] >= MAX_ATTEMPTS:
+            print(f"Comment {comment['id']} could not be moderated, retracting: {e}")
+            retract_unmoderated_comment(comment)
+            return
+        # Leave it claimed; it is retried once the claim times out
+        print(f"Comment {comment['id']} moderation deferred: {e}")
+        return
+
+    if moderation['approved']:
+        db.execute("""
+            UPDATE comments
+            SET status = 'published', published_at = NOW(), moderation_claimed_at = NULL
+            WHERE id = %s AND status = 'pending'
+        """, [comment['id']], commit=True)
+        return
+
+    retracted = db.execute("""
+        UPDATE comments
+        SET status = 'retracted', moderation_reason = %s, moderation_claimed_at = NULL
+        WHERE id = %s AND status = 'pending'
+        RETURNING id
+    """, [moderation['reason'], comment['id']], commit=True)
+
+    if not retracted or not comment['user_id']:
+        return
+
+    _, blocked = record_comment_violation(comment['user_id'], comment['content'], moderation)
+
+    if comment['email']:
+        send_comment_retracted_email(
+            comment['email'],
+            moderation['reason'],
+            moderation.get('suggestion'),
+            blocked=blocked
+        )
+
+
+def comment_moderation_worker():
+    """Background worker that drains pending comments"""
+    while True:
+        try:
+            wake_event.wait(POLL_INTERVAL)
+            wake_event.clear()
+
+            retract_exhausted_comments()
+
+            while True:
+                comments = claim_pending_comments()
+                if not comments:
+                    break
+                for comment in comments:
+                    try:
+                        process_pending_comment(comment)
+                    except Exception as e:
+                        print(f"Failed to moderate comment {comment['id']}: {e}")
+        except Exception as e:
+            print(f"Comment moderation worker error: {e}")
+
+
+def start_comment_moderation_worker():
+    """Start the pending comment moderation thread"""
+    thread = threading.Thread(target=comment_moderation_worker, daemon=True)
+    thread.start()
+    print("Comment moderation worker started")
@@ -0,0 +1,58 @@
+"""Run the independent blocking calls of one request side by side
+
+Handlers chain network calls (Postgres, OpenAI, Anthropic) that often don't
+depend on each other. run_concurrently hands them to a shared, bounded thread
+pool and waits for all of them, so the request takes as long as the slowest
+call instead of the sum. Under gevent workers the pool threads are greenlets.
+Calls run outside the request context: pass them plain values, not `request`.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+IO_WORKERS = int(os.environ.get('IO_WORKERS', 16))
+_io_pool = None
+_io_pool_lock = threading.Lock()
+
+
+def _get_io_pool():
+    global _io_pool
+    if _io_pool is None:
+        with _io_pool_lock:
+            if _io_pool is None:
+                _io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix='io')
+    return _io_pool
+
+
+def run_concurrently(*calls):
+    """
+    Run zero-argument callables at once and return their results in order
+    The first call runs on the calling thread. Every call finishes before this
+    returns; if any failed, the first failure (in argument order) is raised.
+    """
+    futures = [_get_io_pool().submit(call) for call in calls[1:]]
+
+    results = []
+    errors = []
+    try:
+        results.append(calls[0]())
+    except Exception as e:
+        results.append(None)
+        errors.append(e)
+
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(None)
+            errors.append(e)
+
+    if errors:
+        raise errors[0]
+    return results
+
+
+def run_in_background(call, *args):
+    """Start call(*args) on the shared pool; returns a Future to wait on later"""
+    return _get_io_pool().submit(call, *args)
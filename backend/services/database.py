@@ -2,14 +2,49 @@
 
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 import os
+import threading
+import uuid
 from contextlib import contextmanager
 
+# Connections per worker process (gunicorn.conf.py sizes the max from the worker mode)
+DB_POOL_MIN_CONN = int(os.environ.get('DB_POOL_MIN_CONN', 1))
+DB_POOL_MAX_CONN = int(os.environ.get('DB_POOL_MAX_CONN', 20))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))  # seconds to wait for a free connection
+
 # Database connection pool
 pool = None
 
 
+class BlockingConnectionPool(ThreadedConnectionPool):
+    """
+    Thread-safe pool that waits for a free connection instead of failing
+    Request threads (gthread) or greenlets (gevent) and the background workers
+    share it; when all connections are out, callers queue for up to `timeout`
+    seconds before PoolError is raised.
+    """
+
+    def __init__(self, minconn, maxconn, *args, timeout=DB_POOL_TIMEOUT, **kwargs):
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._timeout = timeout
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        if not self._slots.acquire(timeout=self._timeout):
+            raise PoolError(f"no database connection free after {self._timeout}s")
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        # Only a connection that actually went back frees a slot
+        super().putconn(conn, key, close)
+        self._slots.release()
+
+
 def init_db_pool():
     """Initialize database connection pool"""
     global pool
@@ -18,9 +53,9 @@ def init_db_pool():
         if not database_url:
             raise ValueError("DATABASE_URL environment variable is required")
 
-        pool = SimpleConnectionPool(
-            minconn=1,
-            maxconn=20,
+        pool = BlockingConnectionPool(
+            minconn=DB_POOL_MIN_CONN,
+            maxconn=DB_POOL_MAX_CONN,
             dsn=database_url
         )
     return pool
@@ -108,9 +143,68 @@ def get_db_cursor(commit=False):
                 pass
 
 
+
+def stream_query(query, params=None, itersize=500):
+    """
+    Yield rows from a server-side (named) cursor, fetching itersize rows per round trip
+    Memory stays flat however many rows match; the connection is held until the generator finishes or is closed.
+    """
+    with get_db_connection() as conn:
+        try:
+            with conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=RealDictCursor) as cursor:
+                cursor.itersize = itersize
+                cursor.execute(query, params or [])
+                for row in cursor:
+                    yield row
+        finally:
+            # Read-only: end the transaction before the connection goes back to the pool
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+
+
+class Transaction:
+    """Statements run on one pinned connection and cursor, committed together"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, query, params=None, fetch_one=False, fetch_all=False):
+        """Execute a query inside the transaction; same return contract as DB.execute"""
+        self.cursor.execute(query, params or [])
+
+        if fetch_one:
+            return self.cursor.fetchone()
+        elif fetch_all:
+            return self.cursor.fetchall()
+        else:
+            # For INSERT/UPDATE with RETURNING
+            try:
+                return self.cursor.fetchone()
+            except psycopg2.ProgrammingError:
+                return None
+
+    def execute_many(self, query, params_list):
+        """Execute a query with multiple parameter sets inside the transaction"""
+        self.cursor.executemany(query, params_list)
+        return self.cursor.rowcount
+
+
 class DB:
     """Database query helper"""
 
+    @staticmethod
+    @contextmanager
+    def transaction():
+        """
+        Unit of work: every statement shares one pooled connection and the block commits once on exit
+        Any exception rolls the whole block back. There is no retry on connection errors, since
+        earlier statements would be lost; callers see the error instead.
+        """
+        with get_db_cursor(commit=True) as cursor:
+            yield Transaction(cursor)
+
     @staticmethod
     def execute(query, params=None, fetch_one=False, fetch_all=False, commit=False):
         """Execute a query and optionally return results with automatic retry on connection errors"""
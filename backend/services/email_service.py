@@ -1,12 +1,37 @@
-"""Email service using SendGrid"""
+"""Email service: templates are queued in email_outbox and delivered by services/email_worker.py"""
 
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
+from email.message import EmailMessage
+from email.utils import formataddr, make_msgid
+from psycopg2.extras import execute_values
+import atexit
+import html
 import os
-from .database import db
+import smtplib
+import threading
+import time
+from .database import get_db_cursor
+from .encryption_service import encrypt_content
+from .email_templates import (
+    SafeHtml, OTP_SIGNUP, OTP_LOGIN, APPLICATION_SUBMITTED, APPLICATION_APPROVED,
+    APPLICATION_REJECTED, MORE_INFO_NEEDED, ANALYSIS_TODOS,
+    COMMENT_SUGGESTION, COMMENT_BLOCKED, COMMENT_RETRACTED, COMMENT_NOT_MODERATED
+)
 
 sg = SendGridAPIClient(os.environ.get('SENDGRID_API_KEY'))
 
+# How queued email leaves the building: sendgrid, smtp (e.g. a local mail
+# catcher) or file (one .eml per message, for tests and development)
+EMAIL_TRANSPORT = os.environ.get('EMAIL_TRANSPORT', 'sendgrid').lower()
+EMAIL_SMTP_HOST = os.environ.get('EMAIL_SMTP_HOST', 'localhost')
+EMAIL_SMTP_PORT = int(os.environ.get('EMAIL_SMTP_PORT', 1025))
+EMAIL_FILE_DIR = os.environ.get('EMAIL_FILE_DIR', '/tmp/letsfindsanity-mail')
+
+# Outbox priority, lowest first: login codes never wait behind bulk mail
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 1
+
 # Different sender configurations
 NOREPLY_EMAIL = os.environ.get('SENDGRID_NOREPLY_EMAIL', 'noreply@letsfindsanity.com')
 NOREPLY_NAME = 'lets find sanity'
@@ -16,31 +41,128 @@ FRED_NAME = 'fred from letsfindsanity'
 
 EMAIL_ENABLED = os.environ.get('EMAIL_ENABLED', 'true').lower() == 'true'
 
+# email_logs rows are buffered and written in batches
+EMAIL_LOG_BATCH_SIZE = 500
+EMAIL_LOG_FLUSH_INTERVAL = 5  # seconds
+
+_log_lock = threading.Lock()
+_log_buffer = []
+_log_flush_event = threading.Event()
+_log_flusher_started = False
+
 
 def log_email(email, email_type, message_id=None, status='sent'):
-    """Log sent email to database"""
+    """Buffer an email_logs row; rows are written in batches by flush_email_logs"""
+    with _log_lock:
+        _log_buffer.append((email, email_type, message_id, status))
+        full = len(_log_buffer) >= EMAIL_LOG_BATCH_SIZE
+    if full:
+        _log_flush_event.set()
+
+
+def flush_email_logs():
+    """Write all buffered email_logs rows in one multi-row insert"""
+    global _log_buffer
+    with _log_lock:
+        if not _log_buffer:
+            return 0
+        batch, _log_buffer = _log_buffer, []
+
     try:
-        db.execute("""
-            INSERT INTO email_logs (email, email_type, sendgrid_message_id, status)
-            VALUES (%s, %s, %s, %s)
-        """, [email, email_type, message_id, status], commit=True)
+        with get_db_cursor(commit=True) as cursor:
+            execute_values(cursor, """
+                INSERT INTO email_logs (email, email_type, sendgrid_message_id, status)
+                VALUES %s
+            """, batch, page_size=EMAIL_LOG_BATCH_SIZE)
+        return len(batch)
     except Exception as e:
-        print(f"Failed to log email: {e}")
-
+        print(f"Failed to log emails: {e}")
+        # Keep the rows so the next flush retries them
+        with _log_lock:
+            _log_buffer = batch + _log_buffer
+        return 0
+
+
+def email_log_flush_worker():
+    """Background worker that flushes buffered email logs periodically or when a batch fills"""
+    while True:
+        try:
+            _log_flush_event.wait(EMAIL_LOG_FLUSH_INTERVAL)
+            _log_flush_event.clear()
+            flush_email_logs()
+        except Exception as e:
+            print(f"Email log flush worker error: {e}")
+
+
+def start_email_log_flusher():
+    """Start the email log flush thread and flush on interpreter exit"""
+    global _log_flusher_started
+    if _log_flusher_started:
+        return
+    _log_flusher_started = True
+
+    atexit.register(flush_email_logs)
+    thread = threading.Thread(target=email_log_flush_worker, daemon=True)
+    thread.start()
+    print(f"Email log flush worker started (every {EMAIL_LOG_FLUSH_INTERVAL} seconds)")
+
+
+def send_email(to_email, subject, html_content, email_type, from_email=None, from_name=None, reply_to=None,
+               priority=PRIORITY_NORMAL):
+    """Queue an email in the outbox; the email worker delivers it with retries"""
+    return queue_emails([{
+        'to_email': to_email, 'subject': subject, 'html_content': html_content, 'email_type': email_type,
+        'from_email': from_email, 'from_name': from_name, 'reply_to': reply_to, 'priority': priority
+    }])
+
+
+def queue_emails(messages):
+    """
+    Queue messages (dicts with send_email's arguments) in one multi-row insert
+    Returns True once they are queued; delivery happens in services/email_worker.py.
+    """
+    from .email_worker import wake_email_sender
 
-def send_email(to_email, subject, html_content, email_type, from_email=None, from_name=None, reply_to=None):
-    """Helper function to send email with common logic"""
     if not EMAIL_ENABLED:
-        print(f"Email disabled. Would send {email_type} to {to_email}")
-        log_email(to_email, email_type, None, 'disabled')
+        for m in messages:
+            print(f"Email disabled. Would send {m['email_type']} to {m['to_email']}")
+            log_email(m['to_email'], m['email_type'], None, 'disabled')
         return True
 
-    # Use provided sender or defaults
-    sender_email = from_email or FRED_EMAIL
-    sender_name = from_name or FRED_NAME
+    # Bodies can quote journal analysis, so they are encrypted like journal content;
+    # a bulk send of one template shares a single token
+    encrypted = {}
+    rows = []
+    for m in messages:
+        body = m['html_content']
+        if body not in encrypted:
+            encrypted[body] = encrypt_content(body)
+        rows.append((
+            m['to_email'], m['subject'], encrypted[body], m['email_type'],
+            m.get('from_email') or FRED_EMAIL, m.get('from_name') or FRED_NAME,
+            m.get('reply_to'), m.get('priority', PRIORITY_NORMAL)
+        ))
+
+    try:
+        with get_db_cursor(commit=True) as cursor:
+            execute_values(cursor, """
+                INSERT INTO email_outbox
+                    (to_email, subject, html_content, email_type, from_email, from_name, reply_to, priority)
+                VALUES %s
+            """, rows, page_size=500)
+    except Exception as e:
+        print(f"Error queueing {len(rows)} email(s): {e}")
+        for m in messages:
+            log_email(m['to_email'], m['email_type'], None, 'failed')
+        return False
+
+    wake_email_sender()
+    return True
+
 
+def _send_via_sendgrid(to_email, subject, html_content, from_email, from_name, reply_to):
     message = Mail(
-        from_email=(sender_email, sender_name),
+        from_email=(from_email, from_name),
         to_emails=to_email,
         subject=subject,
         html_content=html_content
@@ -49,140 +171,109 @@ def send_email(to_email, subject, html_content, email_type, from_email=None, fro
     if reply_to:
         message.reply_to = reply_to
 
-    try:
-        response = sg.send(message)
-        message_id = response.headers.get('X-Message-Id')
-        log_email(to_email, email_type, message_id)
-        return True
-    except Exception as e:
-        print(f"Error sending {email_type} email: {e}")
-        log_email(to_email, email_type, None, 'failed')
-        return False
+    response = sg.send(message)
+    return response.headers.get('X-Message-Id')
 
 
-def send_otp_email(to_email, otp_code, purpose='login'):
-    """Send OTP code via email (uses noreply@letsfindsanity.com)"""
-    subject = "your login code"
-
-    if purpose == "signup":
-        html_content = f"""
-        <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto;">
-            <h2 style="text-transform: lowercase;">welcome to letsfindsanity</h2>
-            <p>your verification code is:</p>
-            <div style="font-size: 32px; font-weight: bold; letter-spacing: 8px; margin: 24px 0;">
-                {otp_code}
-            </div>
-            <p style="color: #666;">this code expires in 10 minutes.</p>
-            <p style="color: #666;">if you didn't request this, you can safely ignore this email.</p>
-        </div>
-        """
-    else:
-        html_content = f"""
-        <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto;">
-            <h2 style="text-transform: lowercase;">your login code</h2>
-            <p>enter this code to continue:</p>
-            <div style="font-size: 32px; font-weight: bold; letter-spacing: 8px; margin: 24px 0;">
-                {otp_code}
-            </div>
-            <p style="color: #666;">this code expires in 10 minutes.</p>
-        </div>
-        """
-
-    # Use noreply for OTPs
-    return send_email(to_email, subject, html_content, "otp",
-                     from_email=NOREPLY_EMAIL, from_name=NOREPLY_NAME)
+def _build_mime(to_email, subject, html_content, from_email, from_name, reply_to):
+    message = EmailMessage()
+    message['From'] = formataddr((from_name, from_email))
+    message['To'] = to_email
+    message['Subject'] = subject
+    message['Message-ID'] = make_msgid(domain=from_email.split('@')[-1])
+    if reply_to:
+        message['Reply-To'] = reply_to
+    message.set_content(html_content, subtype='html')
+    return message
 
 
-def send_application_submitted_email(to_email):
-    """Confirm application submission"""
-    subject = "application received"
-    html_content = """
-    <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto;">
-        <h2 style="text-transform: lowercase;">application received</h2>
-        <p>thanks for applying to join letsfindsanity.</p>
-        <p>we'll review your application and get back to you soon.</p>
-        <p>usually takes 1-2 days.</p>
-    </div>
-    """
-    return send_email(to_email, subject, html_content, "application_submitted")
+def _send_via_smtp(to_email, subject, html_content, from_email, from_name, reply_to):
+    message = _build_mime(to_email, subject, html_content, from_email, from_name, reply_to)
+    with smtplib.SMTP(EMAIL_SMTP_HOST, EMAIL_SMTP_PORT, timeout=10) as smtp:
+        smtp.send_message(message)
+    return message['Message-ID']
 
 
-def send_application_approved_email(to_email):
-    """Notify user of approval"""
-    subject = "you're in"
-    html_content = """
-    <div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif; max-width: 600px; margin: 0 auto; line-height: 1.7; color: #333;">
-        <p>hey,</p>
+def _send_via_file(to_email, subject, html_content, from_email, from_name, reply_to):
+    message = _build_mime(to_email, subject, html_content, from_email, from_name, reply_to)
+    os.makedirs(EMAIL_FILE_DIR, exist_ok=True)
+    name = f"{time.time_ns()}-{message['Message-ID'].strip('<>').split('@')[0]}.eml"
+    with open(os.path.join(EMAIL_FILE_DIR, name), 'wb') as f:
+        f.write(message.as_bytes())
+    return message['Message-ID']
 
-        <p>you're in.</p>
 
-        <p>we know building is hard. really hard. the sleepless nights, the self-doubt, the constant wondering if you're on the right path. but here you are, building anyway. we're genuinely impressed.</p>
+TRANSPORTS = {
+    'sendgrid': _send_via_sendgrid,
+    'smtp': _send_via_smtp,
+    'file': _send_via_file,
+}
 
-        <p>the fact that you're in means you passed the vibe check. this is a space for builders like you to process, reflect, and stay sane.</p>
 
-        <p><strong>meet fred:</strong> fred is your AI companion. write about your day, your struggles, your wins — fred will help you make sense of it all. no judgment, just reflection.</p>
+def deliver_email(to_email, subject, html_content, from_email, from_name, reply_to=None):
+    """Hand one message to the configured transport; returns its message id, raises on failure"""
+    transport = TRANSPORTS.get(EMAIL_TRANSPORT)
+    if transport is None:
+        raise ValueError(f"Unknown EMAIL_TRANSPORT: {EMAIL_TRANSPORT}")
+    return transport(to_email, subject, html_content, from_email, from_name, reply_to)
+
+
+def send_otp_email(to_email, otp_code, purpose='login'):
+    """Send OTP code via email (uses noreply@letsfindsanity.com)"""
+    template = OTP_SIGNUP if purpose == "signup" else OTP_LOGIN
 
-        <p><strong>how it works:</strong><br>
-        - journal privately. fred reads it and helps you reflect.<br>
-        - share with the community when you want (everything's anonymous).<br>
-        - be supportive when others share. we're all in this together.</p>
+    # Use noreply for OTPs, ahead of anything else in the outbox
+    return send_email(to_email, template.subject, template.render(otp_code=otp_code), "otp",
+                     from_email=NOREPLY_EMAIL, from_name=NOREPLY_NAME, priority=PRIORITY_URGENT)
 
-        <p><strong>guidelines (keep it cool):</strong><br>
-        - be kind. we're all fighting our own battles.<br>
-        - no spam, self-promotion, or toxic behavior.<br>
-        - keep it real. this is a judgment-free zone.<br>
-        - respect everyone's anonymity.</p>
 
-        <p><strong>next step:</strong> log in and create your three-word identity (like "thoughtful-midnight-builder"). that's how the community will know you. no real names, just vibes.</p>
+def send_application_submitted_email(to_email):
+    """Confirm application submission"""
+    template = APPLICATION_SUBMITTED
+    return send_email(to_email, template.subject, template.render(), "application_submitted")
 
-        <p>go to: https://letsfindsanity.com</p>
 
-        <p>we're glad you're here.</p>
+def send_application_approved_email(to_email):
+    """Notify user of approval"""
+    return send_application_approved_emails([to_email])
 
-        <p>— fred</p>
-    </div>
-    """
-    return send_email(to_email, subject, html_content, "application_approved")
+
+def send_application_approved_emails(to_emails):
+    """Notify many approved applicants with one outbox insert"""
+    template = APPLICATION_APPROVED
+    html_content = template.render()
+    return queue_emails([
+        {'to_email': to_email, 'subject': template.subject, 'html_content': html_content,
+         'email_type': "application_approved"}
+        for to_email in to_emails
+    ])
 
 
 def send_application_rejected_email(to_email, reason):
     """Notify user of rejection"""
-    subject = "about your application"
-    html_content = f"""
-    <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto;">
-        <h2 style="text-transform: lowercase;">application update</h2>
-        <p>thanks for your interest in letsfindsanity.</p>
-        <p>unfortunately, we're not able to approve your application at this time.</p>
-        <div style="background: #f5f5f5; padding: 16px; margin: 24px 0; border-radius: 4px;">
-            <p style="margin: 0;"><strong>reason:</strong></p>
-            <p style="margin: 8px 0 0 0;">{reason}</p>
-        </div>
-        <p>you're welcome to apply again in the future.</p>
-    </div>
-    """
-    return send_email(to_email, subject, html_content, "application_rejected")
+    return send_application_rejected_emails([to_email], reason)
+
+
+def send_application_rejected_emails(to_emails, reason):
+    """Notify many applicants rejected for the same reason with one outbox insert"""
+    template = APPLICATION_REJECTED
+    html_content = template.render(reason=reason)
+    return queue_emails([
+        {'to_email': to_email, 'subject': template.subject, 'html_content': html_content,
+         'email_type': "application_rejected"}
+        for to_email in to_emails
+    ])
 
 
 def send_more_info_needed_email(to_email, request):
     """Request additional information"""
-    subject = "more information needed"
-    html_content = f"""
-    <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto;">
-        <h2 style="text-transform: lowercase;">additional information needed</h2>
-        <p>we're reviewing your application and need a bit more information:</p>
-        <div style="background: #f5f5f5; padding: 16px; margin: 24px 0; border-radius: 4px;">
-            <p style="margin: 0;">{request}</p>
-        </div>
-        <p>please log in and update your application:</p>
-        <p><a href="https://letsfindsanity.com/apply" style="color: #000;">update application →</a></p>
-    </div>
-    """
-    return send_email(to_email, subject, html_content, "more_info_needed")
+    template = MORE_INFO_NEEDED
+    return send_email(to_email, template.subject, template.render(request=request), "more_info_needed")
 
 
 def send_analysis_todos_email(to_email, journal_title, analysis_text, session_date):
     """Send AI analysis with actionable todos (from fred)"""
-    subject = "your action items from fred"
+    template = ANALYSIS_TODOS
 
     # Extract the "what you could do next" section from the analysis
     # The analysis is in markdown format with ## headings
@@ -200,9 +291,9 @@ def send_analysis_todos_email(to_email, journal_title, analysis_text, session_da
     if not todos_section:
         todos_section = "check your journal entry for the full analysis."
 
-    # Convert markdown to HTML
+    # Convert markdown to HTML, escaping the text first
     # Handle bold text: **text** -> <strong>text</strong>
-    todos_html = todos_section.replace('**', '<strong>', 1)
+    todos_html = html.escape(todos_section).replace('**', '<strong>', 1)
     while '**' in todos_html:
         todos_html = todos_html.replace('**', '</strong>', 1)
         if '**' in todos_html:
@@ -211,32 +302,29 @@ def send_analysis_todos_email(to_email, journal_title, analysis_text, session_da
     # Handle line breaks and bullet points
     todos_html = todos_html.replace('\n-', '<br>•').replace('\n', '<br>')
 
-    html_content = f"""
-    <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto; color: #333;">
-        <h2 style="text-transform: lowercase; color: #000;">hi! i'm fred.</h2>
-
-        <p style="color: #666; font-size: 14px; margin-bottom: 24px;">
-            you asked me to email you the action items from your journal entry.
-        </p>
+    html_content = template.render(
+        journal_title=journal_title,
+        session_date=session_date,
+        todos_html=SafeHtml(todos_html)
+    )
+    return send_email(to_email, template.subject, html_content, "analysis_todos")
 
-        <div style="background: #f8f8f8; padding: 16px; margin: 24px 0; border-left: 3px solid #000;">
-            <p style="margin: 0; font-weight: 600; color: #000;">{journal_title}</p>
-            <p style="margin: 4px 0 0 0; font-size: 13px; color: #999;">{session_date}</p>
-        </div>
 
-        <h3 style="text-transform: lowercase; font-size: 16px; margin-top: 32px;">what you could do next:</h3>
+def send_comment_retracted_email(to_email, reason, suggestion=None, blocked=False):
+    """Tell a commenter their optimistically posted comment was removed by moderation"""
+    template = COMMENT_RETRACTED
 
-        <div style="line-height: 1.8; color: #333;">
-            {todos_html}
-        </div>
+    html_content = template.render(
+        reason=reason,
+        suggestion_html=SafeHtml(COMMENT_SUGGESTION.render(suggestion=suggestion) if suggestion else ""),
+        blocked_html=SafeHtml(COMMENT_BLOCKED.render() if blocked else "")
+    )
+    return send_email(to_email, template.subject, html_content, "comment_retracted",
+                     from_email=NOREPLY_EMAIL, from_name=NOREPLY_NAME)
 
-        <div style="margin-top: 40px; padding-top: 24px; border-top: 1px solid #e0e0e0;">
-            <p style="font-size: 13px; color: #999;">
-                this is from your private journal analysis.
-                <a href="https://letsfindsanity.com/journal" style="color: #000;">view full entry →</a>
-            </p>
-        </div>
-    </div>
-    """
 
-    return send_email(to_email, subject, html_content, "analysis_todos")
+def send_comment_not_moderated_email(to_email):
+    """Tell a commenter their pending comment was withdrawn because moderation kept failing"""
+    template = COMMENT_NOT_MODERATED
+    return send_email(to_email, template.subject, template.render(), "comment_not_moderated",
+                     from_email=NOREPLY_EMAIL, from_name=NOREPLY_NAME)
@@ -0,0 +1,188 @@
+"""Email bodies, compiled once per email type
+
+Each template is split into literal text and named slots at import time, so
+sending only joins strings. Values are HTML-escaped unless they are SafeHtml;
+templates without slots render to the same string every time and are built
+once.
+"""
+
+import html
+from string import Formatter
+
+
+class SafeHtml(str):
+    """Markup built from already-escaped values; inserted without escaping"""
+
+
+class EmailTemplate:
+    """Subject and HTML body for one kind of email"""
+
+    def __init__(self, subject, body):
+        self.subject = subject
+        self.parts = [(literal, field) for literal, field, _, _ in Formatter().parse(body)]
+        self.fields = {field for _, field in self.parts if field}
+        self._static = None if self.fields else ''.join(literal for literal, _ in self.parts)
+
+    def render(self, **values):
+        """Fill the slots; static templates return the prebuilt body"""
+        if self._static is not None:
+            return self._static
+
+        out = []
+        for literal, field in self.parts:
+            out.append(literal)
+            if field:
+                value = values[field]
+                out.append(value if isinstance(value, SafeHtml) else html.escape(str(value)))
+        return ''.join(out)
+
+
+OTP_SIGNUP = EmailTemplate("your login code", """
+        <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto;">
+            <h2 style="text-transform: lowercase;">welcome to letsfindsanity</h2>
+            <p>your verification code is:</p>
+            <div style="font-size: 32px; font-weight: bold; letter-spacing: 8px; margin: 24px 0;">
+                {otp_code}
+            </div>
+            <p style="color: #666;">this code expires in 10 minutes.</p>
+            <p style="color: #666;">if you didn't request this, you can safely ignore this email.</p>
+        </div>
+        """)
+
+OTP_LOGIN = EmailTemplate("your login code", """
+        <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto;">
+            <h2 style="text-transform: lowercase;">your login code</h2>
+            <p>enter this code to continue:</p>
+            <div style="font-size: 32px; font-weight: bold; letter-spacing: 8px; margin: 24px 0;">
+                {otp_code}
+            </div>
+            <p style="color: #666;">this code expires in 10 minutes.</p>
+        </div>
+        """)
+
+APPLICATION_SUBMITTED = EmailTemplate("application received", """
+    <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto;">
+        <h2 style="text-transform: lowercase;">application received</h2>
+        <p>thanks for applying to join letsfindsanity.</p>
+        <p>we'll review your application and get back to you soon.</p>
+        <p>usually takes 1-2 days.</p>
+    </div>
+    """)
+
+APPLICATION_APPROVED = EmailTemplate("you're in", """
+    <div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif; max-width: 600px; margin: 0 auto; line-height: 1.7; color: #333;">
+        <p>hey,</p>
+
+        <p>you're in.</p>
+
+        <p>we know building is hard. really hard. the sleepless nights, the self-doubt, the constant wondering if you're on the right path. but here you are, building anyway. we're genuinely impressed.</p>
+
+        <p>the fact that you're in means you passed the vibe check. this is a space for builders like you to process, reflect, and stay sane.</p>
+
+        <p><strong>meet fred:</strong> fred is your AI companion. write about your day, your struggles, your wins — fred will help you make sense of it all. no judgment, just reflection.</p>
+
+        <p><strong>how it works:</strong><br>
+        - journal privately. fred reads it and helps you reflect.<br>
+        - share with the community when you want (everything's anonymous).<br>
+        - be supportive when others share. we're all in this together.</p>
+
+        <p><strong>guidelines (keep it cool):</strong><br>
+        - be kind. we're all fighting our own battles.<br>
+        - no spam, self-promotion, or toxic behavior.<br>
+        - keep it real. this is a judgment-free zone.<br>
+        - respect everyone's anonymity.</p>
+
+        <p><strong>next step:</strong> log in and create your three-word identity (like "thoughtful-midnight-builder"). that's how the community will know you. no real names, just vibes.</p>
+
+        <p>go to: https://letsfindsanity.com</p>
+
+        <p>we're glad you're here.</p>
+
+        <p>— fred</p>
+    </div>
+    """)
+
+APPLICATION_REJECTED = EmailTemplate("about your application", """
+    <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto;">
+        <h2 style="text-transform: lowercase;">application update</h2>
+        <p>thanks for your interest in letsfindsanity.</p>
+        <p>unfortunately, we're not able to approve your application at this time.</p>
+        <div style="background: #f5f5f5; padding: 16px; margin: 24px 0; border-radius: 4px;">
+            <p style="margin: 0;"><strong>reason:</strong></p>
+            <p style="margin: 8px 0 0 0;">{reason}</p>
+        </div>
+        <p>you're welcome to apply again in the future.</p>
+    </div>
+    """)
+
+MORE_INFO_NEEDED = EmailTemplate("more information needed", """
+    <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto;">
+        <h2 style="text-transform: lowercase;">additional information needed</h2>
+        <p>we're reviewing your application and need a bit more information:</p>
+        <div style="background: #f5f5f5; padding: 16px; margin: 24px 0; border-radius: 4px;">
+            <p style="margin: 0;">{request}</p>
+        </div>
+        <p>please log in and update your application:</p>
+        <p><a href="https://letsfindsanity.com/apply" style="color: #000;">update application →</a></p>
+    </div>
+    """)
+
+ANALYSIS_TODOS = EmailTemplate("your action items from fred", """
+    <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto; color: #333;">
+        <h2 style="text-transform: lowercase; color: #000;">hi! i'm fred.</h2>
+
+        <p style="color: #666; font-size: 14px; margin-bottom: 24px;">
+            you asked me to email you the action items from your journal entry.
+        </p>
+
+        <div style="background: #f8f8f8; padding: 16px; margin: 24px 0; border-left: 3px solid #000;">
+            <p style="margin: 0; font-weight: 600; color: #000;">{journal_title}</p>
+            <p style="margin: 4px 0 0 0; font-size: 13px; color: #999;">{session_date}</p>
+        </div>
+
+        <h3 style="text-transform: lowercase; font-size: 16px; margin-top: 32px;">what you could do next:</h3>
+
+        <div style="line-height: 1.8; color: #333;">
+            {todos_html}
+        </div>
+
+        <div style="margin-top: 40px; padding-top: 24px; border-top: 1px solid #e0e0e0;">
+            <p style="font-size: 13px; color: #999;">
+                this is from your private journal analysis.
+                <a href="https://letsfindsanity.com/journal" style="color: #000;">view full entry →</a>
+            </p>
+        </div>
+    </div>
+    """)
+
+# Pieces of the comment retracted email
+COMMENT_SUGGESTION = EmailTemplate(None, """
+        <p><strong>how you could rephrase it:</strong></p>
+        <p style="margin: 8px 0 0 0;">{suggestion}</p>
+        """)
+
+COMMENT_BLOCKED = EmailTemplate(None, """
+        <p>because of repeated violations, you can no longer comment on posts.</p>
+        """)
+
+COMMENT_RETRACTED = EmailTemplate("your comment was removed", """
+    <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto;">
+        <h2 style="text-transform: lowercase;">your comment was removed</h2>
+        <p>a comment you posted didn't pass moderation, so it's no longer visible to others.</p>
+        <div style="background: #f5f5f5; padding: 16px; margin: 24px 0; border-radius: 4px;">
+            <p style="margin: 0;"><strong>reason:</strong></p>
+            <p style="margin: 8px 0 0 0;">{reason}</p>
+            {suggestion_html}
+        </div>
+        {blocked_html}
+        <p style="color: #666;">letsfindsanity is a supportive space. challenge ideas, not people.</p>
+    </div>
+    """)
+
+COMMENT_NOT_MODERATED = EmailTemplate("your comment couldn't be posted", """
+    <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto;">
+        <h2 style="text-transform: lowercase;">your comment couldn't be posted</h2>
+        <p>we couldn't run moderation on a comment you posted, so it's no longer visible to others.</p>
+        <p>this wasn't anything you wrote. please post it again in a little while.</p>
+    </div>
+    """)
@@ -0,0 +1,163 @@
+"""Background email sender
+
+send_email only queues messages in email_outbox. This worker claims due
+messages in batches (SKIP LOCKED, so every app worker can send), hands them
+to the configured transport and records the outcome. Transient failures are
+retried with exponential backoff; rejected messages fail straight away.
+Every final outcome is logged to email_logs through the buffered logger.
+"""
+
+import threading
+from psycopg2.extras import execute_values
+from .database import db, get_db_cursor
+from .email_service import deliver_email, log_email
+from .encryption_service import decrypt_content
+
+EMAIL_BATCH_SIZE = 50
+POLL_INTERVAL = 10  # seconds between sweeps when not woken up
+CLAIM_TIMEOUT = 600  # seconds before a message stuck in sending is retried
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30  # doubles with every attempt
+OUTBOX_RETENTION_DAYS = 7
+
+wake_event = threading.Event()
+_worker_started = False
+
+
+def wake_email_sender():
+    """Wake this process's sender right after a message is queued"""
+    wake_event.set()
+
+
+def claim_email_batch():
+    """Claim up to EMAIL_BATCH_SIZE due messages, most urgent first"""
+    batch = db.execute("""
+        UPDATE email_outbox o
+        SET status = 'sending',
+            claimed_at = NOW(),
+            attempts = o.attempts + 1
+        WHERE o.id IN (
+            SELECT id FROM email_outbox
+            WHERE (status = 'pending' AND next_attempt_at <= NOW())
+               OR (status = 'sending' AND claimed_at < NOW() - make_interval(secs => %s))
+            ORDER BY priority, id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING o.id, o.to_email, o.subject, o.html_content, o.email_type,
+                  o.from_email, o.from_name, o.reply_to, o.priority, o.attempts
+    """, [CLAIM_TIMEOUT, EMAIL_BATCH_SIZE], fetch_all=True, commit=True)
+    return sorted(batch, key=lambda m: (m['priority'], m['id']))
+
+
+def is_permanent_failure(error):
+    """A 4xx from the provider (other than rate limiting) won't succeed on retry"""
+    status = getattr(error, 'status_code', None)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+def send_batch(batch):
+    """Deliver a claimed batch and record every outcome in one transaction"""
+    sent, retry, failed, logs = [], [], [], []
+
+    for message in batch:
+        try:
+            message_id = deliver_email(
+                message['to_email'],
+                message['subject'],
+                decrypt_content(message['html_content']),
+                message['from_email'],
+                message['from_name'],
+                message['reply_to']
+            )
+        except Exception as e:
+            error = str(e)[:500]
+            print(f"Error sending {message['email_type']} email (attempt {message['attempts']}): {e}")
+            if message['attempts'] >= MAX_ATTEMPTS or is_permanent_failure(e):
+                failed.append((error, message['id']))
+                logs.append((message['to_email'], message['email_type'], None, 'failed'))
+            else:
+                delay = RETRY_BASE_SECONDS * 2 ** (message['attempts'] - 1)
+                retry.append((delay, error, message['id']))
+            continue
+
+        sent.append((message_id, message['id']))
+        logs.append((message['to_email'], message['email_type'], message_id, 'sent'))
+
+    # One multi-row UPDATE per outcome
+    with get_db_cursor(commit=True) as cursor:
+        if sent:
+            # The body is no longer needed once it has left
+            execute_values(cursor, """
+                UPDATE email_outbox o
+                SET status = 'sent', message_id = v.message_id, html_content = NULL,
+                    last_error = NULL, sent_at = NOW()
+                FROM (VALUES %s) AS v(message_id, id)
+                WHERE o.id = v.id
+            """, sent, template="(%s, %s::bigint)")
+        if retry:
+            execute_values(cursor, """
+                UPDATE email_outbox o
+                SET status = 'pending', next_attempt_at = NOW() + make_interval(secs => v.delay),
+                    last_error = v.error, claimed_at = NULL
+                FROM (VALUES %s) AS v(delay, error, id)
+                WHERE o.id = v.id
+            """, retry, template="(%s::int, %s, %s::bigint)")
+        if failed:
+            execute_values(cursor, """
+                UPDATE email_outbox o
+                SET status = 'failed', last_error = v.error, claimed_at = NULL
+                FROM (VALUES %s) AS v(error, id)
+                WHERE o.id = v.id
+            """, failed, template="(%s, %s::bigint)")
+
+    for row in logs:
+        log_email(*row)
+
+    return len(sent)
+
+
+def purge_email_outbox(batch_size=5000):
+    """Remove one batch of sent or failed messages past retention; returns rows deleted"""
+    result = db.execute("""
+        WITH gone AS (
+            DELETE FROM email_outbox WHERE id IN (
+                SELECT id FROM email_outbox
+                WHERE status IN ('sent', 'failed')
+                  AND created_at < NOW() - make_interval(days => %s)
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING 1
+        )
+        SELECT COUNT(*) AS deleted FROM gone
+    """, [OUTBOX_RETENTION_DAYS, batch_size], fetch_one=True, commit=True)
+    return result['deleted']
+
+
+def email_sender():
+    """Background worker that drains the outbox"""
+    while True:
+        try:
+            wake_event.wait(POLL_INTERVAL)
+            wake_event.clear()
+
+            while True:
+                batch = claim_email_batch()
+                if not batch:
+                    break
+                send_batch(batch)
+        except Exception as e:
+            print(f"Email sender error: {e}")
+
+
+def start_email_sender():
+    """Start the email sender thread"""
+    global _worker_started
+    if _worker_started:
+        return
+    _worker_started = True
+
+    thread = threading.Thread(target=email_sender, daemon=True)
+    thread.start()
+    print("Email sender started")
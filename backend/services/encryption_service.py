@@ -1,16 +1,60 @@
 """Encryption service for sensitive data"""
 
 import os
-from cryptography.fernet import Fernet
-import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
 
+# Cipher built once from ENCRYPTION_KEY and reused for every call
+_cipher = None
+_primary = None
+_cipher_lock = threading.Lock()
 
-def get_encryption_key():
-    """Get encryption key from environment variable"""
-    key = os.getenv('ENCRYPTION_KEY')
-    if not key:
+# Batches at least this large are decrypted on the shared thread pool
+PARALLEL_DECRYPT_THRESHOLD = 32
+DECRYPT_WORKERS = int(os.environ.get('DECRYPT_WORKERS', min(4, os.cpu_count() or 1)))
+_decrypt_pool = None
+_decrypt_pool_lock = threading.Lock()
+
+# Length of the encrypted preview stored for journal list views
+EXCERPT_LENGTH = 280
+
+
+def get_encryption_keys():
+    """
+    Get encryption keys from environment variable.
+    ENCRYPTION_KEY may hold several comma-separated keys, newest first:
+    new entries are encrypted with the first key, and any listed key can decrypt.
+    """
+    value = os.getenv('ENCRYPTION_KEY')
+    if not value:
         raise ValueError("ENCRYPTION_KEY not found in environment variables")
-    return key.encode()
+    return [key.strip().encode() for key in value.split(',') if key.strip()]
+
+
+def get_encryption_key():
+    """Get the current (newest) encryption key"""
+    return get_encryption_keys()[0]
+
+
+def get_cipher():
+    """Get the shared MultiFernet cipher, building it on first use"""
+    global _cipher, _primary
+    if _cipher is None:
+        with _cipher_lock:
+            if _cipher is None:
+                fernets = [Fernet(key) for key in get_encryption_keys()]
+                _primary = fernets[0]
+                _cipher = MultiFernet(fernets)
+    return _cipher
+
+
+def reset_cipher():
+    """Drop the cached cipher so the next call re-reads ENCRYPTION_KEY"""
+    global _cipher, _primary
+    with _cipher_lock:
+        _cipher = None
+        _primary = None
 
 
 def encrypt_content(plaintext: str) -> str:
@@ -27,9 +71,7 @@ def encrypt_content(plaintext: str) -> str:
         return ''
 
     try:
-        key = get_encryption_key()
-        f = Fernet(key)
-        encrypted = f.encrypt(plaintext.encode())
+        encrypted = get_cipher().encrypt(plaintext.encode())
         return encrypted.decode()
     except Exception as e:
         # Log error but don't expose encryption details
@@ -37,6 +79,20 @@ def encrypt_content(plaintext: str) -> str:
         raise ValueError("Failed to encrypt content")
 
 
+def make_excerpt(plaintext: str, length: int = EXCERPT_LENGTH) -> str:
+    """Short single-line preview of content, cut on a word boundary"""
+    text = ' '.join((plaintext or '').split())
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0] or text[:length]
+    return cut.rstrip(' .,;:') + '…'
+
+
+def encrypt_excerpt(plaintext: str) -> str:
+    """Encrypt the list-view preview of content"""
+    return encrypt_content(make_excerpt(plaintext))
+
+
 def is_encrypted(content: str) -> bool:
     """
     Check if content appears to be encrypted (Fernet format)
@@ -74,11 +130,94 @@ def decrypt_content(encrypted: str) -> str:
         return encrypted
 
     try:
-        key = get_encryption_key()
-        f = Fernet(key)
-        decrypted = f.decrypt(encrypted.encode())
+        decrypted = get_cipher().decrypt(encrypted.encode())
         return decrypted.decode()
     except Exception as e:
         # Log error but don't expose encryption details
         print(f"Decryption error: {str(e)}")
         raise ValueError("Failed to decrypt content")
+
+
+def _decrypt_or_default(encrypted, default):
+    try:
+        return decrypt_content(encrypted)
+    except ValueError:
+        return default
+
+
+def _decrypt_chunk(chunk, default):
+    return [_decrypt_or_default(token, default) for token in chunk]
+
+
+def _get_decrypt_pool():
+    global _decrypt_pool
+    if _decrypt_pool is None:
+        with _decrypt_pool_lock:
+            if _decrypt_pool is None:
+                _decrypt_pool = ThreadPoolExecutor(max_workers=DECRYPT_WORKERS, thread_name_prefix='decrypt')
+    return _decrypt_pool
+
+
+def decrypt_many(tokens, default=''):
+    """
+    Decrypt a batch of stored contents, preserving order
+
+    Small batches are decrypted inline; large ones are split into chunks and
+    decrypted on a shared thread pool. A token that fails to decrypt yields
+    `default` instead of failing the whole batch.
+
+    Args:
+        tokens: Iterable of encrypted strings (or legacy plaintext / empty values)
+        default: Value returned for items that cannot be decrypted
+
+    Returns:
+        List of decrypted strings in the same order as tokens
+    """
+    tokens = list(tokens)
+    if len(tokens) < PARALLEL_DECRYPT_THRESHOLD or DECRYPT_WORKERS < 2:
+        return _decrypt_chunk(tokens, default)
+
+    # Build the cipher once before fanning out
+    get_cipher()
+    chunk_size = -(-len(tokens) // DECRYPT_WORKERS)
+    chunks = [tokens[i:i + chunk_size] for i in range(0, len(tokens), chunk_size)]
+    futures = [_get_decrypt_pool().submit(_decrypt_chunk, chunk, default) for chunk in chunks]
+
+    results = []
+    for future in futures:
+        results.extend(future.result())
+    return results
+
+
+def needs_rotation(content: str) -> bool:
+    """Check if stored content is plaintext or encrypted with an older key"""
+    if not content:
+        return False
+
+    if not is_encrypted(content):
+        return True
+
+    get_cipher()
+    try:
+        _primary.decrypt(content.encode())
+        return False
+    except InvalidToken:
+        return True
+
+
+def rotate_content(content: str) -> str:
+    """
+    Re-encrypt stored content with the newest key
+    Legacy plaintext is encrypted; tokens under older keys are rotated.
+    """
+    if not content:
+        return content
+
+    if not is_encrypted(content):
+        return encrypt_content(content)
+
+    try:
+        return get_cipher().rotate(content.encode()).decode()
+    except Exception as e:
+        print(f"Key rotation error: {str(e)}")
+        raise ValueError("Failed to rotate content")
@@ -0,0 +1,375 @@
+"""Journal export builders and encrypted export archives
+
+Entries are read through a server-side cursor and rendered incrementally as
+JSON, NDJSON or a ZIP of markdown files. Background export jobs write the
+rendered (compressed) export to disk as a sequence of fixed-size Fernet
+chunks, so any byte range can be served by decrypting only the chunks it
+touches.
+"""
+
+import hashlib
+import json
+import os
+import re
+import secrets
+import tempfile
+import uuid
+import zipfile
+import zlib
+from datetime import datetime
+from itertools import groupby
+from .database import db, stream_query
+from .encryption_service import decrypt_many, get_cipher
+
+# Sessions decrypted and written per step of a streamed export
+EXPORT_BATCH_SIZE = 100
+
+EXPORT_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'zip': 'application/zip',
+}
+
+# Background export archives
+EXPORT_STORAGE_DIR = os.environ.get('EXPORT_STORAGE_DIR', os.path.join(tempfile.gettempdir(), 'letsfindsanity-exports'))
+EXPORT_RETENTION_HOURS = int(os.environ.get('EXPORT_RETENTION_HOURS', 24))
+EXPORT_TOKEN_MINUTES = int(os.environ.get('EXPORT_TOKEN_MINUTES', 60))
+
+# Plaintext bytes per encrypted chunk; every chunk but the last has the same token length
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+
+# One row per (session, comment): sessions with their shared post and its comments
+EXPORT_QUERY = """
+    SELECT
+        s.id, s.raw_content, s.ai_analysis, s.title, s.intent, s.topics,
+        s.started_at, s.completed_at,
+        p.id AS post_id, p.clear_ask,
+        c.id AS comment_id, c.content AS comment_content, c.created_at AS comment_created_at,
+        c.is_ai_analysis, u.three_word_id AS comment_author
+    FROM sessions s
+    LEFT JOIN posts p ON p.session_id = s.id
+    LEFT JOIN comments c ON c.post_id = p.id AND c.status = 'published'
+    LEFT JOIN users u ON c.user_id = u.id
+    WHERE s.user_id = %s
+    ORDER BY s.started_at DESC, s.id, c.created_at ASC
+"""
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def iter_export_entries(user_id):
+    """Yield export entries one session at a time, decrypting in batches"""
+    sessions = groupby(stream_query(EXPORT_QUERY, [user_id]), key=lambda row: row['id'])
+
+    batch = []
+    for _, rows in sessions:
+        batch.append(list(rows))
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield from _build_entries(batch)
+            batch = []
+    if batch:
+        yield from _build_entries(batch)
+
+
+def _build_entries(batch):
+    contents = decrypt_many(rows[0]['raw_content'] for rows in batch)
+
+    for rows, content in zip(batch, contents):
+        session = rows[0]
+        yield {
+            'id': str(session['id']),
+            'title': session.get('title', ''),
+            'original_content': content,
+            'analyzed_content': session.get('ai_analysis'),
+            'clear_ask': session.get('clear_ask'),
+            'intent': session.get('intent'),
+            'topics': session.get('topics', []),
+            'created_at': _iso(session.get('started_at')),
+            'updated_at': _iso(session.get('completed_at')),
+            'is_analyzed': bool(session.get('ai_analysis')),
+            'shared_as_post': session['post_id'] is not None,
+            'comments': [
+                {
+                    'id': str(c['comment_id']),
+                    'content': c['comment_content'],
+                    'is_ai_analysis': c.get('is_ai_analysis') or False,
+                    'author': 'AI Analysis' if c.get('is_ai_analysis') else (c.get('comment_author') or 'Anonymous'),
+                    'created_at': _iso(c.get('comment_created_at'))
+                }
+                for c in rows
+                if c['comment_id'] is not None
+            ]
+        }
+
+
+def export_metadata(user_id):
+    """Export header: date, user and entry count"""
+    user = db.execute("SELECT email, three_word_id FROM users WHERE id = %s", [user_id], fetch_one=True)
+    total = db.execute("SELECT COUNT(*) as count FROM sessions WHERE user_id = %s", [user_id], fetch_one=True)
+
+    return {
+        'export_date': datetime.utcnow().isoformat(),
+        'user': {
+            'email': user['email'] if user else None,
+            'three_word_id': user.get('three_word_id') if user else None
+        },
+        'total_entries': total['count']
+    }
+
+
+def stream_json(metadata, entries):
+    """Chunked JSON: the metadata object with entries written one at a time"""
+    head = json.dumps(metadata)
+    yield head[:-1] + ', "entries": ['
+    for i, entry in enumerate(entries):
+        yield (', ' if i else '') + json.dumps(entry)
+    yield ']}'
+
+
+def stream_ndjson(entries):
+    """One JSON entry per line"""
+    for entry in entries:
+        yield json.dumps(entry) + '\n'
+
+
+def entry_markdown(entry):
+    """Render one entry as a markdown document"""
+    lines = [f"# {entry['title'] or 'untitled'}", '']
+    lines.append(f"- date: {entry['created_at'] or 'unknown'}")
+    if entry['intent']:
+        lines.append(f"- intent: {entry['intent']}")
+    if entry['topics']:
+        lines.append(f"- topics: {', '.join(entry['topics'])}")
+    lines += ['', entry['original_content'] or '', '']
+
+    if entry['analyzed_content']:
+        lines += ['## reflection', '', entry['analyzed_content'], '']
+
+    if entry['clear_ask']:
+        lines += ['## ask', '', entry['clear_ask'], '']
+
+    if entry['comments']:
+        lines += ['## comments', '']
+        for c in entry['comments']:
+            lines += [f"**{c['author']}** ({c['created_at']})", '', c['content'], '']
+
+    return '\n'.join(lines)
+
+
+def entry_filename(entry):
+    date = (entry['created_at'] or '')[:10] or 'undated'
+    slug = re.sub(r'[^a-z0-9]+', '-', (entry['title'] or 'untitled').lower()).strip('-')[:60] or 'untitled'
+    return f"{date}-{slug}-{entry['id'][:8]}.md"
+
+
+class _ZipStream:
+    """Write-only buffer zipfile can stream into; without tell() zipfile writes data descriptors"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def stream_zip(metadata, entries):
+    """Streamed ZIP with one markdown file per entry plus export.json metadata"""
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for entry in entries:
+            archive.writestr(f"journal/{entry_filename(entry)}", entry_markdown(entry))
+            yield stream.take()
+        archive.writestr('export.json', json.dumps(metadata, indent=2))
+    yield stream.take()
+
+
+def stream_export(user_id, export_format):
+    """Body chunks (str or bytes) for an export in the given format"""
+    entries = iter_export_entries(user_id)
+    if export_format == 'ndjson':
+        return stream_ndjson(entries)
+    metadata = export_metadata(user_id)
+    if export_format == 'zip':
+        return stream_zip(metadata, entries)
+    return stream_json(metadata, entries)
+
+
+# --- Background export archives ---
+
+def archive_filename(export_format, created_at=None):
+    """Download filename; json and ndjson archives are gzip-compressed"""
+    day = (created_at or datetime.utcnow()).strftime('%Y%m%d')
+    suffix = 'zip' if export_format == 'zip' else f"{export_format}.gz"
+    return f"journal-export-{day}.{suffix}"
+
+
+def archive_mimetype(export_format):
+    return 'application/zip' if export_format == 'zip' else 'application/gzip'
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class EncryptedArchiveWriter:
+    """Writes plaintext as newline-separated Fernet tokens of ARCHIVE_CHUNK_SIZE bytes each"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.buffer = bytearray()
+        self.size = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.size += len(data)
+        while len(self.buffer) >= ARCHIVE_CHUNK_SIZE:
+            self._write_chunk(bytes(self.buffer[:ARCHIVE_CHUNK_SIZE]))
+            del self.buffer[:ARCHIVE_CHUNK_SIZE]
+
+    def _write_chunk(self, chunk):
+        self.file.write(get_cipher().encrypt(chunk) + b'\n')
+
+    def close(self):
+        if self.buffer:
+            self._write_chunk(bytes(self.buffer))
+            self.buffer.clear()
+        self.file.close()
+
+
+_full_chunk_token_length = None
+
+
+def _chunk_stride():
+    """Bytes on disk per full chunk (token plus newline); Fernet token length depends only on plaintext length"""
+    global _full_chunk_token_length
+    if _full_chunk_token_length is None:
+        _full_chunk_token_length = len(get_cipher().encrypt(b'\0' * ARCHIVE_CHUNK_SIZE))
+    return _full_chunk_token_length + 1
+
+
+def archive_path(job_id):
+    return os.path.join(EXPORT_STORAGE_DIR, f"{job_id}.export")
+
+
+def write_export_archive(job_id, user_id, export_format, attempt=0, heartbeat=None):
+    """
+    Render an export to its encrypted archive; returns the plaintext archive size in bytes
+    Each attempt writes its own partial file. heartbeat, if given, is called
+    after every chunk and once before the archive is moved into place; it
+    raises to abort the write.
+    """
+    os.makedirs(EXPORT_STORAGE_DIR, mode=0o700, exist_ok=True)
+    path = archive_path(job_id)
+    partial = f"{path}.{attempt}.part"
+
+    chunks = stream_export(user_id, export_format)
+    if export_format != 'zip':
+        chunks = _gzip_chunks(chunks)
+
+    writer = EncryptedArchiveWriter(partial)
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+            if heartbeat:
+                heartbeat()
+        writer.close()
+        if heartbeat:
+            heartbeat()
+        os.replace(partial, path)
+    except Exception:
+        writer.close()
+        remove_export_archive(partial)
+        raise
+    return writer.size
+
+
+def read_export_archive(path, start, stop):
+    """Yield decrypted archive bytes in [start, stop), decrypting only the chunks in range"""
+    stride = _chunk_stride()
+    cipher = get_cipher()
+    index = start // ARCHIVE_CHUNK_SIZE
+    offset = start - index * ARCHIVE_CHUNK_SIZE
+    remaining = stop - start
+
+    with open(path, 'rb') as f:
+        f.seek(index * stride)
+        while remaining > 0:
+            token = f.readline().strip()
+            if not token:
+                break
+            chunk = cipher.decrypt(token)[offset:offset + remaining]
+            offset = 0
+            remaining -= len(chunk)
+            yield chunk
+
+
+def remove_export_archive(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _hash_download_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_download_token(job_id, user_id):
+    """
+    Issue a random single-use token for downloading one export archive
+    Only its hash is stored on the job; issuing a new token replaces the previous one.
+    """
+    token = secrets.token_urlsafe(32)
+    job = db.execute("""
+        UPDATE export_jobs
+        SET download_token_hash = %s,
+            download_token_expires_at = NOW() + make_interval(mins => %s)
+        WHERE id = %s AND user_id = %s
+        RETURNING download_token_expires_at
+    """, [_hash_download_token(token), EXPORT_TOKEN_MINUTES, job_id, user_id], fetch_one=True, commit=True)
+    return token, job['download_token_expires_at']
+
+
+def verify_download_token(token, job_id, consume=False):
+    """
+    Return the job owner's user id if the token authorizes downloading this job, else None
+    With consume=True the token is cleared in the same statement, so it works once.
+    """
+    try:
+        job_id = str(uuid.UUID(job_id))
+    except ValueError:
+        return None
+    if not token:
+        return None
+
+    params = [job_id, _hash_download_token(token)]
+    if consume:
+        job = db.execute("""
+            UPDATE export_jobs
+            SET download_token_hash = NULL, download_token_expires_at = NULL
+            WHERE id = %s AND download_token_hash = %s AND download_token_expires_at > NOW()
+            RETURNING user_id
+        """, params, fetch_one=True, commit=True)
+    else:
+        job = db.execute("""
+            SELECT user_id FROM export_jobs
+            WHERE id = %s AND download_token_hash = %s AND download_token_expires_at > NOW()
+        """, params, fetch_one=True)
+    return str(job['user_id']) if job else None
@@ -0,0 +1,186 @@
+"""Background journal export jobs
+
+POST /api/export/journal/jobs queues a job; this worker claims queued jobs
+(SKIP LOCKED, so every app worker can run one), writes the encrypted export
+archive to EXPORT_STORAGE_DIR and marks the job completed. While writing it
+refreshes claimed_at every HEARTBEAT_INTERVAL, so only a job whose worker died
+is picked up again; jobs that died on their last attempt are marked failed.
+Expired archives are removed on the same loop.
+"""
+
+import os
+import threading
+import time
+from .database import db
+from .export_service import (
+    EXPORT_RETENTION_HOURS, EXPORT_STORAGE_DIR,
+    archive_path, remove_export_archive, write_export_archive
+)
+
+POLL_INTERVAL = 10  # seconds between sweeps when not woken up
+CLAIM_TIMEOUT = 1800  # seconds without a heartbeat before a running job may be picked up again
+HEARTBEAT_INTERVAL = 60  # seconds between claimed_at refreshes while writing
+MAX_ATTEMPTS = 3
+CLEANUP_INTERVAL = 600  # seconds between expired archive sweeps
+
+wake_event = threading.Event()
+_worker_started = False
+
+
+class ClaimLost(Exception):
+    """The job was reclaimed by another attempt; this one must stop writing"""
+
+
+def wake_export_worker():
+    """Wake this process's worker right after a job is queued"""
+    wake_event.set()
+
+
+def claim_export_job():
+    """Claim the oldest queued job nobody else is working on"""
+    return db.execute("""
+        UPDATE export_jobs j
+        SET status = 'running',
+            claimed_at = NOW(),
+            attempts = j.attempts + 1
+        WHERE j.id = (
+            SELECT id FROM export_jobs
+            WHERE attempts < %s
+              AND (status = 'pending'
+                   OR (status = 'running' AND claimed_at < NOW() - make_interval(secs => %s)))
+            ORDER BY created_at
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING j.id, j.user_id, j.format, j.attempts
+    """, [MAX_ATTEMPTS, CLAIM_TIMEOUT], commit=True)
+
+
+def fail_exhausted_export_jobs():
+    """Fail running jobs whose last attempt stopped heartbeating (e.g. a crash or deploy)"""
+    return db.execute("""
+        UPDATE export_jobs
+        SET status = 'failed',
+            error = 'Export did not finish after ' || attempts || ' attempts',
+            claimed_at = NULL
+        WHERE status = 'running'
+          AND attempts >= %s
+          AND claimed_at < NOW() - make_interval(secs => %s)
+        RETURNING id
+    """, [MAX_ATTEMPTS, CLAIM_TIMEOUT], fetch_all=True, commit=True)
+
+
+def job_heartbeat(job):
+    """Heartbeat callable for write_export_archive; raises ClaimLost once the job was reclaimed"""
+    last_beat = time.monotonic()
+
+    def heartbeat():
+        nonlocal last_beat
+        if time.monotonic() - last_beat < HEARTBEAT_INTERVAL:
+            return
+        owned = db.execute("""
+            UPDATE export_jobs
+            SET claimed_at = NOW()
+            WHERE id = %s AND status = 'running' AND attempts = %s
+            RETURNING id
+        """, [job['id'], job['attempts']], commit=True)
+        if not owned:
+            raise ClaimLost(f"Export job {job['id']} attempt {job['attempts']} was reclaimed")
+        last_beat = time.monotonic()
+
+    return heartbeat
+
+
+def run_export_job(job):
+    """Write one job's archive and record the result"""
+    try:
+        size = write_export_archive(
+            job['id'], job['user_id'], job['format'],
+            attempt=job['attempts'], heartbeat=job_heartbeat(job)
+        )
+    except ClaimLost as e:
+        # The newer attempt owns the job and its status
+        print(e)
+        return
+    except Exception as e:
+        print(f"Export job {job['id']} failed (attempt {job['attempts']}): {e}")
+        # Requeue until attempts run out
+        db.execute("""
+            UPDATE export_jobs
+            SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                error = %s,
+                claimed_at = NULL
+            WHERE id = %s AND attempts = %s
+        """, [MAX_ATTEMPTS, str(e)[:500], job['id'], job['attempts']], commit=True)
+        return
+
+    db.execute("""
+        UPDATE export_jobs
+        SET status = 'completed',
+            size_bytes = %s,
+            error = NULL,
+            completed_at = NOW(),
+            expires_at = NOW() + make_interval(hours => %s)
+        WHERE id = %s AND attempts = %s
+    """, [size, EXPORT_RETENTION_HOURS, job['id'], job['attempts']], commit=True)
+
+
+def cleanup_expired_exports():
+    """Expire completed jobs past retention and delete their archives"""
+    expired = db.execute("""
+        UPDATE export_jobs
+        SET status = 'expired'
+        WHERE status = 'completed' AND expires_at < NOW()
+        RETURNING id
+    """, fetch_all=True, commit=True)
+
+    for job in expired:
+        remove_export_archive(archive_path(job['id']))
+
+    # Archives left behind by deleted users or interrupted writes
+    if os.path.isdir(EXPORT_STORAGE_DIR):
+        cutoff = time.time() - (EXPORT_RETENTION_HOURS + 1) * 3600
+        for name in os.listdir(EXPORT_STORAGE_DIR):
+            path = os.path.join(EXPORT_STORAGE_DIR, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    remove_export_archive(path)
+            except OSError:
+                pass
+
+    return len(expired)
+
+
+def export_worker():
+    """Background worker that runs queued export jobs"""
+    last_cleanup = 0
+    while True:
+        try:
+            wake_event.wait(POLL_INTERVAL)
+            wake_event.clear()
+
+            fail_exhausted_export_jobs()
+
+            while True:
+                job = claim_export_job()
+                if not job:
+                    break
+                run_export_job(job)
+
+            if time.time() - last_cleanup >= CLEANUP_INTERVAL:
+                last_cleanup = time.time()
+                cleanup_expired_exports()
+        except Exception as e:
+            print(f"Export worker error: {e}")
+
+
+def start_export_worker():
+    """Start the export job thread"""
+    global _worker_started
+    if _worker_started:
+        return
+    _worker_started = True
+
+    thread = threading.Thread(target=export_worker, daemon=True)
+    thread.start()
+    print("Export worker started")
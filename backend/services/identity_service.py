@@ -1,4 +1,10 @@
-"""Three-word identity generation service"""
+"""Three-word identity allocation service
+
+Every combination of the word lists is precomputed in identity_pool
+(scripts/migrate_add_identity_pool.py) with a random sort key. Options are
+sampled from the unused rows with one statement and reserved for the asking
+user, so two people choosing at once are never offered the same identity.
+"""
 
 import random
 from .database import db
@@ -38,39 +44,136 @@ NOUNS_2 = [
 ]
 
 
-def generate_three_word_id():
-    """Generate unique three-word identifier"""
-    max_attempts = 100
+IDENTITY_RESERVATION_SECONDS = 900  # how long offered options are held for a user
 
-    for _ in range(max_attempts):
-        word_id = f"{random.choice(ADJECTIVES)}-{random.choice(NOUNS_1)}-{random.choice(NOUNS_2)}"
+# Unused identities in sort_key order from a random starting point; the
+# second branch wraps around to the start of the pool. SKIP LOCKED keeps
+# concurrent requests from reserving the same identity. With a user_id, that
+# user's own lapsed reservations are skipped so they get fresh options; without
+# one (allocate_three_word_id) every unreserved identity is a candidate.
+AVAILABLE_FROM_START = """
+    SELECT three_word_id, {wrapped} AS wrapped, sort_key
+    FROM identity_pool
+    WHERE NOT taken
+      AND sort_key {op} %(start)s
+      AND (reserved_until IS NULL OR reserved_until < NOW())
+      AND (%(user_id)s::uuid IS NULL OR reserved_by IS DISTINCT FROM %(user_id)s::uuid)
+    ORDER BY sort_key
+    LIMIT %(count)s
+    FOR UPDATE SKIP LOCKED
+"""
 
-        # Check if exists in database
-        existing = db.execute(
-            "SELECT id FROM users WHERE three_word_id = %s",
-            [word_id],
-            fetch_one=True
-        )
+PICK_AVAILABLE_CTES = f"""
+    after_start AS ({AVAILABLE_FROM_START.format(wrapped=0, op='>=')}),
+    before_start AS ({AVAILABLE_FROM_START.format(wrapped=1, op='<')}),
+    picked AS (
+        SELECT three_word_id FROM (
+            SELECT * FROM after_start UNION ALL SELECT * FROM before_start
+        ) candidates
+        ORDER BY wrapped, sort_key
+        LIMIT %(count)s
+    )
+"""
 
-        if not existing:
-            return word_id
 
-    raise Exception("Could not generate unique three-word ID after 100 attempts")
+def reserve_identity_options(user_id, count=3):
+    """
+    Reserve `count` random unused three-word IDs for a user to choose from
+    Replaces the user's previous reservations; the new ones lapse after
+    IDENTITY_RESERVATION_SECONDS.
+    """
+    rows = db.execute(f"""
+        WITH released AS (
+            UPDATE identity_pool
+            SET reserved_by = NULL, reserved_until = NULL
+            WHERE reserved_by = %(user_id)s AND NOT taken
+        ),
+        {PICK_AVAILABLE_CTES}
+        UPDATE identity_pool p
+        SET reserved_by = %(user_id)s,
+            reserved_until = NOW() + make_interval(secs => %(seconds)s)
+        FROM picked
+        WHERE p.three_word_id = picked.three_word_id
+        RETURNING p.three_word_id
+    """, {
+        'user_id': user_id, 'count': count, 'start': random.random(),
+        'seconds': IDENTITY_RESERVATION_SECONDS
+    }, fetch_all=True, commit=True)
 
+    if not rows:
+        raise Exception("No unused three-word IDs left in identity_pool")
+    return [r['three_word_id'] for r in rows]
 
-def check_three_word_exists(three_word_id):
-    """Check if a three-word ID exists"""
-    result = db.execute(
-        "SELECT id FROM users WHERE three_word_id = %s",
-        [three_word_id],
-        fetch_one=True
-    )
-    return result is not None
+
+def claim_identity(tx, user_id, three_word_id):
+    """
+    Mark an identity taken by a user, inside the caller's transaction
+    The identity must be unused and not reserved by someone else. Releases the
+    user's other reservations. Returns False if the identity is unavailable.
+    """
+    claimed = tx.execute("""
+        UPDATE identity_pool
+        SET taken = TRUE, reserved_by = NULL, reserved_until = NULL
+        WHERE three_word_id = %(three_word_id)s
+          AND NOT taken
+          AND (reserved_by = %(user_id)s OR reserved_until IS NULL OR reserved_until < NOW())
+        RETURNING three_word_id
+    """, {'three_word_id': three_word_id, 'user_id': user_id}, fetch_one=True)
+
+    if not claimed:
+        return False
+
+    tx.execute("""
+        UPDATE identity_pool
+        SET reserved_by = NULL, reserved_until = NULL
+        WHERE reserved_by = %s AND NOT taken
+    """, [user_id])
+    return True
 
 
-def generate_identity_options(count=3):
-    """Generate multiple three-word ID options for user to choose from"""
-    options = []
-    for _ in range(count):
-        options.append(generate_three_word_id())
-    return options
+def allocate_three_word_id(tx=None):
+    """Take one random unused three-word ID, inside `tx` if given"""
+    query = f"""
+        WITH {PICK_AVAILABLE_CTES}
+        UPDATE identity_pool p
+        SET taken = TRUE, reserved_by = NULL, reserved_until = NULL
+        FROM picked
+        WHERE p.three_word_id = picked.three_word_id
+        RETURNING p.three_word_id
+    """
+    params = {'user_id': None, 'count': 1, 'start': random.random()}
+
+    if tx:
+        row = tx.execute(query, params, fetch_one=True)
+    else:
+        row = db.execute(query, params, fetch_one=True, commit=True)
+
+    if not row:
+        raise Exception("No unused three-word IDs left in identity_pool")
+    return row['three_word_id']
+
+
+def release_three_word_id(tx, three_word_id):
+    """Return an identity nobody uses any more to the pool"""
+    tx.execute("""
+        UPDATE identity_pool SET taken = FALSE WHERE three_word_id = %s
+    """, [three_word_id])
+
+
+def clear_expired_identity_reservations(batch_size=5000):
+    """Clear one batch of lapsed reservations; returns rows cleared"""
+    result = db.execute("""
+        WITH cleared AS (
+            UPDATE identity_pool
+            SET reserved_by = NULL, reserved_until = NULL
+            WHERE three_word_id IN (
+                SELECT three_word_id FROM identity_pool
+                WHERE reserved_by IS NOT NULL AND reserved_until < NOW()
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING 1
+        )
+        SELECT COUNT(*) AS cleared FROM cleared
+    """, [batch_size], fetch_one=True, commit=True)
+    return result['cleared']
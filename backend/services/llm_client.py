@@ -0,0 +1,277 @@
+"""Shared Anthropic client with backpressure, retries and a circuit breaker
+
+Every Claude call goes through create_message(), which applies, per model:
+- a process-wide semaphore bounding concurrent requests
+- a token-bucket rate limit on request starts
+- jittered exponential retries that honour retry-after
+- a per-request timeout and an overall deadline below the gunicorn timeout
+- a circuit breaker that fails fast while the upstream is degraded
+"""
+
+import anthropic
+import os
+import random
+import threading
+import time
+
+# Gunicorn kills a worker after 300s; keep the whole call well inside that
+LLM_REQUEST_TIMEOUT = float(os.environ.get('LLM_REQUEST_TIMEOUT', 120))
+LLM_DEADLINE = float(os.environ.get('LLM_DEADLINE', 240))
+
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 4))
+LLM_REQUESTS_PER_MINUTE = float(os.environ.get('LLM_REQUESTS_PER_MINUTE', 50))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 3))
+
+# Circuit breaker: open after this many consecutive upstream failures
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('LLM_BREAKER_FAILURES', 5))
+BREAKER_COOLDOWN = float(os.environ.get('LLM_BREAKER_COOLDOWN', 30))
+
+# Retries are handled here, so the SDK's own retry loop is disabled
+client = anthropic.Anthropic(
+    api_key=os.environ.get("ANTHROPIC_API_KEY"),
+    max_retries=0,
+    timeout=LLM_REQUEST_TIMEOUT
+)
+
+
+class LLMUnavailableError(Exception):
+    """Raised when a request is refused locally or the upstream stays degraded"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting request starts per second"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1.0, rate_per_minute / 6.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, deadline):
+        """Take one token, waiting until deadline (monotonic); return seconds waited"""
+        started = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return now - started
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                raise LLMUnavailableError("AI service is busy, please try again in a moment")
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe"""
+
+    def __init__(self, failure_threshold, cooldown):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """Whether a request may go upstream right now"""
+        with self.lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def cancel_probe(self):
+        """Release a half-open probe that never reached the upstream"""
+        with self.lock:
+            self.probing = False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class _ModelLimiter:
+    """Concurrency, rate and breaker state plus metrics for one model"""
+
+    def __init__(self):
+        self.semaphore = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+        self.bucket = TokenBucket(LLM_REQUESTS_PER_MINUTE)
+        self.breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.metrics = {
+            'requests': 0,
+            'successes': 0,
+            'failures': 0,
+            'retries': 0,
+            'rejected_breaker_open': 0,
+            'rejected_busy': 0,
+            'rate_limited_upstream': 0,
+            'timeouts': 0,
+            'rate_limit_wait_seconds': 0.0,
+            'semaphore_wait_seconds': 0.0,
+            'latency_seconds_total': 0.0
+        }
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            self.metrics[name] += amount
+
+    def snapshot(self):
+        with self.lock:
+            data = dict(self.metrics)
+            data['in_flight'] = self.in_flight
+        completed = data['successes']
+        data['avg_latency_seconds'] = round(data['latency_seconds_total'] / completed, 3) if completed else None
+        data['circuit_state'] = self.breaker.state
+        data['consecutive_failures'] = self.breaker.failures
+        data['max_concurrency'] = LLM_MAX_CONCURRENCY
+        data['requests_per_minute'] = LLM_REQUESTS_PER_MINUTE
+        return data
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _limiter_for(model):
+    with _limiters_lock:
+        if model not in _limiters:
+            _limiters[model] = _ModelLimiter()
+        return _limiters[model]
+
+
+def _is_retryable(error):
+    """Rate limits, overloads, 5xx and connection problems are worth retrying"""
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def _retry_after(error):
+    """Seconds requested by the upstream retry-after header, if any"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    value = response.headers.get('retry-after')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _backoff(attempt, error):
+    """Full-jitter exponential backoff, never shorter than retry-after"""
+    delay = random.uniform(0, min(20.0, 0.5 * (2 ** attempt)))
+    retry_after = _retry_after(error)
+    if retry_after is not None:
+        delay = max(delay, retry_after + random.uniform(0, 0.5))
+    return delay
+
+
+def create_message(**kwargs):
+    """Call client.messages.create with per-model backpressure and retries"""
+    model = kwargs['model']
+    limiter = _limiter_for(model)
+    deadline = time.monotonic() + LLM_DEADLINE
+    limiter.incr('requests')
+
+    if not limiter.breaker.allow():
+        limiter.incr('rejected_breaker_open')
+        raise LLMUnavailableError("AI service is temporarily unavailable, please try again shortly")
+
+    waited_from = time.monotonic()
+    if not limiter.semaphore.acquire(timeout=max(0.0, deadline - waited_from)):
+        limiter.incr('rejected_busy')
+        limiter.breaker.cancel_probe()
+        raise LLMUnavailableError("AI service is busy, please try again in a moment")
+    limiter.incr('semaphore_wait_seconds', time.monotonic() - waited_from)
+
+    with limiter.lock:
+        limiter.in_flight += 1
+    try:
+        attempt = 0
+        while True:
+            try:
+                limiter.incr('rate_limit_wait_seconds', limiter.bucket.acquire(deadline))
+            except LLMUnavailableError:
+                limiter.incr('rejected_busy')
+                limiter.breaker.cancel_probe()
+                raise
+
+            remaining = deadline - time.monotonic()
+            started = time.monotonic()
+            try:
+                response = client.messages.create(
+                    timeout=min(LLM_REQUEST_TIMEOUT, remaining),
+                    **kwargs
+                )
+            except Exception as e:
+                if isinstance(e, anthropic.APITimeoutError):
+                    limiter.incr('timeouts')
+                elif isinstance(e, anthropic.RateLimitError):
+                    limiter.incr('rate_limited_upstream')
+
+                if not _is_retryable(e):
+                    limiter.incr('failures')
+                    if isinstance(e, anthropic.APIStatusError):
+                        # Client errors (bad request, auth) mean the upstream answered
+                        limiter.breaker.record_success()
+                    else:
+                        # A local error (bad arguments, a bug) says nothing about the upstream
+                        limiter.breaker.cancel_probe()
+                    raise
+
+                delay = _backoff(attempt, e)
+                if attempt >= LLM_MAX_RETRIES or time.monotonic() + delay >= deadline:
+                    limiter.incr('failures')
+                    limiter.breaker.record_failure()
+                    print(f"LLM request to {model} failed after {attempt + 1} attempts: {e}")
+                    raise LLMUnavailableError("AI service is temporarily unavailable, please try again shortly") from e
+
+                attempt += 1
+                limiter.incr('retries')
+                time.sleep(delay)
+                continue
+
+            limiter.incr('successes')
+            limiter.incr('latency_seconds_total', time.monotonic() - started)
+            limiter.breaker.record_success()
+            return response
+    finally:
+        with limiter.lock:
+            limiter.in_flight -= 1
+        limiter.semaphore.release()
+
+
+def get_llm_metrics():
+    """Per-model limiter metrics for this worker process"""
+    with _limiters_lock:
+        models = list(_limiters.items())
+    return {model: limiter.snapshot() for model, limiter in models}
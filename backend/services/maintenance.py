@@ -0,0 +1,59 @@
+"""Scheduled in-process housekeeping for tables that only ever grow"""
+
+import threading
+import time
+from .auth_service import cleanup_expired_otps
+from .moderation_service import purge_moderation_cache
+from .email_worker import purge_email_outbox
+from .identity_service import clear_expired_identity_reservations
+
+MAINTENANCE_INTERVAL = 600  # seconds between runs
+MAINTENANCE_BATCH_SIZE = 5000
+BATCH_PAUSE = 0.1  # seconds between batches, keeps each delete short
+
+# (description, function clearing one batch and returning the rows removed)
+MAINTENANCE_TASKS = [
+    ('expired OTP codes', cleanup_expired_otps),
+    ('expired moderation verdicts', purge_moderation_cache),
+    ('finished outbox emails', purge_email_outbox),
+    ('lapsed identity reservations', clear_expired_identity_reservations),
+]
+
+
+def run_task(task):
+    """Run a batched cleanup until a batch comes back short"""
+    total = 0
+    while True:
+        deleted = task(MAINTENANCE_BATCH_SIZE)
+        total += deleted
+        if deleted < MAINTENANCE_BATCH_SIZE:
+            return total
+        time.sleep(BATCH_PAUSE)
+
+
+def run_maintenance():
+    """Run every maintenance task once; one failing task doesn't stop the rest"""
+    for description, task in MAINTENANCE_TASKS:
+        try:
+            removed = run_task(task)
+            if removed:
+                print(f"Maintenance: removed {removed} {description}")
+        except Exception as e:
+            print(f"Maintenance task failed ({description}): {e}")
+
+
+def maintenance_worker():
+    """Background worker that runs maintenance every 10 minutes"""
+    while True:
+        try:
+            time.sleep(MAINTENANCE_INTERVAL)
+            run_maintenance()
+        except Exception as e:
+            print(f"Maintenance worker error: {e}")
+
+
+def start_maintenance():
+    """Start the maintenance background thread"""
+    thread = threading.Thread(target=maintenance_worker, daemon=True)
+    thread.start()
+    print(f"Maintenance worker started (every {MAINTENANCE_INTERVAL} seconds)")
@@ -0,0 +1,39 @@
+"""Background worker that drains the daily metrics refresh queue"""
+
+import threading
+import time
+from .database import db
+
+# How often dirty dates are folded into daily_metrics
+METRICS_REFRESH_INTERVAL = 60  # seconds
+
+
+def drain_metrics_queue():
+    """Recompute daily_metrics for every date queued by the write triggers"""
+    try:
+        result = db.execute(
+            "SELECT drain_daily_metrics_queue() as refreshed",
+            fetch_one=True,
+            commit=True
+        )
+        return result['refreshed'] if result else 0
+    except Exception as e:
+        print(f"Daily metrics refresh failed: {e}")
+        return 0
+
+
+def metrics_refresh_worker():
+    """Background worker that drains the metrics queue every minute"""
+    while True:
+        try:
+            time.sleep(METRICS_REFRESH_INTERVAL)
+            drain_metrics_queue()
+        except Exception as e:
+            print(f"Metrics refresh worker error: {e}")
+
+
+def start_metrics_refresh():
+    """Start the daily metrics refresh background thread"""
+    thread = threading.Thread(target=metrics_refresh_worker, daemon=True)
+    thread.start()
+    print(f"Daily metrics refresh worker started (every {METRICS_REFRESH_INTERVAL} seconds)")
@@ -1,10 +1,14 @@
 """Comment moderation service using Claude Haiku for fast, low-cost checks"""
 
-import anthropic
+import hashlib
 import json
-import os
-
-client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+import re
+import threading
+from psycopg2.extras import Json
+from .database import db
+from .llm_client import create_message
+from .premoderation import classify_comment
+from .usage_service import record_usage
 
 # Use Haiku for fast, cost-effective moderation
 HAIKU_MODEL = "claude-haiku-4-5-20251001"
@@ -45,15 +49,139 @@ return ONLY valid json (no markdown, no explanation):
 }}"""
 
 
+# Changes whenever the prompts or model change, so stale verdicts are never reused
+MODERATION_PROMPT_VERSION = hashlib.sha256(
+    (HAIKU_MODEL + MODERATION_SYSTEM_PROMPT + MODERATION_PROMPT).encode()
+).hexdigest()[:16]
+
+# Flagged comments in 30 days before a user is blocked from commenting
+COMMENT_FLAG_LIMIT = 3
+
+# Approvals are stable; blocks expire sooner so a too-strict verdict isn't sticky
+APPROVED_CACHE_TTL_DAYS = 30
+BLOCKED_CACHE_TTL_DAYS = 1
+
+
+def normalize_comment(content):
+    """Normalize a comment so trivially different duplicates share a cache key"""
+    text = re.sub(r'\s+', ' ', content.casefold()).strip()
+    return text.strip(' .!?,;:~-')
+
+
+def comment_cache_key(content):
+    """Hash of the normalized comment text"""
+    return hashlib.sha256(normalize_comment(content).encode()).hexdigest()
+
+
+def get_cached_verdict(content_hash):
+    """Look up an unexpired verdict for this content and prompt version"""
+    try:
+        row = db.execute("""
+            SELECT verdict FROM moderation_cache
+            WHERE content_hash = %s AND prompt_version = %s AND expires_at > NOW()
+        """, [content_hash, MODERATION_PROMPT_VERSION], fetch_one=True)
+        return row['verdict'] if row else None
+    except Exception as e:
+        print(f"Moderation cache lookup failed: {e}")
+        return None
+
+
+def cache_verdict(content_hash, verdict):
+    """Store a verdict with a TTL that depends on whether it was approved"""
+    approved = bool(verdict.get('approved'))
+    ttl_days = APPROVED_CACHE_TTL_DAYS if approved else BLOCKED_CACHE_TTL_DAYS
+    try:
+        db.execute("""
+            INSERT INTO moderation_cache (content_hash, prompt_version, approved, verdict, expires_at)
+            VALUES (%s, %s, %s, %s, NOW() + make_interval(days => %s))
+            ON CONFLICT (content_hash, prompt_version) DO UPDATE SET
+                approved = EXCLUDED.approved,
+                verdict = EXCLUDED.verdict,
+                created_at = NOW(),
+                expires_at = EXCLUDED.expires_at
+        """, [content_hash, MODERATION_PROMPT_VERSION, approved, Json(verdict), ttl_days], commit=True)
+    except Exception as e:
+        print(f"Moderation cache write failed: {e}")
+
+
+def purge_moderation_cache(batch_size=5000):
+    """Remove one batch of expired or superseded-prompt verdicts; returns rows deleted"""
+    result = db.execute("""
+        WITH gone AS (
+            DELETE FROM moderation_cache WHERE (content_hash, prompt_version) IN (
+                SELECT content_hash, prompt_version FROM moderation_cache
+                WHERE expires_at < NOW() OR prompt_version <> %s
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING 1
+        )
+        SELECT COUNT(*) AS deleted FROM gone
+    """, [MODERATION_PROMPT_VERSION, batch_size], fetch_one=True, commit=True)
+    return result['deleted']
+
+
+# Per-worker counts of how comments were decided
+decision_counts = {'local_approve': 0, 'local_block': 0, 'cache': 0, 'haiku': 0}
+decision_counts_lock = threading.Lock()
+
+
+def record_decision(decision_path):
+    with decision_counts_lock:
+        decision_counts[decision_path] += 1
+
+
+def get_moderation_stats():
+    """Decision path counts for this worker process"""
+    with decision_counts_lock:
+        return dict(decision_counts)
+
+
+def premoderate_comment(content):
+    """
+    Run only the local pre-moderation tier.
+    Returns: verdict dict with decision_path, or None if the comment needs Haiku
+    """
+    decision, verdict = classify_comment(content)
+    if decision == 'escalate':
+        return None
+
+    decision_path = 'local_approve' if decision == 'approve' else 'local_block'
+    record_decision(decision_path)
+    return {**verdict, 'decision_path': decision_path}
+
+
 def moderate_comment(content):
     """
     Check if a comment is appropriate to post.
-    Returns: dict with approved (bool), reason (str), severity (str), suggestion (str)
+    Clear cases are decided by the local pre-moderation tier, repeats are
+    answered from the shared moderation cache, the rest go to Haiku.
+    Returns: dict with approved (bool), reason (str), severity (str), suggestion (str),
+    decision_path (str: local_approve, local_block, cache or haiku)
     """
 
+    local_verdict = premoderate_comment(content)
+    if local_verdict is not None:
+        return local_verdict
+
+    content_hash = comment_cache_key(content)
+    cached = get_cached_verdict(content_hash)
+    if cached is not None:
+        record_decision('cache')
+        return {**cached, 'decision_path': 'cache'}
+
+    verdict = moderate_with_haiku(content)
+    cache_verdict(content_hash, verdict)
+    record_decision('haiku')
+    return {**verdict, 'decision_path': 'haiku'}
+
+
+def moderate_with_haiku(content):
+    """Ask Haiku for a moderation verdict"""
+
     prompt = MODERATION_PROMPT.format(content=content)
 
-    response = client.messages.create(
+    response = create_message(
         model=HAIKU_MODEL,
         max_tokens=400,
         system=MODERATION_SYSTEM_PROMPT,
@@ -63,6 +191,9 @@ def moderate_comment(content):
         }]
     )
 
+    # Track API usage (shared buffered accounting with claude_service)
+    record_usage('claude', 'moderation', response.usage, model=HAIKU_MODEL)
+
     result_text = response.content[0].text.strip()
 
     # Remove markdown code blocks if present
@@ -71,3 +202,36 @@ def moderate_comment(content):
         result_text = result_text.rsplit("```", 1)[0]
 
     return json.loads(result_text)
+
+
+def record_comment_violation(user_id, content, moderation):
+    """
+    Log a blocked comment and block the user after repeated violations.
+    Returns: (flag_count in the last 30 days, whether the user is now blocked)
+    """
+    # Log, count and block in one transaction: a flag is never kept without the block it triggers
+    with db.transaction() as tx:
+        tx.execute("""
+            INSERT INTO comment_flags (user_id, comment_content, flag_reason, severity, decision_path)
+            VALUES (%s, %s, %s, %s, %s)
+        """, [user_id, content, moderation['reason'], moderation.get('severity', 'medium'), moderation.get('decision_path')])
+
+        # Check how many times this user has been flagged. Blocks made only by
+        # the local tier count when they are high severity (threats, slurs);
+        # a medium local block never gets a user banned without Haiku agreeing
+        flag_count = tx.execute("""
+            SELECT COUNT(*) as count FROM comment_flags
+            WHERE user_id = %s AND created_at > NOW() - INTERVAL '30 days'
+              AND (decision_path IS DISTINCT FROM 'local_block' OR severity = 'high')
+        """, [user_id], fetch_one=True)['count']
+
+        # Block user after repeated flagged attempts
+        if flag_count >= COMMENT_FLAG_LIMIT:
+            tx.execute("""
+                INSERT INTO blocked_users (user_id, reason)
+                VALUES (%s, %s)
+                ON CONFLICT (user_id) DO NOTHING
+            """, [user_id, 'Repeated comment violations'])
+            return flag_count, True
+
+    return flag_count, False
@@ -0,0 +1,188 @@
+"""Local first-pass comment classifier run before the Haiku moderation call
+
+Pure Python with no I/O so it adds microseconds, not a network round trip.
+Short, clearly supportive comments are auto-approved and only unambiguous
+violations (threats, slurs) are auto-blocked. Insults and dismissive phrases
+can't be told apart from negated, self-directed or supportive uses without
+context ("you are not stupid", "shut up my inner critic"), so they only
+block auto-approval and are escalated to Haiku. Tune against
+scripts/eval_premoderation.py.
+"""
+
+import re
+
+# Bump when the lexicons, patterns or weights change
+PREMODERATION_VERSION = "3"
+
+# Longest comment that can be auto-approved
+MAX_AUTO_APPROVE_WORDS = 40
+
+# Severe terms: slurs, blocked on sight whoever they are aimed at
+SEVERE_TERMS = {
+    "retard", "retarded", "cunt", "faggot", "fag", "tranny", "spaz",
+}
+
+# Profanity: against the guidelines but may be venting, so it only adds to the score
+PROFANITY_TERMS = {
+    "fuck", "fucking", "fucked", "fucker", "motherfucker", "shit", "shitty",
+    "bullshit", "bitch", "bastard", "asshole", "dick", "dickhead", "piss",
+    "crap", "damn", "wtf", "stfu",
+}
+
+# Words that turn a sentence about "you" into an insult; only counted when a
+# second-person word comes shortly before them in the same sentence, so
+# "i felt like a failure" doesn't count
+NEGATIVE_TERMS = {
+    "stupid", "idiot", "idiotic", "moron", "dumb", "pathetic", "loser", "lazy",
+    "worthless", "useless", "clown", "joke", "cringe", "garbage", "trash",
+    "whining", "whiny", "entitled", "delusional", "incompetent", "failure",
+    "scum", "subhuman", "degenerate",
+}
+
+# Threats and self-harm incitement: always blocked, high severity
+THREAT_PATTERNS = [
+    re.compile(r"\bk+y+s+\b"),
+    re.compile(r"\bkill (your ?self|urself)\b"),
+    re.compile(r"\b(go|you should|you can|why don'?t you)( just)? die\b"),
+    re.compile(r"\bhope you (die|fail|suffer)\b"),
+    re.compile(r"\bnobody would miss you\b"),
+]
+
+# Likely attacks on the person; they escalate rather than block, since the
+# patterns can't see negation or who the phrase is aimed at
+ATTACK_PATTERNS = [
+    re.compile(r"\b(you'?re|you are|ur|u r) (such )?(an? )?(\w+ )?(idiot|moron|loser|joke|clown|failure|pathetic|stupid|dumb|lazy|delusional|entitled)\b"),
+    re.compile(r"\b(shut up|stfu|get over it|cry me a river)\b"),
+    re.compile(r"\b(nobody|no one|who) cares( about| what)? (you|your|ur|u)\b"),
+    re.compile(r"\b(who cares|nobody cares)[.!?]*$"),
+    re.compile(r"\b(grow up|man up|toughen up|stop whining|stop complaining)\b"),
+    re.compile(r"\byou deserve(d)? (it|this|to fail)\b"),
+]
+
+# Phrases that indicate a short supportive comment
+BENIGN_PATTERNS = [
+    re.compile(r"\b(this|it) (really )?(resonates|resonated|hits|hit home)\b"),
+    re.compile(r"\bsame (here|boat)\b"),
+    re.compile(r"\b(felt|feel) (this|that|the same)\b"),
+    re.compile(r"\b(been|was) there\b"),
+    re.compile(r"\byou('ve)? got this\b"),
+    re.compile(r"\bthank(s| you) for (sharing|writing|posting|this)\b"),
+    re.compile(r"\bsending (love|hugs|strength|support)\b"),
+    re.compile(r"\b(rooting|cheering) for you\b"),
+    re.compile(r"\byou'?re not alone\b"),
+    re.compile(r"\b(so|really) relatable\b"),
+    re.compile(r"\bproud of you\b"),
+    re.compile(r"\bhang in there\b"),
+]
+
+SUPPORTIVE_TERMS = {
+    "resonates", "relatable", "thanks", "thank", "love", "support", "proud",
+    "rooting", "strength", "hugs", "hang", "same", "felt", "brave", "helpful",
+    "helped", "inspiring", "appreciate", "congrats", "congratulations",
+}
+
+# Cues that the comment carries criticism or advice; leave those to Haiku
+NUANCE_TERMS = {"but", "just", "should", "shouldn't", "stop", "why", "whatever", "actually", "honestly"}
+
+URL_PATTERN = re.compile(r"(https?://|www\.|\.com\b|\.io\b)")
+WORD_PATTERN = re.compile(r"[a-z']+")
+SECOND_PERSON = {"you", "you're", "youre", "your", "ur", "u", "yourself"}
+SENTENCE_PATTERN = re.compile(r"[.!?;\n]+")
+# Words before a negative term searched for the person it is aimed at
+TARGET_WINDOW = 4
+
+
+def aimed_negative_hits(text):
+    """Negative terms with a second-person word up to TARGET_WINDOW words before them in the sentence"""
+    hits = 0
+    for sentence in SENTENCE_PATTERN.split(text):
+        words = WORD_PATTERN.findall(sentence)
+        for i, word in enumerate(words):
+            if word in NEGATIVE_TERMS and SECOND_PERSON.intersection(words[max(0, i - TARGET_WINDOW):i]):
+                hits += 1
+    return hits
+
+
+def extract_features(content):
+    """Compute the lexical features the scoring model uses"""
+    text = content.casefold()
+    words = WORD_PATTERN.findall(text)
+    word_set = set(words)
+    letters = [c for c in content if c.isalpha()]
+
+    return {
+        'word_count': len(words),
+        'severe_hits': len(word_set & SEVERE_TERMS),
+        'profanity_hits': len(word_set & PROFANITY_TERMS),
+        'negative_hits': aimed_negative_hits(text),
+        'any_negative': bool(word_set & NEGATIVE_TERMS),
+        'threat_hits': sum(1 for p in THREAT_PATTERNS if p.search(text)),
+        'attack_hits': sum(1 for p in ATTACK_PATTERNS if p.search(text)),
+        'benign_hits': sum(1 for p in BENIGN_PATTERNS if p.search(text)),
+        'supportive_hits': len(word_set & SUPPORTIVE_TERMS),
+        'nuance_hits': len(word_set & NUANCE_TERMS),
+        'second_person': bool(word_set & SECOND_PERSON),
+        'has_url': bool(URL_PATTERN.search(text)),
+        'shouting': len(letters) >= 12 and sum(c.isupper() for c in letters) / len(letters) > 0.7,
+    }
+
+
+def violation_score(features):
+    """Linear violation score; any positive score rules out auto-approval"""
+    score = 0.0
+    score += 3.0 * features['severe_hits']
+    score += 3.0 * features['attack_hits']
+    score += 1.5 * features['profanity_hits']
+    score += 1.0 * features['negative_hits']
+    if features['second_person'] and (features['negative_hits'] or features['profanity_hits']):
+        score += 1.0
+    if features['shouting']:
+        score += 0.5
+    return score
+
+
+def classify_comment(content):
+    """
+    Decide locally whether a comment can skip the Haiku call.
+    Returns: (decision, verdict) where decision is 'approve', 'block' or
+    'escalate' and verdict is a moderation dict (None when escalating).
+    """
+    features = extract_features(content)
+
+    if features['threat_hits']:
+        return 'block', {
+            'approved': False,
+            'reason': 'this comment contains a threat or encourages self-harm.',
+            'severity': 'high',
+            'suggestion': ''
+        }
+
+    # Only slurs are blocked locally; attack patterns, profanity and harsh
+    # words may be negated, self-directed or venting, so Haiku decides
+    if features['severe_hits']:
+        return 'block', {
+            'approved': False,
+            'reason': 'this comment uses a slur.',
+            'severity': 'high',
+            'suggestion': 'try sharing your perspective without name-calling or harsh language.'
+        }
+
+    score = violation_score(features)
+
+    clearly_supportive = features['benign_hits'] > 0 or features['supportive_hits'] >= 2
+    if (
+        score == 0
+        and clearly_supportive
+        and not features['any_negative']
+        and features['nuance_hits'] == 0
+        and not features['has_url']
+        and features['word_count'] <= MAX_AUTO_APPROVE_WORDS
+    ):
+        return 'approve', {
+            'approved': True,
+            'reason': 'supportive comment.',
+            'severity': 'low',
+            'suggestion': ''
+        }
+
+    return 'escalate', None
@@ -0,0 +1,43 @@
+"""Background worker that folds the reaction count delta log into posts"""
+
+import threading
+import time
+from .database import db
+
+# How often logged reaction deltas are folded into posts.reaction_count
+REACTION_FOLD_INTERVAL = 5  # seconds
+REACTION_FOLD_BATCH = 10000
+
+
+def fold_reaction_counts():
+    """Apply logged reaction deltas to posts; returns deltas folded"""
+    try:
+        result = db.execute(
+            "SELECT fold_reaction_count_deltas(%s) as folded",
+            [REACTION_FOLD_BATCH],
+            fetch_one=True,
+            commit=True
+        )
+        return result['folded'] if result else 0
+    except Exception as e:
+        print(f"Reaction count fold failed: {e}")
+        return 0
+
+
+def reaction_fold_worker():
+    """Background worker that folds reaction deltas every few seconds"""
+    while True:
+        try:
+            time.sleep(REACTION_FOLD_INTERVAL)
+            # Keep going while full batches come back, so a burst drains quickly
+            while fold_reaction_counts() >= REACTION_FOLD_BATCH:
+                pass
+        except Exception as e:
+            print(f"Reaction fold worker error: {e}")
+
+
+def start_reaction_counter():
+    """Start the reaction count fold background thread"""
+    thread = threading.Thread(target=reaction_fold_worker, daemon=True)
+    thread.start()
+    print(f"Reaction count fold worker started (every {REACTION_FOLD_INTERVAL} seconds)")
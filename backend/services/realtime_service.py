@@ -0,0 +1,178 @@
+"""Realtime feed events: Postgres LISTEN/NOTIFY fanned out to SSE clients
+
+Triggers from scripts/add_realtime_notify_triggers.sql publish JSON deltas on
+the feed_events channel. Each app worker opens one dedicated LISTEN
+connection, started with its first subscriber, and pushes every event to
+the matching in-process subscriber queues. Slow clients never block the
+listener: when a queue fills up the client is told to resync instead.
+
+LISTEN needs a direct (session) connection, not a transaction-mode pooler,
+so REALTIME_DATABASE_URL can point at the unpooled endpoint.
+"""
+
+import json
+import os
+import queue
+import select
+import threading
+import time
+import psycopg2
+import psycopg2.extensions
+
+REALTIME_EVENTS = os.environ.get('REALTIME_EVENTS', 'false').lower() == 'true'
+REALTIME_CHANNEL = 'feed_events'
+REALTIME_MAX_CLIENTS = int(os.environ.get('REALTIME_MAX_CLIENTS', 50))
+
+# Streams end before the gunicorn timeout; clients reconnect automatically
+STREAM_SECONDS = int(os.environ.get('REALTIME_STREAM_SECONDS', 240))
+HEARTBEAT_SECONDS = 15
+RECONNECT_MS = 3000
+QUEUE_SIZE = 100
+
+_subscribers = set()
+_subscribers_lock = threading.Lock()
+_listener_started = False
+_listener_lock = threading.Lock()
+
+
+class Subscription:
+    """One SSE client's event queue, optionally limited to a single post"""
+
+    def __init__(self, post_id=None):
+        self.post_id = str(post_id) if post_id else None
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, event):
+        if self.post_id is None:
+            return True
+        return event.get('post_id') == self.post_id or event['type'] == 'resync'
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+
+def subscribe(post_id=None):
+    """Register a subscriber; None if this worker is at REALTIME_MAX_CLIENTS"""
+    with _subscribers_lock:
+        if len(_subscribers) >= REALTIME_MAX_CLIENTS:
+            return None
+        subscription = Subscription(post_id)
+        _subscribers.add(subscription)
+    start_realtime_listener()
+    return subscription
+
+
+def unsubscribe(subscription):
+    with _subscribers_lock:
+        _subscribers.discard(subscription)
+
+
+def publish(event):
+    """Deliver an event to every interested subscriber in this process"""
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    for subscription in subscribers:
+        if subscription.wants(event):
+            subscription.push(event)
+
+
+def _listen(conn):
+    """Block on the LISTEN connection and publish notifications until it fails"""
+    while True:
+        if select.select([conn], [], [], HEARTBEAT_SECONDS * 4) == ([], [], []):
+            # Idle: make sure the connection is still alive
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            continue
+
+        conn.poll()
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            try:
+                publish(json.loads(notify.payload))
+            except ValueError:
+                print(f"Ignoring malformed realtime payload: {notify.payload[:200]}")
+
+
+def realtime_listener():
+    """Background worker holding this process's LISTEN connection"""
+    database_url = os.environ.get('REALTIME_DATABASE_URL') or os.environ.get('DATABASE_URL')
+    backoff = 1
+    connected_before = False
+
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(database_url)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {REALTIME_CHANNEL}")
+            backoff = 1
+
+            # Events raised while disconnected are lost; have clients refetch
+            if connected_before:
+                publish({'type': 'resync'})
+            connected_before = True
+
+            _listen(conn)
+        except Exception as e:
+            print(f"Realtime listener error: {e}")
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 30)
+
+
+def start_realtime_listener():
+    """Start the LISTEN thread once per process"""
+    global _listener_started
+    with _listener_lock:
+        if _listener_started:
+            return
+        _listener_started = True
+
+    thread = threading.Thread(target=realtime_listener, daemon=True)
+    thread.start()
+    print(f"Realtime listener started on channel {REALTIME_CHANNEL}")
+
+
+def _sse(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+def event_stream(subscription):
+    """SSE body for one subscriber; ends after STREAM_SECONDS so the client reconnects"""
+    deadline = time.monotonic() + STREAM_SECONDS
+    try:
+        yield f"retry: {RECONNECT_MS}\n\n"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            if subscription.overflowed:
+                # Dropped events: discard the backlog and ask the client to refetch
+                subscription.overflowed = False
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                yield _sse('resync', {'type': 'resync'})
+                continue
+
+            try:
+                event = subscription.queue.get(timeout=min(HEARTBEAT_SECONDS, remaining))
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+
+            yield _sse(event['type'], event)
+    finally:
+        unsubscribe(subscription)
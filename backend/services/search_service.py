@@ -3,6 +3,7 @@
 import openai
 import os
 from .database import db
+from .concurrency import run_concurrently
 
 openai.api_key = os.environ.get("OPENAI_API_KEY")
 
@@ -16,83 +17,71 @@ def get_embedding(text):
     return response.data[0].embedding
 
 
+POST_COLUMNS = """
+    p.id, p.three_word_id, p.title, p.anonymized_content, p.clear_ask,
+    p.intent, p.topics, p.reaction_count, p.comment_count, p.created_at
+"""
+
+# Keyword matches without a vector hit rank at this fixed similarity
+KEYWORD_MATCH_SCORE = 0.5
+
+
+def vector_search(query_embedding):
+    """Nearest 50 published posts to the query embedding"""
+    return db.execute(f"""
+        SELECT {POST_COLUMNS},
+            1 - (p.embedding <=> %s::vector) as similarity_score
+        FROM posts p
+        WHERE p.is_published = TRUE
+        ORDER BY p.embedding <=> %s::vector
+        LIMIT 50
+    """, [query_embedding, query_embedding], fetch_all=True) or []
+
+
+def keyword_search(query):
+    """Up to 50 published posts matching the query's words"""
+    return db.execute(f"""
+        SELECT {POST_COLUMNS},
+            %s::float as similarity_score
+        FROM posts p
+        WHERE p.is_published = TRUE
+        AND to_tsvector('english', p.anonymized_content) @@
+            plainto_tsquery('english', %s)
+        LIMIT 50
+    """, [KEYWORD_MATCH_SCORE, query], fetch_all=True) or []
+
+
 def search_posts(query, user_id, topics=None, limit=20):
     """
     Hybrid search: semantic (vector) + keyword + filters
+    The keyword half runs while the query is embedded; each post keeps its
+    best score, and results are ordered by post id as before.
     """
 
-    # Generate embedding for query
-    query_embedding = get_embedding(query)
-
-    # Build SQL query
-    sql = """
-        WITH vector_search AS (
-            SELECT
-                p.id, p.three_word_id, p.title, p.anonymized_content, p.clear_ask,
-                p.intent, p.topics, p.reaction_count, p.comment_count, p.created_at,
-                1 - (p.embedding <=> %s::vector) as similarity_score
-            FROM posts p
-            WHERE p.is_published = TRUE
-            ORDER BY p.embedding <=> %s::vector
-            LIMIT 50
-        ),
-        keyword_search AS (
-            SELECT
-                p.id, p.three_word_id, p.title, p.anonymized_content, p.clear_ask,
-                p.intent, p.topics, p.reaction_count, p.comment_count, p.created_at,
-                ts_rank(
-                    to_tsvector('english', p.anonymized_content),
-                    plainto_tsquery('english', %s)
-                ) as keyword_score
-            FROM posts p
-            WHERE p.is_published = TRUE
-            AND to_tsvector('english', p.anonymized_content) @@
-                plainto_tsquery('english', %s)
-            LIMIT 50
-        ),
-        combined AS (
-            SELECT
-                id, three_word_id, title, anonymized_content, clear_ask,
-                intent, topics, reaction_count, comment_count, created_at,
-                similarity_score
-            FROM vector_search
-            UNION
-            SELECT
-                id, three_word_id, title, anonymized_content, clear_ask,
-                intent, topics, reaction_count, comment_count, created_at,
-                0.5 as similarity_score
-            FROM keyword_search
-        )
-        SELECT DISTINCT ON (c.id)
-            c.id, c.three_word_id, c.title, c.anonymized_content, c.clear_ask,
-            c.intent, c.topics, c.reaction_count, c.comment_count,
-            c.created_at, c.similarity_score
-        FROM combined c
-    """
+    query_embedding, keyword_results = run_concurrently(
+        lambda: get_embedding(query),
+        lambda: keyword_search(query)
+    )
+    vector_results = vector_search(query_embedding)
 
-    params = [query_embedding, query_embedding, query, query]
+    combined = {}
+    for row in list(vector_results) + list(keyword_results):
+        post_id = str(row['id'])
+        if post_id not in combined or row['similarity_score'] > combined[post_id]['similarity_score']:
+            combined[post_id] = dict(row)
 
-    # Add topic filter if provided
+    results = combined.values()
     if topics:
-        sql += " WHERE topics && %s"
-        params.append(topics)
-
-    sql += """
-        ORDER BY id, similarity_score DESC
-        LIMIT %s
-    """
-    params.append(limit)
-
-    results = db.execute(sql, params, fetch_all=True)
+        results = [r for r in results if set(r['topics'] or []) & set(topics)]
 
-    return [dict(row) for row in results] if results else []
+    return sorted(results, key=lambda r: str(r['id']))[:limit]
 
 
-def store_post_with_embedding(post_data):
-    """Store post with vector embedding"""
+def store_post_with_embedding(post_data, embedding=None):
+    """Store post with vector embedding (computed here unless passed in)"""
 
-    content = post_data['anonymized_content']
-    embedding = get_embedding(content)
+    if embedding is None:
+        embedding = get_embedding(post_data['anonymized_content'])
 
     result = db.execute("""
         INSERT INTO posts (
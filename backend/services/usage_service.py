@@ -0,0 +1,131 @@
+"""Buffered API usage accounting
+
+Token and cost deltas from every LLM call are accumulated in-process and
+flushed to api_usage periodically in a single upsert, instead of one
+INSERT ... ON CONFLICT per call on the request path.
+"""
+
+import atexit
+import threading
+import time
+from datetime import date
+from psycopg2.extras import execute_values
+from .database import get_db_cursor
+
+# How often buffered usage is written to api_usage
+USAGE_FLUSH_INTERVAL = 30  # seconds
+
+# Per-million-token pricing: (input, output, cache write, cache read)
+MODEL_PRICING = {
+    'sonnet': (3.0, 15.0, 3.75, 0.30),
+    'haiku': (1.0, 5.0, 1.25, 0.10),
+}
+DEFAULT_PRICING = MODEL_PRICING['sonnet']
+
+_lock = threading.Lock()
+_pending = {}
+_flusher_started = False
+
+
+def _pricing_for(model):
+    """Pick the pricing row for a model id"""
+    if model:
+        for family, pricing in MODEL_PRICING.items():
+            if family in model:
+                return pricing
+    return DEFAULT_PRICING
+
+
+def record_usage(service, operation, usage, model=None):
+    """Add one call's token usage to the in-process buffer"""
+    try:
+        input_tokens = usage.input_tokens or 0
+        output_tokens = usage.output_tokens or 0
+        cache_creation = getattr(usage, 'cache_creation_input_tokens', 0) or 0
+        cache_read = getattr(usage, 'cache_read_input_tokens', 0) or 0
+
+        input_rate, output_rate, cache_write_rate, cache_read_rate = _pricing_for(model)
+        cost = (
+            input_tokens * input_rate
+            + output_tokens * output_rate
+            + cache_creation * cache_write_rate
+            + cache_read * cache_read_rate
+        ) / 1_000_000
+
+        key = (date.today(), service, operation)
+        with _lock:
+            totals = _pending.setdefault(key, [0, 0, 0, 0, 0.0])
+            totals[0] += input_tokens
+            totals[1] += output_tokens
+            totals[2] += cache_creation
+            totals[3] += cache_read
+            totals[4] += cost
+    except Exception as e:
+        print(f"Failed to record API usage: {e}")
+
+
+def _restore(batch):
+    """Merge an unflushed batch back into the buffer"""
+    with _lock:
+        for key, deltas in batch.items():
+            totals = _pending.setdefault(key, [0, 0, 0, 0, 0.0])
+            for i, value in enumerate(deltas):
+                totals[i] += value
+
+
+def flush_usage():
+    """Write all buffered usage to api_usage in one upsert"""
+    global _pending
+    with _lock:
+        if not _pending:
+            return 0
+        batch, _pending = _pending, {}
+
+    rows = [
+        (day, service, operation, *deltas)
+        for (day, service, operation), deltas in batch.items()
+    ]
+
+    try:
+        with get_db_cursor(commit=True) as cursor:
+            execute_values(cursor, """
+                INSERT INTO api_usage (date, service, operation, input_tokens, output_tokens,
+                                      cache_creation_tokens, cache_read_tokens, cost_usd)
+                VALUES %s
+                ON CONFLICT (date, service, operation)
+                DO UPDATE SET
+                    input_tokens = api_usage.input_tokens + EXCLUDED.input_tokens,
+                    output_tokens = api_usage.output_tokens + EXCLUDED.output_tokens,
+                    cache_creation_tokens = api_usage.cache_creation_tokens + EXCLUDED.cache_creation_tokens,
+                    cache_read_tokens = api_usage.cache_read_tokens + EXCLUDED.cache_read_tokens,
+                    cost_usd = api_usage.cost_usd + EXCLUDED.cost_usd
+            """, rows)
+        return len(rows)
+    except Exception as e:
+        print(f"Failed to flush API usage: {e}")
+        # Keep the deltas so the next flush retries them
+        _restore(batch)
+        return 0
+
+
+def usage_flush_worker():
+    """Background worker that flushes buffered usage periodically"""
+    while True:
+        try:
+            time.sleep(USAGE_FLUSH_INTERVAL)
+            flush_usage()
+        except Exception as e:
+            print(f"Usage flush worker error: {e}")
+
+
+def start_usage_flusher():
+    """Start the usage flush thread and flush on interpreter exit"""
+    global _flusher_started
+    if _flusher_started:
+        return
+    _flusher_started = True
+
+    atexit.register(flush_usage)
+    thread = threading.Thread(target=usage_flush_worker, daemon=True)
+    thread.start()
+    print(f"API usage flush worker started (every {USAGE_FLUSH_INTERVAL} seconds)")
@@ -4,6 +4,7 @@ import { useState, useEffect } from 'react'
 import { useRouter } from 'next/navigation'
 import { useAuth } from '@/components/providers/AuthProvider'
 import { api } from '@/lib/api'
+import { subscribeEvents, RealtimeEvent } from '@/lib/realtime'
 import PostCard from '@/components/feed/PostCard'
 import Loading from '@/components/shared/Loading'
 
@@ -16,6 +17,7 @@ export default function FeedPage() {
   const [page, setPage] = useState(1)
   const [hasMore, setHasMore] = useState(true)
   const [intent, setIntent] = useState('')
+  const [newPosts, setNewPosts] = useState(0)
 
   useEffect(() => {
     if (!authLoading && (!user || !user.three_word_id)) {
@@ -25,6 +27,46 @@ export default function FeedPage() {
     }
   }, [user, authLoading, router, page, intent])
 
+  // Live updates: count new posts and apply reaction/comment deltas to loaded posts
+  useEffect(() => {
+    if (authLoading || !user) return
+
+    return subscribeEvents({
+      onEvent: (event: RealtimeEvent) => {
+        if (event.type === 'post') {
+          setNewPosts(n => n + 1)
+          return
+        }
+
+        let change: Record<string, number> | null = null
+        if (event.type === 'reaction') change = { reaction_count: event.delta || 0 }
+        else if (event.type === 'comment') change = { comment_count: 1 }
+        else if (event.type === 'comment_removed') change = { comment_count: -1 }
+        if (!change) return
+
+        const delta = change
+        setPosts(prev => prev.map(p => {
+          if (p.id !== event.post_id) return p
+          const updated = { ...p }
+          Object.entries(delta).forEach(([key, value]) => {
+            updated[key] = Math.max(0, (updated[key] || 0) + value)
+          })
+          return updated
+        }))
+      }
+    })
+  }, [authLoading, user])
+
+  function showNewPosts() {
+    setNewPosts(0)
+    window.scrollTo({ top: 0 })
+    if (page === 1) {
+      loadPosts()
+    } else {
+      setPage(1)
+    }
+  }
+
   async function loadPosts() {
     setLoading(true)
     try {
@@ -68,6 +110,14 @@ export default function FeedPage() {
         </select>
       </div>
 
+      {newPosts > 0 && (
+        <div className="text-center mb-md">
+          <button onClick={showNewPosts}>
+            {newPosts} new {newPosts === 1 ? 'post' : 'posts'}
+          </button>
+        </div>
+      )}
+
       {posts.map((post) => (
         <PostCard key={post.id} post={post} onUpdate={loadPosts} />
       ))}
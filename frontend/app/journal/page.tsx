@@ -1,6 +1,6 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useRouter } from 'next/navigation'
 import Link from 'next/link'
 import { useAuth } from '@/components/providers/AuthProvider'
@@ -33,6 +33,20 @@ interface Session {
   linked_sessions?: LinkedSession[]
 }
 
+// Journal list rows (GET /sessions/mine?view=list); full entries are fetched on select
+interface SessionSummary {
+  id: string
+  intent: string
+  title: string
+  excerpt: string
+  word_count: number
+  has_analysis: boolean
+  completed_at: string | null
+  topics: string[]
+  post_id?: string
+  post_three_word_id?: string
+}
+
 interface EmailStatus {
   sending: boolean
   success: boolean
@@ -44,15 +58,17 @@ const INTENTS = ['processing', 'agreeing', 'challenging', 'solution', 'venting',
 export default function JournalPage() {
   const router = useRouter()
   const { user, loading: authLoading } = useAuth()
-  const [sessions, setSessions] = useState<Session[]>([])
-  const [filteredSessions, setFilteredSessions] = useState<Session[]>([])
+  const [sessions, setSessions] = useState<SessionSummary[]>([])
+  const [filteredSessions, setFilteredSessions] = useState<SessionSummary[]>([])
   const [selectedSession, setSelectedSession] = useState<Session | null>(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
+  const latestLoad = useRef(0)
   const [isMobile, setIsMobile] = useState(false)
 
   // Filters
   const [searchQuery, setSearchQuery] = useState('')
+  const [searchLimited, setSearchLimited] = useState(false)
   const [filterIntent, setFilterIntent] = useState('')
   const [filterTopic, setFilterTopic] = useState('')
   const [filterStatus, setFilterStatus] = useState('') // analyzed, unanalyzed, shared
@@ -83,22 +99,16 @@ export default function JournalPage() {
     if (!authLoading && (!user || !user.three_word_id)) {
       router.push('/')
     } else if (!authLoading && user) {
-      loadSessions()
+      // Search runs server-side (entries are encrypted); wait for typing to pause
+      const timer = setTimeout(() => loadSessions(searchQuery), searchQuery ? 300 : 0)
+      return () => clearTimeout(timer)
     }
-  }, [user, authLoading, router])
+  }, [user, authLoading, router, searchQuery])
 
   useEffect(() => {
     // Apply filters
     let filtered = sessions
 
-    if (searchQuery) {
-      const query = searchQuery.toLowerCase()
-      filtered = filtered.filter(s =>
-        s.raw_content.toLowerCase().includes(query) ||
-        s.ai_analysis?.toLowerCase().includes(query)
-      )
-    }
-
     if (filterIntent) {
       filtered = filtered.filter(s => s.intent === filterIntent)
     }
@@ -108,29 +118,34 @@ export default function JournalPage() {
     }
 
     if (filterStatus === 'analyzed') {
-      filtered = filtered.filter(s => s.ai_analysis && s.ai_analysis.trim() !== '')
+      filtered = filtered.filter(s => s.has_analysis)
     } else if (filterStatus === 'unanalyzed') {
-      filtered = filtered.filter(s => !s.ai_analysis || s.ai_analysis.trim() === '')
+      filtered = filtered.filter(s => !s.has_analysis)
     } else if (filterStatus === 'shared') {
       filtered = filtered.filter(s => s.post_id)
     }
 
     setFilteredSessions(filtered)
-  }, [sessions, searchQuery, filterIntent, filterTopic, filterStatus])
+  }, [sessions, filterIntent, filterTopic, filterStatus])
 
-  async function loadSessions() {
-    setLoading(true)
+  async function loadSessions(query: string = searchQuery) {
+    // Ignore responses that arrive after a newer search was started
+    const load = ++latestLoad.current
     setError('')
     try {
-      const data = await api.getMySessions()
+      const data = await api.getMySessions(1, 20, 'list', query)
+      if (load !== latestLoad.current) return
       setSessions(data.sessions || [])
+      setSearchLimited(!!data.search_limited)
 
-      // Extract all unique topics
-      const topicsSet = new Set<string>()
-      data.sessions?.forEach((s: Session) => {
-        s.topics?.forEach(t => topicsSet.add(t))
-      })
-      setAllTopics(Array.from(topicsSet).sort())
+      // Extract all unique topics (keep the full set while searching)
+      if (!query) {
+        const topicsSet = new Set<string>()
+        data.sessions?.forEach((s: SessionSummary) => {
+          s.topics?.forEach(t => topicsSet.add(t))
+        })
+        setAllTopics(Array.from(topicsSet).sort())
+      }
     } catch (err: any) {
       setError(err.message || 'Failed to load sessions')
     } finally {
@@ -138,6 +153,15 @@ export default function JournalPage() {
     }
   }
 
+  async function selectSession(sessionId: string) {
+    try {
+      const data = await api.getSession(sessionId)
+      setSelectedSession(data)
+    } catch (err: any) {
+      setError(err.message || 'Failed to load entry')
+    }
+  }
+
   async function deleteSession(sessionId: string) {
     if (!confirm('Are you sure you want to delete this entry? This cannot be undone.')) return
 
@@ -534,6 +558,7 @@ After that initial greeting, just continue the conversation naturally as Fred -
 
           <div className="text-secondary" style={{ fontSize: '11px' }}>
             {filteredSessions.length} {filteredSessions.length === 1 ? 'entry' : 'entries'}
+            {searchLimited && ' (searched your 500 most recent entries)'}
           </div>
         </div>
 
@@ -542,7 +567,7 @@ After that initial greeting, just continue the conversation naturally as Fred -
           {filteredSessions.map((session) => (
             <div
               key={session.id}
-              onClick={() => setSelectedSession(session)}
+              onClick={() => selectSession(session.id)}
               style={{
                 padding: '16px 20px',
                 borderBottom: '1px solid var(--border)',
@@ -590,7 +615,7 @@ After that initial greeting, just continue the conversation naturally as Fred -
                 WebkitBoxOrient: 'vertical',
                 lineHeight: '1.4'
               }}>
-                {session.raw_content}
+                {session.excerpt}
               </p>
 
               {/* Topics row */}
@@ -618,7 +643,7 @@ After that initial greeting, just continue the conversation naturally as Fred -
 
               {/* Status badges row */}
               <div style={{ display: 'flex', gap: '6px', alignItems: 'center' }}>
-                {session.ai_analysis && session.ai_analysis.trim() !== '' && (
+                {session.has_analysis && (
                   <span className="text-tertiary" style={{ fontSize: '10px' }}>
                     ✓ analyzed
                   </span>
@@ -1,9 +1,10 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useRouter, useParams } from 'next/navigation'
 import { useAuth } from '@/components/providers/AuthProvider'
 import { api } from '@/lib/api'
+import { subscribeEvents, RealtimeEvent } from '@/lib/realtime'
 import ThreeWordBadge from '@/components/shared/ThreeWordBadge'
 import Loading from '@/components/shared/Loading'
 import ErrorMessage from '@/components/shared/ErrorMessage'
@@ -26,6 +27,12 @@ export default function PostPage() {
 
   const [post, setPost] = useState<any>(null)
   const [comments, setComments] = useState<any[]>([])
+  const [commentsCursor, setCommentsCursor] = useState<string | null>(null)
+  const [commentsHasMore, setCommentsHasMore] = useState(false)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const [realtime, setRealtime] = useState(true)
+  const cursorRef = useRef<string | null>(null)
+  const hasMoreRef = useRef(false)
   const [newComment, setNewComment] = useState('')
   const [loading, setLoading] = useState(true)
   const [submitting, setSubmitting] = useState(false)
@@ -45,6 +52,8 @@ export default function PostPage() {
       const data = await api.getPost(params.id as string)
       setPost(data.post)
       setComments(data.comments)
+      setCommentsCursor(data.comments_cursor)
+      setCommentsHasMore(data.comments_has_more)
     } catch (err) {
       console.error('Failed to load post:', err)
     } finally {
@@ -52,6 +61,82 @@ export default function PostPage() {
     }
   }
 
+  // Append a page of comments, replacing any we already have (e.g. once pending ones are published)
+  function mergeComments(page: any[]) {
+    setComments(prev => {
+      const byId = new Map(prev.map(c => [c.id, c]))
+      page.forEach(c => byId.set(c.id, c))
+      return Array.from(byId.values())
+    })
+  }
+
+  async function loadMoreComments() {
+    setLoadingMore(true)
+    try {
+      const data = await api.getComments(params.id as string, commentsCursor)
+      mergeComments(data.comments)
+      setCommentsCursor(data.cursor)
+      setCommentsHasMore(data.has_more)
+    } catch (err) {
+      console.error('Failed to load comments:', err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
+  useEffect(() => {
+    cursorRef.current = commentsCursor
+    hasMoreRef.current = commentsHasMore
+  }, [commentsCursor, commentsHasMore])
+
+  async function loadNewerComments() {
+    // Newer comments arrive at the end of the thread; wait until it is fully loaded
+    if (hasMoreRef.current) return
+    try {
+      const data = await api.getComments(params.id as string, cursorRef.current)
+      if (data.comments.length > 0) {
+        mergeComments(data.comments)
+        setCommentsCursor(data.cursor)
+        setCommentsHasMore(data.has_more)
+      }
+    } catch (err) {
+      console.error('Failed to refresh comments:', err)
+    }
+  }
+
+  // Live updates: apply reaction and comment deltas as they happen
+  useEffect(() => {
+    if (!post) return
+
+    return subscribeEvents({
+      postId: post.id,
+      onUnavailable: () => setRealtime(false),
+      onEvent: (event: RealtimeEvent) => {
+        if (event.type === 'reaction') {
+          setPost((prev: any) => prev && { ...prev, reaction_count: prev.reaction_count + (event.delta || 0) })
+        } else if (event.type === 'comment') {
+          setPost((prev: any) => prev && { ...prev, comment_count: prev.comment_count + 1 })
+          loadNewerComments()
+        } else if (event.type === 'comment_removed') {
+          setPost((prev: any) => prev && { ...prev, comment_count: Math.max(0, prev.comment_count - 1) })
+          setComments(prev => prev.filter(c => c.id !== event.comment_id))
+        } else if (event.type === 'resync') {
+          api.getPost(params.id as string).then(data => setPost(data.post)).catch(() => {})
+          loadNewerComments()
+        }
+      }
+    })
+  }, [post?.id])
+
+  // Without realtime events, poll for newer comments once the whole thread is loaded
+  useEffect(() => {
+    if (!post || realtime || commentsHasMore) return
+
+    const interval = setInterval(loadNewerComments, 30000)
+
+    return () => clearInterval(interval)
+  }, [post?.id, realtime, commentsHasMore])
+
   async function handleAddComment(e: React.FormEvent) {
     e.preventDefault()
     if (!newComment.trim()) return
@@ -134,6 +219,7 @@ export default function PostPage() {
             <div className="flex justify-between items-center mb-xs">
               <ThreeWordBadge threeWordId={comment.three_word_id} />
               <span className="text-tertiary" style={{ fontSize: '12px' }}>
+                {comment.pending && 'awaiting moderation · '}
                 {new Date(comment.created_at).toLocaleDateString()}
               </span>
             </div>
@@ -144,6 +230,17 @@ export default function PostPage() {
           </div>
         ))}
 
+        {commentsHasMore && (
+          <button
+            className="mb-md"
+            style={{ width: '100%' }}
+            onClick={loadMoreComments}
+            disabled={loadingMore}
+          >
+            {loadingMore ? 'loading...' : 'load more comments'}
+          </button>
+        )}
+
         {comments.length === 0 && (
           <p className="text-secondary mb-md">no comments yet. be the first!</p>
         )}
@@ -95,8 +95,8 @@ export const api = {
   shareSession: (sessionId: string, data: any) =>
     apiRequest(`/sessions/${sessionId}/share`, { method: 'POST', body: data }),
 
-  getMySessions: (page: number = 1, limit: number = 20) =>
-    apiRequest(`/sessions/mine?page=${page}&limit=${limit}`),
+  getMySessions: (page: number = 1, limit: number = 20, view: 'full' | 'list' = 'full', query: string = '') =>
+    apiRequest(`/sessions/mine?page=${page}&limit=${limit}${view === 'list' ? '&view=list' : ''}${query ? `&q=${encodeURIComponent(query)}` : ''}`),
 
   getSession: (sessionId: string) =>
     apiRequest(`/sessions/${sessionId}`),
@@ -117,6 +117,9 @@ export const api = {
   getPost: (postId: string) =>
     apiRequest(`/posts/${postId}`),
 
+  getComments: (postId: string, after?: string | null, limit: number = 50) =>
+    apiRequest(`/posts/${postId}/comments?limit=${limit}${after ? `&after=${encodeURIComponent(after)}` : ''}`),
+
   getPostsByIdentity: (threeWordId: string, page: number = 1, limit: number = 20) =>
     apiRequest(`/posts/by-identity/${threeWordId}?page=${page}&limit=${limit}`),
 
@@ -171,6 +174,18 @@ export const api = {
       body: { rejection_reason, admin_notes }
     }),
 
+  bulkApproveApplications: (application_ids: string[], admin_notes?: string) =>
+    apiRequest('/admin/applications/bulk-approve', {
+      method: 'POST',
+      body: { application_ids, admin_notes }
+    }),
+
+  bulkRejectApplications: (application_ids: string[], rejection_reason: string, admin_notes?: string) =>
+    apiRequest('/admin/applications/bulk-reject', {
+      method: 'POST',
+      body: { application_ids, rejection_reason, admin_notes }
+    }),
+
   requestMoreInfo: (applicationId: string, more_info_request: string, admin_notes?: string) =>
     apiRequest(`/admin/applications/${applicationId}/request-info`, {
       method: 'PATCH',
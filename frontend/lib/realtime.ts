@@ -0,0 +1,100 @@
+const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5000/api'
+
+export type RealtimeEvent = {
+  type: 'post' | 'comment' | 'comment_removed' | 'reaction' | 'resync'
+  post_id?: string
+  comment_id?: string
+  reaction_type?: string
+  delta?: number
+}
+
+interface SubscribeOptions {
+  postId?: string
+  onEvent: (event: RealtimeEvent) => void
+  // Called when realtime events are disabled or the server is at capacity; fall back to polling
+  onUnavailable?: () => void
+}
+
+// Subscribe to the server-sent event stream. Uses fetch rather than EventSource
+// so the bearer token can be sent. Reconnects when the server ends the stream,
+// emitting a resync event since anything published in between was missed.
+// Returns an unsubscribe function.
+export function subscribeEvents({ postId, onEvent, onUnavailable }: SubscribeOptions): () => void {
+  const controller = new AbortController()
+  let retryMs = 3000
+  let stopped = false
+  let connectedBefore = false
+
+  async function connect() {
+    const token = typeof window !== 'undefined' ? localStorage.getItem('auth_token') : null
+    const query = postId ? `?post_id=${encodeURIComponent(postId)}` : ''
+
+    const response = await fetch(`${API_URL}/events/stream${query}`, {
+      headers: token ? { 'Authorization': `Bearer ${token}` } : {},
+      credentials: 'include',
+      signal: controller.signal,
+    })
+
+    if (response.status === 404 || response.status === 503) {
+      stopped = true
+      onUnavailable?.()
+      return
+    }
+    if (!response.ok || !response.body) {
+      throw new Error(`Event stream failed: ${response.status}`)
+    }
+
+    // Events published between streams were missed
+    if (connectedBefore) onEvent({ type: 'resync' })
+    connectedBefore = true
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) return
+      buffer += decoder.decode(value, { stream: true })
+
+      let boundary
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const message = buffer.slice(0, boundary)
+        buffer = buffer.slice(boundary + 2)
+
+        let data = ''
+        for (const line of message.split('\n')) {
+          if (line.startsWith('retry:')) retryMs = parseInt(line.slice(6).trim(), 10) || retryMs
+          else if (line.startsWith('data:')) data += line.slice(5).trim()
+        }
+        if (data) {
+          try {
+            onEvent(JSON.parse(data))
+          } catch (err) {
+            console.error('Bad realtime event:', err)
+          }
+        }
+      }
+    }
+  }
+
+  async function run() {
+    while (!stopped && !controller.signal.aborted) {
+      try {
+        await connect()
+      } catch (err) {
+        if (controller.signal.aborted) return
+        console.error('Realtime connection lost:', err)
+      }
+      if (stopped || controller.signal.aborted) return
+      await new Promise(resolve => setTimeout(resolve, retryMs))
+    }
+  }
+
+  run()
+
+  return () => {
+    stopped = true
+    controller.abort()
+  }
+}